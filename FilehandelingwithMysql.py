@@ -1,30 +1,51 @@
-import mysql.connector
-import os
-import json
+import db_pool
+import listings
+import metrics
+import storage
+from datetime import datetime
+from json_mirror import JsonlMirror
+from log_writer import LogWriter
+from mirror_sync import MirrorSync
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="hotel_management"
-    )
+LOG_FILE = "system_logs.txt"
 
-def save_to_file(filename, data):
-    with open(filename, 'w') as file:
-        json.dump(data, file, indent=4)
+log_writer = LogWriter(LOG_FILE)
+room_mirror = JsonlMirror("rooms.jsonl", key="room_number")
+booking_mirror = JsonlMirror("bookings.jsonl", key="id")
+service_mirror = JsonlMirror("services.jsonl", key="id")
+MIRRORS = {"rooms": room_mirror, "bookings": booking_mirror, "services": service_mirror}
+mirror_syncer = MirrorSync(MIRRORS)
 
-def load_from_file(filename):
-    if os.path.exists(filename):
-        with open(filename, 'r') as file:
-            return json.load(file)
-    return []
+def get_db_connection():
+    return db_pool.get_db_connection()
 
-def log_action(action, details=""):
-    log_entry = f"{action}: {details}\n"
-    with open("system_logs.txt", "a") as log_file:
-        log_file.write(log_entry)
+@metrics.operation("resync_mirrors")
+def resync_mirrors(force=False):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        with mirror_syncer.exclusive():
+            for table, mirror in MIRRORS.items():
+                cursor.execute(f"SELECT COUNT(*) AS row_count FROM {table}")
+                row_count = cursor.fetchone()['row_count']
+                if not force and row_count == mirror.count():
+                    continue
+                cursor.execute(f"SELECT * FROM {table}")
+                mirror.rewrite(cursor.fetchall())
+                log_action("Mirror Resynced", f"{table}: {row_count} rows")
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
+        log_action("Mirror Resync Failed", str(err))
+    finally:
+        cursor.close()
+        conn.close()
+
+def log_action(action, details="", **fields):
+    log_entry = {"timestamp": datetime.now().isoformat(timespec="milliseconds"), "action": action, "details": details}
+    log_entry.update(fields)
+    log_writer.write(log_entry)
 
+@metrics.operation("add_room")
 def add_room():
     room_number = input("Enter room number: ")
     room_type = input("Enter room type (single, double, suite): ").lower()
@@ -38,37 +59,28 @@ def add_room():
         )
         conn.commit()
         print(f"Room {room_number} added successfully.")
-        rooms = load_from_file('rooms.json')
-        rooms.append({"room_number": room_number, "type": room_type, "price": price, "available": True})
-        save_to_file('rooms.json', rooms)
+        mirror_syncer.notify()
         log_action("Room Added", f"Room {room_number}, Type: {room_type}, Price: ${price}")
-    except mysql.connector.Error as err:
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
         log_action("Add Room Failed", str(err))
     finally:
         cursor.close()
         conn.close()
 
+@metrics.operation("view_rooms")
 def view_rooms():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT * FROM rooms")
-        rooms = cursor.fetchall()
         print("\n--- Room Details ---")
-        for room in rooms:
-            status = "Available" if room['available'] else "Occupied"
-            print(f"Room Number: {room['room_number']}, Type: {room['type'].capitalize()}, Price: ${room['price']}, Status: {status}")
-        save_to_file('rooms.json', rooms)
+        for room in listings.iter_rooms():
+            print(listings.format_room(room))
         log_action("Viewed Rooms")
         print("---------------------\n")
-    except mysql.connector.Error as err:
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
         log_action("View Rooms Failed", str(err))
-    finally:
-        cursor.close()
-        conn.close()
 
+@metrics.operation("book_room")
 def book_room():
     guest_name = input("Enter guest name: ").strip()
     contact_details = input("Enter contact details: ").strip()
@@ -98,47 +110,39 @@ def book_room():
             "INSERT INTO bookings (room_number, guest_name, contact_details, duration) VALUES (%s, %s, %s, %s)",
             (room_number, guest_name, contact_details, duration)
         )
-        update_room_availability(room_number, False)
+        update_room_availability(room_number, False, cursor)
         conn.commit()
         print(f"Room {room_number} booked successfully for {guest_name}.")
-        bookings = load_from_file('bookings.json')
-        bookings.append({"room_number": room_number, "guest_name": guest_name, "contact_details": contact_details, "duration": duration})
-        save_to_file('bookings.json', bookings)
+        mirror_syncer.notify()
         log_action("Room Booked", f"Room {room_number}, Guest: {guest_name}, Duration: {duration} nights")
-    except mysql.connector.Error as err:
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
         log_action("Book Room Failed", str(err))
     finally:
         cursor.close()
         conn.close()
 
+@metrics.operation("view_bookings")
 def view_bookings():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT * FROM bookings")
-        bookings = cursor.fetchall()
         print("\n--- Current Bookings ---")
-        if not bookings:
+        shown = 0
+        for shown, booking in enumerate(listings.iter_bookings(), start=1):
+            print(f"{shown}. {listings.format_booking(booking)}")
+        if not shown:
             print("No current bookings.")
-        else:
-            for idx, booking in enumerate(bookings, start=1):
-                print(f"{idx}. Room {booking['room_number']} - Guest: {booking['guest_name']}, Contact: {booking['contact_details']}, Duration: {booking['duration']} nights")
-        save_to_file('bookings.json', bookings)
         log_action("Viewed Bookings")
         print("------------------------\n")
-    except mysql.connector.Error as err:
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
         log_action("View Bookings Failed", str(err))
-    finally:
-        cursor.close()
-        conn.close()
 
+@metrics.operation("add_service")
 def add_service():
     print("\n--- Add Service ---")
     room_number = input("Enter room number: ").strip()
     conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = conn.cursor(dictionary=True)
     try:
         cursor.execute("SELECT * FROM rooms WHERE room_number = %s", (room_number,))
         room = cursor.fetchone()
@@ -154,32 +158,68 @@ def add_service():
         )
         conn.commit()
         print(f"Service '{service}' added to room {room_number} successfully.")
-        services = load_from_file('services.json')
-        services.append({"room_number": room_number, "service": service, "cost": cost})
-        save_to_file('services.json', services)
+        mirror_syncer.notify()
         log_action("Service Added", f"Service: {service}, Room: {room_number}, Cost: ${cost}")
-    except mysql.connector.Error as err:
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
         log_action("Add Service Failed", str(err))
     finally:
         cursor.close()
         conn.close()
 
-def update_room_availability(room_number, availability):
+def update_room_availability(room_number, availability, cursor=None):
+    if cursor is not None:
+        cursor.execute("UPDATE rooms SET available = %s WHERE room_number = %s", (availability, room_number))
+        log_action("Updated Room Availability", f"Room {room_number}, Available: {availability}")
+        return
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
         cursor.execute("UPDATE rooms SET available = %s WHERE room_number = %s", (availability, room_number))
         conn.commit()
+        mirror_syncer.notify()
         log_action("Updated Room Availability", f"Room {room_number}, Available: {availability}")
-    except mysql.connector.Error as err:
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
         log_action("Update Room Availability Failed", str(err))
     finally:
         cursor.close()
         conn.close()
 
+@metrics.operation("check_mirrors")
+def check_mirrors():
+    try:
+        results = mirror_syncer.check()
+        pending, backlog = mirror_syncer.pending()
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
+        log_action("Mirror Check Failed", str(err))
+        return
+    print("\n--- Mirror Consistency ---")
+    drifted = {}
+    for table, (rows, mirrored, database_checksum, mirror_checksum, keys) in results.items():
+        status = "consistent" if not keys else f"{len(keys)} rows drifted: {', '.join(keys[:10])}"
+        print(f"{table}: {rows} rows / {mirrored} mirrored, checksum {database_checksum:016x} / {mirror_checksum:016x}, {status}")
+        if keys:
+            drifted[table] = keys
+    print(f"Changes waiting to sync: {pending} (oldest {backlog:.1f}s)")
+    print("--------------------------\n")
+    log_action("Mirror Checked", ", ".join(f"{table}: {len(keys)} drifted" for table, keys in drifted.items()) or "consistent")
+    if drifted and input("Rewrite the drifted rows from the database? (y/n): ").strip().lower() == "y":
+        mirror_syncer.repair(drifted)
+        log_action("Mirror Repaired", ", ".join(f"{table}: {len(keys)} rows" for table, keys in drifted.items()))
+        print("Drifted rows rewritten from the database.")
+
 def main_menu():
+    # Writes made while change capture was off never reached the queue, so
+    # the mirrors are rewritten in full when it is first installed.
+    fresh = False
+    try:
+        fresh = mirror_syncer.start()
+    except storage.DatabaseError as err:
+        print(f"Error: mirror sync not started: {err}")
+        log_action("Mirror Sync Failed", str(err))
+    resync_mirrors(force=fresh)
     while True:
         print("========== Hotel Management System ==========")
         print("1. Add Room")
@@ -187,9 +227,13 @@ def main_menu():
         print("3. Book Room")
         print("4. View Bookings")
         print("5. Add Service")
-        print("6. Exit")
+        print("6. Resync Mirror Files")
+        print("7. Search Rooms")
+        print("8. Search Bookings")
+        print("9. Check Mirror Consistency")
+        print("10. Exit")
         print("==============================================")
-        choice = input("Enter your choice (1-6): ").strip()
+        choice = input("Enter your choice (1-10): ").strip()
         if choice == "1":
             add_room()
         elif choice == "2":
@@ -201,7 +245,18 @@ def main_menu():
         elif choice == "5":
             add_service()
         elif choice == "6":
+            resync_mirrors(force=True)
+            print("Mirror files resynced from the database.")
+        elif choice == "7":
+            listings.search_rooms()
+        elif choice == "8":
+            listings.search_bookings()
+        elif choice == "9":
+            check_mirrors()
+        elif choice == "10":
             print("Exiting Hotel Management System. Goodbye!")
+            mirror_syncer.close()
+            log_writer.close()
             break
         else:
             print("Invalid choice. Please try again.")
@@ -0,0 +1,231 @@
+import argparse
+import contextlib
+import itertools
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import db_pool
+import h_mng
+import listings
+import metrics
+
+MAX_LIMIT = 1000
+
+class PooledHTTPServer(HTTPServer):
+    # Requests are handed to a fixed pool of worker threads rather than a
+    # thread per connection, so concurrency stays bounded by the DB pool.
+    request_queue_size = 128
+
+    def __init__(self, address, handler, workers):
+        super().__init__(address, handler)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+def to_json(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def limit_from(query):
+    return min(int(query.get("limit", 100)), MAX_LIMIT)
+
+def take(rows, limit):
+    with contextlib.closing(rows):
+        return list(itertools.islice(rows, limit))
+
+@metrics.operation("api_health")
+def health(query, body):
+    return 200, {"status": "ok"}
+
+@metrics.operation("api_list_rooms")
+def list_rooms(query, body):
+    available = {"true": True, "false": False}.get(query.get("available", "").lower())
+    rooms = listings.iter_rooms(query.get("type"), available, query.get("from"), query.get("to"))
+    return 200, take(rooms, limit_from(query))
+
+@metrics.operation("api_create_room")
+def create_room(query, body):
+    room = h_mng.create_room(str(body["room_number"]), body["type"].lower(), float(body["price"]))
+    return 201, room
+
+@metrics.operation("api_get_room")
+def get_room(query, body, room_number):
+    room = h_mng.get_room(room_number)
+    if not room:
+        return 404, {"error": "Room not found."}
+    return 200, room
+
+@metrics.operation("api_list_bookings")
+def list_bookings(query, body):
+    return 200, take(listings.iter_bookings(query.get("guest"), query.get("room")), limit_from(query))
+
+@metrics.operation("api_create_booking")
+def create_booking(query, body):
+    duration = int(body["duration"])
+    if duration <= 0:
+        raise ValueError("Duration must be at least 1 night.")
+    room_number = h_mng.reserve_room(body["guest_name"], body.get("contact_details", ""), body["type"].lower(),
+                                     duration, body.get("room_number"))
+    if room_number is None:
+        return 409, {"error": "No matching room is available."}
+    return 201, {"room_number": room_number, "guest_name": body["guest_name"], "duration": duration}
+
+@metrics.operation("api_cancel_booking")
+def cancel_booking(query, body, booking_id):
+    booking = h_mng.cancel_reservation(int(booking_id))
+    if not booking:
+        return 404, {"error": "Booking not found."}
+    return 200, booking
+
+@metrics.operation("api_check_in")
+def check_in(query, body, room_number):
+    return 200, h_mng.check_in_room(room_number)
+
+@metrics.operation("api_check_out")
+def check_out(query, body, room_number):
+    return 200, h_mng.check_out_room(room_number)
+
+@metrics.operation("api_add_service")
+def add_service(query, body, room_number):
+    return 201, h_mng.add_room_service(room_number, body["service"].strip().lower(), float(body["cost"]))
+
+@metrics.operation("api_list_bills")
+def list_bills(query, body):
+    if "from" in query or "to" in query:
+        return 200, h_mng.bills_between(query.get("from"), query.get("to"))[:limit_from(query)]
+    return 200, h_mng.list_bills(query.get("guest"), limit_from(query))
+
+@metrics.operation("api_archive_bills")
+def archive_bills(query, body):
+    return 200, {"archived": h_mng.archive_settled_bills(body.get("before"))}
+
+def export_metrics(query, body):
+    return 200, metrics.prometheus_text()
+
+ROUTES = [
+    ("GET", r"/health", health),
+    ("GET", r"/metrics", export_metrics),
+    ("GET", r"/rooms", list_rooms),
+    ("POST", r"/rooms", create_room),
+    ("GET", r"/rooms/(?P<room_number>[^/]+)", get_room),
+    ("POST", r"/rooms/(?P<room_number>[^/]+)/check-in", check_in),
+    ("POST", r"/rooms/(?P<room_number>[^/]+)/check-out", check_out),
+    ("POST", r"/rooms/(?P<room_number>[^/]+)/services", add_service),
+    ("GET", r"/bookings", list_bookings),
+    ("POST", r"/bookings", create_booking),
+    ("DELETE", r"/bookings/(?P<booking_id>\d+)", cancel_booking),
+    ("GET", r"/bills", list_bills),
+    ("POST", r"/bills/archive", archive_bills),
+]
+ROUTES = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in ROUTES]
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = "HotelAPI/1.0"
+    quiet = True
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        allowed = False
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            allowed = True
+            if route_method == method:
+                break
+        else:
+            self.respond(405 if allowed else 404, {"error": "Method not allowed." if allowed else "Not found."})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else {}
+            status, payload = handler(query, body, **match.groupdict())
+        except h_mng.CommandError as err:
+            status, payload = 409, {"error": str(err)}
+        except (KeyError, TypeError, ValueError) as err:
+            status, payload = 400, {"error": f"Invalid request: {err}"}
+        except Exception as err:
+            # Both mysql.connector and sqlite3 name their constraint violation IntegrityError.
+            status = 409 if type(err).__name__ == "IntegrityError" else 500
+            payload = {"error": str(err)}
+        self.respond(status, payload)
+
+    def respond(self, status, payload):
+        if isinstance(payload, str):
+            data = payload.encode()
+            content_type = "text/plain; version=0.0.4"
+        else:
+            data = json.dumps(payload, default=to_json).encode()
+            content_type = "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+def make_server(host="127.0.0.1", port=8080, workers=db_pool.POOL_SIZE):
+    return PooledHTTPServer((host, port), RequestHandler, workers)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the h_mng.py booking operations as a local HTTP/JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=db_pool.POOL_SIZE, help="worker threads and pooled DB connections")
+    parser.add_argument("--sqlite", metavar="PATH", help="serve an embedded SQLite database at PATH instead of MySQL")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        import storage
+        db_pool.configure(lambda: storage.sqlite_connect(args.sqlite), size=args.workers)
+    else:
+        db_pool.configure(size=args.workers)
+    RequestHandler.quiet = not args.verbose
+
+    server = make_server(args.host, args.port, args.workers)
+    print(f"Serving hotel API on http://{args.host}:{server.server_port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
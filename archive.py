@@ -0,0 +1,114 @@
+import json
+import os
+
+from inventory import Bill
+from reporting import RevenueReport
+from shared_store import write_atomic
+
+BILLS_PREFIX = "bills-"
+SERVICES_PREFIX = "services-"
+TOTALS_PREFIX = "totals-"
+UNDATED = "undated"
+
+# Settled bills live in one partition per month of check-out:
+#   bills-2026-10.txt     guest,room charge,service charge,total,room,nights,check-out date,room type
+#   services-2026-10.txt  room,service,cost,guest,check-out date
+#   totals-2026-10.json   the partition's revenue counters
+# Bills from before check-out dates were recorded go to the "undated"
+# partition, which counts towards the totals but no date range.
+
+def partition_of(check_out_date):
+    return check_out_date[:7] if check_out_date else UNDATED
+
+def partition_path(directory, prefix, partition):
+    return os.path.join(directory, f"{prefix}{partition}.json" if prefix == TOTALS_PREFIX else f"{prefix}{partition}.txt")
+
+def partitions(directory):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(name[len(BILLS_PREFIX):-len(".txt")] for name in names
+                  if name.startswith(BILLS_PREFIX) and name.endswith(".txt"))
+
+def overlapping(directory, start, end):
+    first, last = start.isoformat()[:7], end.isoformat()[:7]
+    return [partition for partition in partitions(directory) if partition != UNDATED and first <= partition <= last]
+
+def read_lines(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+def bill_line(guest_name, charges, room_type):
+    return (f"{guest_name},{charges.room_charge},{charges.service_charge},{charges.total},{charges.room_number or ''},"
+            f"{charges.nights},{charges.check_out_date or ''},{room_type}")
+
+def parse_bill(fields):
+    return fields[0], Bill(float(fields[1]), float(fields[2]), float(fields[3]), fields[4] or None, int(fields[5]),
+                           fields[6] or None)
+
+def write(directory, settled, services, room_types, fsync=False):
+    # settled maps guest names to their bills, services are (room, service,
+    # cost, guest) entries billed to them and room_types gives each bill's
+    # room type for the totals.
+    lines = {}
+    for guest_name, charges in settled.items():
+        bill_lines, _ = lines.setdefault(partition_of(charges.check_out_date), ([], []))
+        bill_lines.append(bill_line(guest_name, charges, room_types.get(charges.room_number, "")))
+    for room_number, service, cost, guest_name in services:
+        check_out_date = settled[guest_name].check_out_date
+        lines[partition_of(check_out_date)][1].append(f"{room_number},{service},{cost},{guest_name},{check_out_date or ''}")
+    for partition, (bill_lines, service_lines) in lines.items():
+        write_partition(directory, partition, bill_lines, service_lines, fsync)
+    return len(settled)
+
+def write_partition(directory, partition, bill_lines, service_lines, fsync=False):
+    # The hot store drops these bills only after the partition is written, so
+    # an interrupted run archives them again. Bills and services whose guest
+    # and check-out date the partition already holds are skipped, and the
+    # totals are recomputed from the whole partition.
+    os.makedirs(directory, exist_ok=True)
+    contents = {}
+    for prefix, lines, key in ((SERVICES_PREFIX, service_lines, slice(3, 5)), (BILLS_PREFIX, bill_lines, slice(0, 7, 6))):
+        path = partition_path(directory, prefix, partition)
+        archived = read_lines(path)
+        seen = {tuple(line.split(",")[key]) for line in archived}
+        contents[prefix] = archived + [line for line in lines if tuple(line.split(",")[key]) not in seen]
+        write_atomic(path, "".join(line + "\n" for line in contents[prefix]), fsync)
+    totals = RevenueReport()
+    for fields in (line.split(",") for line in contents[BILLS_PREFIX]):
+        if fields[7]:
+            totals.bill(fields[7], int(fields[5]), float(fields[1]))
+    for fields in (line.split(",") for line in contents[SERVICES_PREFIX]):
+        totals.add_service(fields[1], float(fields[2]))
+    write_atomic(partition_path(directory, TOTALS_PREFIX, partition), json.dumps(vars(totals)), fsync)
+
+def read_bills(directory, start, end):
+    # Only the partitions of months overlapping [start, end] are opened.
+    first, last = start.isoformat(), end.isoformat()
+    for partition in overlapping(directory, start, end):
+        for line in read_lines(partition_path(directory, BILLS_PREFIX, partition)):
+            fields = line.split(",")
+            if first <= fields[6] <= last:
+                yield parse_bill(fields)
+
+def totals(directory):
+    report = RevenueReport()
+    for partition in partitions(directory):
+        try:
+            with open(partition_path(directory, TOTALS_PREFIX, partition), "r") as f:
+                counters = json.load(f)
+        except FileNotFoundError:
+            continue
+        partition_totals = RevenueReport()
+        vars(partition_totals).update(counters)
+        report.merge(partition_totals)
+    return report
+
+def guest_names(directory):
+    for partition in partitions(directory):
+        for line in read_lines(partition_path(directory, BILLS_PREFIX, partition)):
+            yield line.split(",", 1)[0]
@@ -0,0 +1,112 @@
+import bisect
+from datetime import date, timedelta
+
+ORIGIN = date(2000, 1, 1).toordinal()
+CALENDAR_DAYS = 1 << 16
+
+def parse_date(value):
+    if isinstance(value, date):
+        return value
+    if not value:
+        return date.today()
+    return date.fromisoformat(value)
+
+class RoomCalendar:
+    # Half-open [start, end) stays as day ordinals, kept sorted and
+    # non-overlapping, so only the stay just before `end` can collide.
+    __slots__ = ("starts", "ends")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def overlaps(self, start, end):
+        index = bisect.bisect_left(self.starts, end)
+        return index > 0 and self.ends[index - 1] > start
+
+    def add(self, start, end):
+        index = bisect.bisect_left(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+
+    def remove(self, start, end):
+        index = bisect.bisect_left(self.starts, start)
+        if index < len(self.starts) and self.starts[index] == start and self.ends[index] == end:
+            del self.starts[index]
+            del self.ends[index]
+            return True
+        return False
+
+class NightCounter:
+    # Fenwick tree over day offsets storing +1 at a stay's first night and -1
+    # at its check-out day, so occupancy for a night is one prefix sum.
+    def __init__(self, size=CALENDAR_DAYS):
+        self.tree = [0] * (size + 1)
+
+    def add(self, day, delta):
+        index = day - ORIGIN + 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, day):
+        index = min(day - ORIGIN + 1, len(self.tree) - 1)
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+class AvailabilityEngine:
+    def __init__(self):
+        self.calendars = {}
+        self.rooms_by_type = {}
+        self.nights = NightCounter()
+
+    def add_room(self, room_number, room_type):
+        if room_number not in self.calendars:
+            self.calendars[room_number] = RoomCalendar()
+            self.rooms_by_type.setdefault(room_type, []).append(room_number)
+
+    def is_free(self, room_number, start, nights):
+        start = parse_date(start).toordinal()
+        return not self.calendars[room_number].overlaps(start, start + nights)
+
+    def reserve(self, room_number, start, nights):
+        start = parse_date(start).toordinal()
+        calendar = self.calendars[room_number]
+        if calendar.overlaps(start, start + nights):
+            return False
+        calendar.add(start, start + nights)
+        self.nights.add(start, 1)
+        self.nights.add(start + nights, -1)
+        return True
+
+    def release(self, room_number, start, nights, on_date=None):
+        start = parse_date(start).toordinal()
+        end = start + nights
+        if not self.calendars[room_number].remove(start, end):
+            return
+        self.nights.add(start, -1)
+        self.nights.add(end, 1)
+        if on_date is not None:
+            # Nights already spent stay on the books for occupancy reporting.
+            stayed = min(parse_date(on_date).toordinal(), end) - start
+            if stayed > 0:
+                self.calendars[room_number].add(start, start + stayed)
+                self.nights.add(start, 1)
+                self.nights.add(start + stayed, -1)
+
+    def free_rooms(self, room_type, start, nights):
+        start = parse_date(start).toordinal()
+        end = start + nights
+        return [room_number for room_number in self.rooms_by_type.get(room_type, [])
+                if not self.calendars[room_number].overlaps(start, end)]
+
+    def occupancy(self, night):
+        return self.nights.prefix(parse_date(night).toordinal())
+
+    def occupancy_range(self, start, nights):
+        start = parse_date(start)
+        return [(start + timedelta(days=offset), self.occupancy(start + timedelta(days=offset)))
+                for offset in range(nights)]
@@ -0,0 +1,111 @@
+import argparse
+import json
+import shlex
+import sys
+import time
+
+import file
+from availability import parse_date
+
+COMMANDS = {
+    "add_room": lambda command: file.add_room_entry(
+        str(command["room_number"]), command["type"].lower(), float(command["price"])),
+    "book": lambda command: file.book_entry(
+        command["guest_name"], command.get("contact_details", ""), command["type"].lower(),
+        parse_date(command.get("check_in_date", "")), int(command["duration"]),
+        str(command["room_number"]) if command.get("room_number") else None),
+    "check_in": lambda command: file.check_in_entry(command["guest_name"]),
+    "check_out": lambda command: file.check_out_entry(command["guest_name"], command.get("date", "")),
+    "add_service": lambda command: file.add_service_entry(
+        str(command["room_number"]), command["service"], float(command["cost"])),
+    "cancel": lambda command: file.cancel_entry(
+        command["guest_name"], str(command["room_number"]) if command.get("room_number") else None),
+}
+
+def parse_command(line):
+    # JSON Lines ({"op": "book", ...}) or script lines (book guest_name="Ann Lee" type=single duration=2).
+    if line.startswith("{"):
+        return json.loads(line)
+    op, *arguments = shlex.split(line)
+    command = {"op": op}
+    for argument in arguments:
+        key, _, value = argument.partition("=")
+        command[key] = value
+    return command
+
+def read_commands(stream):
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line_number, line
+
+def run_commands(lines, group_size=0):
+    with file.exclusive_store():
+        return run_locked(lines, group_size)
+
+def run_locked(lines, group_size):
+    # Applied commands are persisted even if a later line raises, so one bad
+    # line cannot discard the ones before it.
+    results = []
+    pending = []
+    try:
+        for line_number, line in lines:
+            try:
+                command = parse_command(line)
+                entry = [str(field) for field in COMMANDS[command["op"]](command)]
+            except KeyError as err:
+                results.append({"line": line_number, "ok": False, "message": f"unknown command or missing field {err}"})
+                continue
+            except (TypeError, AttributeError) as err:
+                results.append({"line": line_number, "ok": False, "message": f"invalid field type: {err}"})
+                continue
+            except (ValueError, file.CommandError) as err:
+                results.append({"line": line_number, "ok": False, "message": str(err)})
+                continue
+            with file.state_lock:
+                file.apply_entry(entry)
+            pending.append(entry)
+            results.append({"line": line_number, "ok": True, "message": ",".join(entry)})
+            if group_size and len(pending) >= group_size:
+                file.persist(pending)
+                pending = []
+    finally:
+        if pending:
+            file.persist(pending)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Run file.py operations from a command script or JSON Lines stream.")
+    parser.add_argument("commands", nargs="?", default="-", help="command file, or - for standard input")
+    parser.add_argument("--group-size", type=int, default=0,
+                        help="persist every N commands in one journal write or transaction (default: once at the end)")
+    parser.add_argument("--results", help="write per-command results as JSON Lines to this file")
+    parser.add_argument("--quiet", action="store_true", help="only print failures and the summary")
+    args = parser.parse_args()
+
+    file.load_data()
+    stream = sys.stdin if args.commands == "-" else open(args.commands, "r")
+    start = time.perf_counter()
+    try:
+        results = run_commands(read_commands(stream), args.group_size)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    file.compact_data()
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if not args.quiet or not result["ok"]:
+            print(f"line {result['line']}: {'ok' if result['ok'] else 'FAILED'} {result['message']}")
+    if args.results:
+        with open(args.results, "w") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+    failed = sum(1 for result in results if not result["ok"])
+    print(f"Ran {len(results)} commands in {elapsed:.2f}s ({len(results) / elapsed if elapsed else 0:.0f} ops/sec), "
+          f"{failed} failed.")
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
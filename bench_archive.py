@@ -0,0 +1,83 @@
+import argparse
+import importlib
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+import storage
+
+ROOM_TYPES = ["single", "double", "suite"]
+SERVICES = ["spa", "laundry", "minibar"]
+
+def write_text_store(room_count, bill_count, services_per_bill, months, seed):
+    # Bills spread evenly over the last `months` months, each with its
+    # services already settled on it.
+    rng = random.Random(seed)
+    today = date.today()
+    with open("rooms.txt", "w") as f:
+        for i in range(room_count):
+            f.write(f"{i},{ROOM_TYPES[i % 3]},{rng.choice([80.0, 120.0, 250.0])},True\n")
+    with open("services.txt", "w") as services, open("bills.txt", "w") as bills:
+        for i in range(bill_count):
+            room_number = rng.randrange(room_count)
+            nights = rng.randint(1, 7)
+            check_out_date = today - timedelta(days=rng.randrange(months * 30))
+            for _ in range(services_per_bill):
+                services.write(f"{room_number},{rng.choice(SERVICES)},12.5,Guest{i}\n")
+            bills.write(f"Guest{i},{nights * 120.0},{services_per_bill * 12.5},{nights * 120.0 + services_per_bill * 12.5},"
+                        f"{room_number},{nights},{check_out_date.isoformat()}\n")
+
+def timed(action):
+    start = time.perf_counter()
+    result = action()
+    return (time.perf_counter() - start) * 1000, result
+
+def measure_store():
+    module = importlib.reload(importlib.import_module("file"))
+    load, _ = timed(module.load_data)
+    save, _ = timed(module.save_data)
+    size = sum(os.path.getsize(name) for name in os.listdir(".") if name.endswith(".txt"))
+    return module, load, save, size
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure file.py load and save before and after archiving settled bills.")
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--bills", type=int, default=200_000)
+    parser.add_argument("--services-per-bill", type=int, default=3)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    storage.STORAGE_BACKEND = "text"
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            write_text_store(args.rooms, args.bills, args.services_per_bill, args.months, args.seed)
+            module, hot_load, hot_save, hot_size = measure_store()
+            report = module.report.snapshot()
+            cutoff = date.today() - timedelta(days=module.ARCHIVE_AFTER_DAYS)
+            archive_time, archived = timed(lambda: module.archive_settled(cutoff))
+            module.compact_data()
+            module, load, save, size = measure_store()
+            assert module.report.snapshot() == report
+
+            month_start = date.today().replace(day=1) - timedelta(days=180)
+            month_end = (month_start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+            month_query, found = timed(lambda: module.bills_between(month_start, month_end))
+            all_query, everything = timed(lambda: module.bills_between(date.today() - timedelta(days=args.months * 31), date.today()))
+            assert len(everything) == args.bills
+        finally:
+            os.chdir(previous_dir)
+
+    print(f"{args.rooms} rooms, {args.bills} bills over {args.months} months, {args.services_per_bill} services each")
+    print(f"{'':28}{'load ms':>10}{'save ms':>10}{'hot MB':>10}{'bills':>9}")
+    print(f"{'everything hot':28}{hot_load:>10.1f}{hot_save:>10.1f}{hot_size / 1e6:>10.1f}{args.bills:>9}")
+    print(f"{'after archiving':28}{load:>10.1f}{save:>10.1f}{size / 1e6:>10.1f}{len(module.bills):>9}")
+    print(f"Archived {archived} bills in {archive_time:.1f} ms")
+    print(f"Bills for {month_start:%Y-%m}: {len(found)} in {month_query:.1f} ms; all {len(everything)} in {all_query:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import importlib
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+import billing
+import storage
+
+ROOM_TYPES = ["single", "double", "suite"]
+
+def seed_file_store(module, room_count, service_count, rng):
+    entries = []
+    for i in range(room_count):
+        entries.append(("add_room", str(i), ROOM_TYPES[i % 3], rng.choice([80.0, 120.0, 250.0])))
+        entries.append(("book", str(i), f"Guest{i}", f"555-{i:06d}", rng.randint(1, 7), date.today().isoformat()))
+        entries.append(("check_in", str(i), f"Guest{i}"))
+    for _ in range(service_count):
+        entries.append(("add_service", str(rng.randrange(room_count)), "laundry", 12.5))
+    module.record_batch(entries)
+
+def file_per_guest(module):
+    for stay in list(module.check_ins.values()):
+        bill = billing.compute_bills([stay], module.rooms, module.services.totals)[0]
+        module.record("check_out", *bill, date.today().isoformat())
+
+def file_batch(module):
+    new_bills = billing.compute_bills(list(module.check_ins.values()), module.rooms, module.services.totals)
+    module.record_batch([("check_out", *bill, date.today().isoformat()) for bill in new_bills])
+
+def time_file_store(run, room_count, service_count, seed):
+    with tempfile.TemporaryDirectory() as workdir:
+        previous_dir = os.getcwd()
+        os.chdir(workdir)
+        try:
+            storage.STORAGE_BACKEND = "text"
+            module = importlib.reload(importlib.import_module("file"))
+            module.COMPACT_EVERY = float("inf")
+            module.load_data()
+            seed_file_store(module, room_count, service_count, random.Random(seed))
+            start = time.perf_counter()
+            run(module)
+            elapsed = time.perf_counter() - start
+            assert not module.check_ins and len(module.bills) == room_count
+            return elapsed
+        finally:
+            os.chdir(previous_dir)
+
+def seed_database(conn, room_count, service_count, rng):
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO rooms (room_number, type, price, available) VALUES (%s, %s, %s, FALSE)",
+                       [(f"B{i}", ROOM_TYPES[i % 3], rng.choice([80.0, 120.0, 250.0])) for i in range(room_count)])
+    cursor.executemany("INSERT INTO check_ins (room_number, guest_name, check_in_date, duration) VALUES (%s, %s, %s, %s)",
+                       [(f"B{i}", f"Guest{i}", "2024-01-01", rng.randint(1, 7)) for i in range(room_count)])
+    cursor.executemany("INSERT INTO services (room_number, service, cost) VALUES (%s, %s, %s)",
+                       [(f"B{rng.randrange(room_count)}", "laundry", 12.5) for _ in range(service_count)])
+    conn.commit()
+    cursor.close()
+
+def clear_database(conn):
+    cursor = conn.cursor()
+    for table in ("bills", "services", "check_ins", "rooms"):
+        cursor.execute(f"DELETE FROM {table} WHERE room_number LIKE 'B%'")
+    conn.commit()
+    cursor.close()
+
+def sql_per_guest(conn, room_numbers):
+    cursor = conn.cursor(dictionary=True)
+    for room_number in room_numbers:
+        cursor.execute("SELECT * FROM check_ins WHERE room_number = %s", (room_number,))
+        stay = cursor.fetchone()
+        cursor.execute("SELECT * FROM rooms WHERE room_number = %s", (room_number,))
+        room = cursor.fetchone()
+        cursor.execute("SELECT COALESCE(SUM(cost), 0) AS total FROM services WHERE room_number = %s", (room_number,))
+        service_charge = cursor.fetchone()['total']
+        room_charge = room['price'] * stay['duration']
+        cursor.execute(
+            "INSERT INTO bills (guest_name, room_number, room_charge, service_charge, total) VALUES (%s, %s, %s, %s, %s)",
+            (stay['guest_name'], room_number, room_charge, service_charge, room_charge + service_charge)
+        )
+        cursor.execute("DELETE FROM check_ins WHERE id = %s", (stay['id'],))
+        cursor.execute("UPDATE rooms SET available = TRUE WHERE room_number = %s", (room_number,))
+        conn.commit()
+    cursor.close()
+
+def time_database(connect, run, room_count, service_count, seed):
+    conn = connect()
+    try:
+        clear_database(conn)
+        seed_database(conn, room_count, service_count, random.Random(seed))
+        room_numbers = [f"B{i}" for i in range(room_count)]
+        start = time.perf_counter()
+        run(conn, room_numbers)
+        elapsed = time.perf_counter() - start
+        clear_database(conn)
+        return elapsed
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-guest checkout billing with the batch night audit.")
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--services", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mysql", action="store_true", help="use the configured MySQL server instead of embedded SQLite")
+    args = parser.parse_args()
+
+    results = [
+        ("file store", time_file_store(file_per_guest, args.rooms, args.services, args.seed),
+         time_file_store(file_batch, args.rooms, args.services, args.seed)),
+    ]
+    with tempfile.TemporaryDirectory() as workdir:
+        connect = storage.mysql_connect if args.mysql else lambda: storage.sqlite_connect(os.path.join(workdir, "bench.db"))
+        results.append((
+            "mysql" if args.mysql else "sqlite",
+            time_database(connect, sql_per_guest, args.rooms, args.services, args.seed),
+            time_database(connect, billing.bill_departures, args.rooms, args.services, args.seed),
+        ))
+
+    print(f"{args.rooms} departures, {args.services} services")
+    print(f"{'':16}{'per guest (ms)':>16}{'batch (ms)':>16}{'speedup':>10}")
+    for name, per_guest, batch in results:
+        print(f"{name:16}{per_guest * 1000:16.1f}{batch * 1000:16.1f}{per_guest / batch:10.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import os
+import time
+
+import db_pool
+import h_mng
+import metrics
+import storage
+
+ROOM_TYPES = ["single", "double", "suite"]
+
+def seed(count, services_per_room):
+    conn = db_pool.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        for table in ("bills", "services", "check_ins", "rooms"):
+            cursor.execute(f"DELETE FROM {table} WHERE room_number LIKE %s", ("CO-%",))
+        cursor.executemany("INSERT INTO rooms (room_number, type, price, available) VALUES (%s, %s, %s, FALSE)",
+                           [(f"CO-{i}", ROOM_TYPES[i % 3], 100.0) for i in range(count)])
+        cursor.executemany("INSERT INTO check_ins (room_number, guest_name, check_in_date, duration) VALUES (%s, %s, %s, %s)",
+                           [(f"CO-{i}", f"Checkout Guest {i}", "2024-01-01", 1 + i % 5) for i in range(count)])
+        cursor.executemany("INSERT INTO services (room_number, service, cost) VALUES (%s, %s, %s)",
+                           [(f"CO-{i}", "laundry", 12.5) for i in range(count) for _ in range(services_per_room)])
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+@metrics.operation("checkout_separate")
+def check_out_separate(room_number):
+    # The previous flow, completed with the steps it skipped: each lookup is
+    # its own statement, the room comes through the cache (a second
+    # connection on a miss) and the room update commits on a third. That
+    # update runs before the writes here because SQLite would otherwise
+    # block it behind this connection's open transaction.
+    conn = h_mng.get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT * FROM check_ins WHERE room_number = %s", (room_number,))
+        stay = cursor.fetchone()
+        room = h_mng.get_room(room_number)
+        cursor.execute("SELECT COALESCE(SUM(cost), 0) AS service_charge FROM services WHERE room_number = %s", (room_number,))
+        service_charge = cursor.fetchone()['service_charge']
+        room_charge = room['price'] * stay['duration']
+        h_mng.update_room_availability(room_number, True)
+        cursor.execute(
+            "INSERT INTO bills (guest_name, room_number, room_charge, service_charge, total) VALUES (%s, %s, %s, %s, %s)",
+            (stay['guest_name'], room_number, room_charge, service_charge, room_charge + service_charge)
+        )
+        cursor.execute("DELETE FROM check_ins WHERE id = %s", (stay['id'],))
+        conn.commit()
+        h_mng.room_cache.invalidate(room_number, room['type'])
+    finally:
+        cursor.close()
+        conn.close()
+
+@metrics.operation("checkout_consolidated")
+def check_out_consolidated(room_number):
+    # Six round trips: the joined read, the check-in delete, the bill, the
+    # services settled on it, the room update and the commit.
+    h_mng.check_out_room(room_number)
+
+def measure(name, check_out, count):
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        check_out(f"CO-{i}")
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    histograms = metrics.registry.histograms
+    labels = (("operation", name),)
+    queries = histograms[("hotel_operation_queries", labels)].sum
+    commits = histograms[("hotel_commit_seconds", labels)].count
+    connections = histograms[("hotel_connection_seconds", labels)].count
+    return {
+        "round_trips": (queries + commits) / count,
+        "connections": connections / count,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare statement-by-statement and consolidated h_mng checkouts.")
+    parser.add_argument("--checkouts", type=int, default=2000)
+    parser.add_argument("--services-per-room", type=int, default=5)
+    parser.add_argument("--sqlite", metavar="PATH", default="bench_checkout.db",
+                        help="SQLite database to use; pass --mysql to use the configured MySQL server instead")
+    parser.add_argument("--mysql", action="store_true")
+    args = parser.parse_args()
+
+    if not args.mysql:
+        if os.path.exists(args.sqlite):
+            os.remove(args.sqlite)
+        db_pool.configure(lambda: storage.sqlite_connect(args.sqlite))
+    metrics.ENABLED = True
+
+    print(f"{args.checkouts} checkouts with {args.services_per_room} services each")
+    print(f"{'flow':<14}{'round trips':>12}{'connections':>12}{'p50 ms':>9}{'p99 ms':>9}{'mean ms':>9}")
+    for name, check_out in (("separate", check_out_separate), ("consolidated", check_out_consolidated)):
+        seed(args.checkouts, args.services_per_room)
+        result = measure(f"checkout_{name}", check_out, args.checkouts)
+        print(f"{name:<14}{result['round_trips']:>12.1f}{result['connections']:>12.1f}{result['p50_ms']:>9.3f}"
+              f"{result['p99_ms']:>9.3f}{result['mean_ms']:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import random
+import resource
+import time
+
+from guest_search import GuestIndex
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+               "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+               "Ahmed", "Fatima", "Wei", "Mei", "Hiroshi", "Yuki", "Olga", "Ivan", "Priya", "Arjun", "Lucia", "Mateo"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+              "Nakamura", "Okafor", "Kowalski", "Novak", "Haddad", "Chen", "Singh", "Petrov", "Rossi", "Dubois"]
+
+def make_guests(count, rng):
+    guests = []
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        name = f"{first} {last} {i}" if rng.random() < 0.5 else f"{first} {last}-{rng.choice(LAST_NAMES)} {i}"
+        contact = f"{first.lower()}.{last.lower()}{i}@example.com" if rng.random() < 0.5 else f"555-{i:07d}"
+        guests.append((name, contact))
+    return guests
+
+def typo(word, rng):
+    index = rng.randrange(len(word) - 1)
+    return word[:index] + word[index + 1] + word[index] + word[index + 2:]
+
+def time_queries(index, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure guest index build, update and search times.")
+    parser.add_argument("--guests", type=int, default=300_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    guests = make_guests(args.guests, rng)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    index = GuestIndex()
+    for name, contact in guests:
+        index.add(name, "bill", contact)
+    index.search("warm")
+    build = time.perf_counter() - start
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+    print(f"Indexed {len(index)} guests in {build:.2f}s, about {memory / 1024:.0f} MiB")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        index.add(f"Walk In {i}", "booking", f"555-9{i:06d}")
+        index.search("walk")
+        index.remove(f"Walk In {i}", "booking")
+    print(f"Add, search and remove one guest: {(time.perf_counter() - start):.3f} ms each")
+
+    samples = [guests[rng.randrange(len(guests))] for _ in range(args.queries)]
+    query_sets = {
+        "full name": [name for name, _ in samples],
+        "surname prefix": [name.split()[1][:4] for name, _ in samples],
+        "typo in name": [f"{typo(name.split()[0], rng)} {name.split()[1]}" for name, _ in samples],
+        "phone digits": [contact[:9] for _, contact in samples if contact[0].isdigit()],
+        "email": [contact for _, contact in samples if "@" in contact],
+    }
+    print(f"{'query':<16}{'p50 ms':>9}{'p99 ms':>9}{'top hit':>9}")
+    for label, queries in query_sets.items():
+        p50, p99 = time_queries(index, queries)
+        if label in ("full name", "email"):
+            expected = [name for name, contact in samples if contact in queries or name in queries]
+            hits = sum(1 for query, name in zip(queries, expected) if index.search(query, 1)[0][0].name == name)
+            top = f"{hits / len(queries):.0%}"
+        else:
+            top = "-"
+        print(f"{label:<16}{p50:>9.3f}{p99:>9.3f}{top:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import date
+
+from availability import AvailabilityEngine
+from inventory import Room, ServiceLog
+
+ROOM_TYPES = ["single", "double", "suite"]
+
+def build_dict_layout(room_count, service_count, seed):
+    rng = random.Random(seed)
+    rooms = {}
+    for i in range(room_count):
+        rooms[str(i)] = {"type": rng.choice(ROOM_TYPES), "price": 100.0, "available": rng.random() < 0.5}
+    services = []
+    for _ in range(service_count):
+        services.append({"room_number": str(rng.randrange(room_count)), "service": "laundry", "cost": 12.5})
+    return rooms, services
+
+def build_slot_layout(room_count, service_count, seed):
+    rng = random.Random(seed)
+    rooms = {}
+    calendar = AvailabilityEngine()
+    for i in range(room_count):
+        room_number = str(i)
+        room = Room(rng.choice(ROOM_TYPES), 100.0, rng.random() < 0.5)
+        rooms[room_number] = room
+        calendar.add_room(room_number, room.type)
+        if not room.available:
+            calendar.reserve(room_number, date.today(), 1)
+    services = ServiceLog()
+    for _ in range(service_count):
+        services.append(str(rng.randrange(room_count)), "laundry", 12.5)
+    return rooms, services, calendar
+
+def measure(build, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current, peak
+
+def time_queries(query, queries):
+    start = time.perf_counter()
+    for _ in range(queries):
+        query()
+    return (time.perf_counter() - start) / queries
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the dict-based and slot/columnar room inventories.")
+    parser.add_argument("--rooms", type=int, default=100_000)
+    parser.add_argument("--services", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    (dict_rooms, dict_services), dict_build, dict_memory, dict_peak = measure(
+        build_dict_layout, args.rooms, args.services, args.seed)
+    (slot_rooms, slot_services, calendar), slot_build, slot_memory, slot_peak = measure(
+        build_slot_layout, args.rooms, args.services, args.seed)
+
+    room_number = str(args.rooms // 2)
+    dict_available = time_queries(
+        lambda: [room for room, details in dict_rooms.items() if details["type"] == "double" and details["available"]],
+        args.queries)
+    # file.py answers "which doubles are free tonight" from the availability calendar.
+    slot_available = time_queries(lambda: calendar.free_rooms("double", date.today(), 1), args.queries)
+    dict_total = time_queries(
+        lambda: sum(service["cost"] for service in dict_services if service["room_number"] == room_number),
+        args.queries)
+    slot_total = time_queries(lambda: slot_services.total_for(room_number), args.queries)
+
+    print(f"{args.rooms} rooms, {args.services} services")
+    print(f"{'':28}{'dict layout':>16}{'slot layout':>16}")
+    print(f"{'build time (s)':28}{dict_build:16.2f}{slot_build:16.2f}")
+    print(f"{'memory (MB)':28}{dict_memory / 1e6:16.1f}{slot_memory / 1e6:16.1f}")
+    print(f"{'peak memory (MB)':28}{dict_peak / 1e6:16.1f}{slot_peak / 1e6:16.1f}")
+    print(f"{'available doubles (ms)':28}{dict_available * 1000:16.3f}{slot_available * 1000:16.3f}")
+    print(f"{'room service total (ms)':28}{dict_total * 1000:16.3f}{slot_total * 1000:16.3f}")
+
+if __name__ == "__main__":
+    main()
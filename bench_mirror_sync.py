@@ -0,0 +1,137 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import db_pool
+import metrics
+import storage
+from json_mirror import JsonlMirror
+from mirror_sync import MirrorSync
+
+ROOM_TYPES = ["single", "double", "suite"]
+
+def seed(rooms):
+    conn = db_pool.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("INSERT INTO rooms (room_number, type, price, available) VALUES (%s, %s, %s, TRUE)",
+                           [(f"M-{i}", ROOM_TYPES[i % 3], 100.0) for i in range(rooms)])
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def resync(syncer):
+    conn = db_pool.get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        with syncer.exclusive():
+            for table, mirror in syncer.mirrors.items():
+                cursor.execute(f"SELECT * FROM {table}")
+                mirror.rewrite(cursor.fetchall())
+    finally:
+        cursor.close()
+        conn.close()
+
+def book(i, mirrors=None):
+    # One booking as FilehandelingwithMysql.book_room writes it; with mirrors
+    # given, the mirror lines are written inline as before the sync worker.
+    conn = db_pool.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        room_number = f"M-{i}"
+        cursor.execute("INSERT INTO bookings (room_number, guest_name, contact_details, duration) VALUES (%s, %s, %s, %s)",
+                       (room_number, f"Guest {i}", "bench", 2))
+        booking_id = cursor.lastrowid
+        cursor.execute("UPDATE rooms SET available = %s WHERE room_number = %s", (False, room_number))
+        conn.commit()
+        if mirrors:
+            mirrors["bookings"].extend([{"id": booking_id, "room_number": room_number, "guest_name": f"Guest {i}",
+                                         "contact_details": "bench", "duration": 2}])
+            mirrors["rooms"].extend([dict(mirrors["rooms"].get(room_number), available=False)])
+    finally:
+        cursor.close()
+        conn.close()
+
+def time_bookings(first, count, mirrors=None, syncer=None):
+    latencies = []
+    for i in range(first, first + count):
+        start = time.perf_counter()
+        book(i, mirrors)
+        if syncer:
+            syncer.notify()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+def lag_percentile(fraction):
+    histogram = metrics.registry.histograms[("hotel_mirror_lag_seconds", ())]
+    target, seen = histogram.count * fraction, 0
+    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+        seen += count
+        if seen >= target:
+            return bound * 1000
+    return float("inf")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure booking latency with inline mirror writes and with the mirror sync worker.")
+    parser.add_argument("--rooms", type=int, default=20_000)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            storage.STORAGE_BACKEND = "sqlite"
+            db_pool.configure(lambda: storage.sqlite_connect(os.path.join(workdir, "hotel.db")))
+            mirrors = {"rooms": JsonlMirror("rooms.jsonl", key="room_number"),
+                       "bookings": JsonlMirror("bookings.jsonl", key="id"),
+                       "services": JsonlMirror("services.jsonl", key="id")}
+            syncer = MirrorSync(mirrors, interval=args.interval)
+            seed(args.rooms)
+            resync(syncer)
+
+            inline = time_bookings(0, args.bookings, mirrors=mirrors)
+            inline_drift = sum(len(result[4]) for result in syncer.check().values())
+            resync(syncer)
+
+            syncer.start()
+            synced = time_bookings(args.bookings, args.bookings, syncer=syncer)
+            syncer.sync()
+            lag = lag_percentile(0.5), lag_percentile(0.99)
+            backlog = metrics.registry.gauges[("hotel_mirror_backlog_seconds", ())]
+
+            # A concurrent writer keeps booking while the check scans.
+            writer = threading.Thread(target=time_bookings, args=(2 * args.bookings, 200), kwargs={"syncer": syncer})
+            writer.start()
+            start = time.perf_counter()
+            results = syncer.check()
+            check_time = time.perf_counter() - start
+            writer.join()
+            syncer.close()
+            false_drift = sum(len(result[4]) for result in results.values())
+
+            mirrors["rooms"].extend([dict(mirrors["rooms"].get("M-7"), price=1.0)])
+            mirrors["bookings"].extend([{"id": str(args.bookings + 3), "_deleted": True}])
+            drifted = {table: result[4] for table, result in syncer.check().items() if result[4]}
+            syncer.repair(drifted)
+            repaired = all(not result[4] for result in syncer.check().values())
+            rows = sum(result[0] for result in results.values())
+        finally:
+            os.chdir(previous_dir)
+
+    print(f"{args.rooms} rooms, {args.bookings} bookings per run, sync interval {args.interval}s")
+    print(f"{'booking request':<24}{'p50 ms':>9}{'p99 ms':>9}")
+    print(f"{'inline mirror writes':<24}{inline[0]:>9.3f}{inline[1]:>9.3f}")
+    print(f"{'sync worker':<24}{synced[0]:>9.3f}{synced[1]:>9.3f}")
+    print(f"Inline writes left {inline_drift} mirror rows differing from their table rows")
+    print(f"Commit to mirror lag: p50 <= {lag[0]:.1f} ms, p99 <= {lag[1]:.1f} ms; backlog after drain {backlog:.1f}s")
+    print(f"Checksum check of {rows} rows during writes: {check_time * 1000:.0f} ms, {false_drift} rows reported drifted")
+    print(f"Injected drift found: {sorted(drifted.items())}; repaired: {repaired}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import importlib
+import os
+import random
+import tempfile
+import time
+
+import storage
+
+ROOM_TYPES = ["single", "double", "suite"]
+
+def write_text_store(room_count, bill_count, service_count, seed):
+    rng = random.Random(seed)
+    with open("rooms.txt", "w") as f:
+        for i in range(room_count):
+            f.write(f"{i},{ROOM_TYPES[i % 3]},{rng.choice([80.0, 120.0, 250.0])},{i % 4 != 0}\n")
+    with open("check_ins.txt", "w") as f:
+        for i in range(0, room_count, 4):
+            f.write(f"{i},Current{i},2026-01-01,3\n")
+    with open("services.txt", "w") as f:
+        for _ in range(service_count):
+            f.write(f"{rng.randrange(room_count)},{rng.choice(['spa', 'laundry', 'minibar'])},12.5\n")
+    with open("bills.txt", "w") as f:
+        for i in range(bill_count):
+            nights = rng.randint(1, 7)
+            f.write(f"Guest{i},{nights * 120.0},25.0,{nights * 120.0 + 25.0},{rng.randrange(room_count)},{nights}\n")
+
+def time_load(touch_history=False):
+    module = importlib.reload(importlib.import_module("file"))
+    start = time.perf_counter()
+    module.load_data()
+    loaded = time.perf_counter() - start
+    if touch_history:
+        len(module.services)
+        len(module.bills)
+    return loaded, time.perf_counter() - start, module
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare file.py startup from the text files and from a binary snapshot.")
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--bills", type=int, default=200_000)
+    parser.add_argument("--services", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    storage.STORAGE_BACKEND = "text"
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            write_text_store(args.rooms, args.bills, args.services, args.seed)
+            text_load, _, module = time_load()
+            text_size = sum(os.path.getsize(name) for name in os.listdir(".") if name.endswith(".txt"))
+
+            start = time.perf_counter()
+            module.write_snapshot()
+            convert = time.perf_counter() - start
+
+            snapshot_load, _, _ = time_load()
+            _, snapshot_full, reloaded = time_load(touch_history=True)
+            assert len(reloaded.bills) == len(module.bills) and len(reloaded.services) == len(module.services)
+            snapshot_size = os.path.getsize(module.SNAPSHOT_FILE)
+        finally:
+            os.chdir(previous_dir)
+
+    print(f"{args.rooms} rooms, {args.bills} bills, {args.services} services")
+    print(f"{'text files':32}{text_load * 1000:10.1f} ms{text_size / 1e6:10.1f} MB")
+    print(f"{'convert to snapshot':32}{convert * 1000:10.1f} ms")
+    print(f"{'snapshot, history lazy':32}{snapshot_load * 1000:10.1f} ms{snapshot_size / 1e6:10.1f} MB")
+    print(f"{'snapshot, history loaded':32}{snapshot_full * 1000:10.1f} ms")
+
+if __name__ == "__main__":
+    main()
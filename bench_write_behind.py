@@ -0,0 +1,96 @@
+import argparse
+import importlib
+import os
+import random
+import tempfile
+import time
+
+import storage
+
+MODES = {
+    "rewrite": {"JOURNAL_MODE": False},
+    "rewrite-fsync": {"JOURNAL_MODE": False, "FSYNC": True},
+    "journal": {"JOURNAL_MODE": True},
+    "write-behind": {"WRITE_BEHIND": True},
+    "write-behind-fsync": {"WRITE_BEHIND": True, "FSYNC": True},
+}
+
+def write_text_store(room_count, service_count, seed):
+    rng = random.Random(seed)
+    with open("rooms.txt", "w") as f:
+        for i in range(room_count):
+            f.write(f"{i},single,100.0,False\n")
+    with open("services.txt", "w") as f:
+        for _ in range(service_count):
+            f.write(f"{rng.randrange(room_count)},laundry,12.5\n")
+
+def load_file_store(settings):
+    module = importlib.reload(importlib.import_module("file"))
+    for name, value in settings.items():
+        setattr(module, name, value)
+    module.load_data()
+    if module.WRITE_BEHIND:
+        module.start_write_behind()
+    return module
+
+def run_mode(settings, args):
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            write_text_store(args.rooms, args.services, args.seed)
+            module = load_file_store(settings)
+            rng = random.Random(args.seed)
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(args.bursts):
+                for _ in range(args.burst_size):
+                    op_start = time.perf_counter()
+                    module.record("add_service", str(rng.randrange(args.rooms)), "spa", 5.0)
+                    latencies.append(time.perf_counter() - op_start)
+                time.sleep(args.pause)
+            flush_start = time.perf_counter()
+            module.compact_data()
+            flush = time.perf_counter() - flush_start
+            elapsed = time.perf_counter() - start
+            saves = module.write_behind.saves if module.write_behind else None
+            if module.write_behind:
+                module.write_behind.close()
+
+            reloaded = load_file_store({})
+            expected = args.services + args.bursts * args.burst_size
+            assert len(reloaded.services) == expected, (len(reloaded.services), expected)
+        finally:
+            os.chdir(previous_dir)
+    latencies.sort()
+    return {
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "flush_ms": flush * 1000,
+        "elapsed": elapsed,
+        "saves": saves,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure file.py mutation latency under bursty load for each persistence mode.")
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--services", type=int, default=50_000)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=50)
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds between bursts")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    storage.STORAGE_BACKEND = "text"
+    print(f"{args.bursts} bursts of {args.burst_size} mutations over {args.rooms} rooms and {args.services} services")
+    print(f"{'mode':<22}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'flush ms':>10}{'saves':>8}{'total s':>9}")
+    for name in args.modes.split(","):
+        result = run_mode(MODES[name], args)
+        saves = "-" if result["saves"] is None else result["saves"]
+        print(f"{name:<22}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}{result['max_ms']:>10.3f}"
+              f"{result['flush_ms']:>10.1f}{saves:>8}{result['elapsed']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
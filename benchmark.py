@@ -0,0 +1,209 @@
+import argparse
+import builtins
+import contextlib
+import importlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+ROOM_TYPES = ["single", "double", "suite"]
+SERVICES = ["room service", "laundry", "spa", "minibar"]
+OPERATION_MIX = {"book": 0.35, "check_in": 0.2, "add_service": 0.25, "check_out": 0.2}
+# The menu functions report business failures by printing them, so an
+# operation counts as an error unless its front end printed the success line.
+SUCCESS_MESSAGES = {"add_room": "added successfully", "book": "booked successfully", "check_in": "checked into room",
+                    "add_service": "added to room", "check_out": "checked out"}
+
+def generate_workload(room_count, operation_count, seed=1):
+    rng = random.Random(seed)
+    workload = []
+    free_rooms = {room_type: [] for room_type in ROOM_TYPES}
+    for i in range(room_count):
+        room_number = str(100 + i)
+        room_type = ROOM_TYPES[i % len(ROOM_TYPES)]
+        workload.append(("add_room", {"room_number": room_number, "type": room_type, "price": rng.choice([80, 120, 250])}))
+        free_rooms[room_type].append(room_number)
+
+    booked = []
+    checked_in = []
+    guest_id = 0
+    operations = list(OPERATION_MIX)
+    weights = list(OPERATION_MIX.values())
+    while len(workload) < room_count + operation_count:
+        op = rng.choices(operations, weights)[0]
+        if op == "book":
+            room_type = rng.choice(ROOM_TYPES)
+            if not free_rooms[room_type]:
+                continue
+            room_number = free_rooms[room_type].pop(rng.randrange(len(free_rooms[room_type])))
+            guest_id += 1
+            guest = {"guest_name": f"Guest{guest_id}", "contact_details": f"555-{guest_id:06d}",
+                     "type": room_type, "room_number": room_number, "duration": rng.randint(1, 7)}
+            booked.append(guest)
+            workload.append(("book", guest))
+        elif op == "check_in" and booked:
+            guest = booked.pop(rng.randrange(len(booked)))
+            checked_in.append(guest)
+            workload.append(("check_in", guest))
+        elif op == "add_service" and checked_in:
+            guest = rng.choice(checked_in)
+            workload.append(("add_service", {"room_number": guest["room_number"], "service": rng.choice(SERVICES),
+                                             "cost": rng.choice([5, 12.5, 40])}))
+        elif op == "check_out" and checked_in:
+            guest = checked_in.pop(rng.randrange(len(checked_in)))
+            free_rooms[guest["type"]].append(guest["room_number"])
+            workload.append(("check_out", guest))
+    return workload
+
+def file_store_answers(op, data):
+    if op == "add_room":
+        return [data["room_number"], data["type"], str(data["price"])]
+    if op == "book":
+        return [data["guest_name"], data["contact_details"], data["type"], "", str(data["duration"]), data["room_number"]]
+    if op in ("check_in", "check_out"):
+        return [data["guest_name"]]
+    return [data["room_number"], data["service"], str(data["cost"])]
+
+def mysql_answers(op, data):
+    if op == "add_room":
+        return [data["room_number"], data["type"], str(data["price"])]
+    if op == "book":
+        return [data["guest_name"], data["contact_details"], data["type"], data["room_number"], str(data["duration"])]
+    if op in ("check_in", "check_out"):
+        return [data["room_number"]]
+    return [data["room_number"], data["service"], str(data["cost"])]
+
+def load_variant(name, workdir, use_mysql):
+    import storage
+    db_path = os.path.join(workdir, "hotel.db")
+    if name.startswith("file"):
+        module = importlib.reload(importlib.import_module("file"))
+        module.JOURNAL_MODE = name != "file-rewrite"
+        storage.STORAGE_BACKEND = "sqlite" if name == "file-sqlite" else "text"
+        storage.SQLITE_PATH = db_path
+        module.load_data()
+        operations = {"add_room": module.add_room, "book": module.book_room, "check_in": module.check_in,
+                      "add_service": module.add_service, "check_out": module.check_out}
+        return module, operations, file_store_answers
+    import db_pool
+    if use_mysql:
+        db_pool.configure()
+    else:
+        db_pool.configure(lambda: storage.sqlite_connect(db_path))
+    if name == "h_mng":
+        module = importlib.reload(importlib.import_module("h_mng"))
+        operations = {"add_room": module.add_room, "book": module.book_room, "check_in": module.check_in,
+                      "add_service": module.add_service, "check_out": module.check_out}
+        return module, operations, mysql_answers
+    module = importlib.reload(importlib.import_module("FilehandelingwithMysql"))
+    operations = {"add_room": module.add_room, "book": module.book_room, "add_service": module.add_service}
+    return module, operations, mysql_answers
+
+def run_variant(name, workload, use_mysql=False):
+    latencies = {}
+    errors = {}
+    previous_dir = os.getcwd()
+    previous_input = builtins.input
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            module, operations, answers_for = load_variant(name, workdir, use_mysql)
+            sink = io.StringIO()
+            start = time.perf_counter()
+            for op, data in workload:
+                function = operations.get(op)
+                if function is None:
+                    continue
+                answers = iter(answers_for(op, data))
+                builtins.input = lambda prompt="": next(answers)
+                op_start = time.perf_counter()
+                try:
+                    with contextlib.redirect_stdout(sink):
+                        function()
+                    failed = SUCCESS_MESSAGES[op] not in sink.getvalue()
+                except Exception:
+                    failed = True
+                if failed:
+                    errors[op] = errors.get(op, 0) + 1
+                latencies.setdefault(op, []).append(time.perf_counter() - op_start)
+                sink.seek(0)
+                sink.truncate()
+            elapsed = time.perf_counter() - start
+            if hasattr(module, "log_writer"):
+                module.log_writer.close()
+        finally:
+            builtins.input = previous_input
+            os.chdir(previous_dir)
+    return summarize(latencies, errors, elapsed)
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+def summarize(latencies, errors, elapsed):
+    report = {"elapsed": elapsed, "operations": {}}
+    for op, values in latencies.items():
+        values.sort()
+        report["operations"][op] = {
+            "count": len(values),
+            "errors": errors.get(op, 0),
+            "ops_per_sec": len(values) / sum(values) if sum(values) else 0.0,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    return report
+
+def print_report(name, report):
+    print(f"\n== {name} ({report['elapsed']:.2f}s) ==")
+    print(f"{'operation':<14}{'count':>8}{'errors':>8}{'ops/sec':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op, stats in report["operations"].items():
+        print(f"{op:<14}{stats['count']:>8}{stats['errors']:>8}{stats['ops_per_sec']:>10.0f}"
+              f"{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+
+def find_regressions(reports, baseline, tolerance):
+    regressions = []
+    for name, report in reports.items():
+        for op, stats in report["operations"].items():
+            previous = baseline.get(name, {}).get("operations", {}).get(op)
+            if previous and stats["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name}.{op}: p95 {previous['p95_ms']:.3f} ms -> {stats['p95_ms']:.3f} ms")
+            if stats["errors"] > (previous["errors"] if previous else 0):
+                regressions.append(f"{name}.{op}: {previous['errors'] if previous else 0} -> {stats['errors']} errors")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the three hotel front ends with a synthetic workload.")
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--operations", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--variants", default="file,file-rewrite,file-sqlite,h_mng,FilehandelingwithMysql",
+                        help="comma-separated list; file-rewrite disables the journal and file-sqlite uses the SQLite backend")
+    parser.add_argument("--mysql", action="store_true", help="use the configured MySQL server instead of embedded SQLite")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare p95 latencies and error counts with a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown against the baseline")
+    args = parser.parse_args()
+
+    workload = generate_workload(args.rooms, args.operations, args.seed)
+    reports = {}
+    for name in args.variants.split(","):
+        reports[name] = run_variant(name, workload, args.mysql)
+        print_report(name, reports[name])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=4)
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = find_regressions(reports, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
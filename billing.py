@@ -0,0 +1,166 @@
+from array import array
+from datetime import date, timedelta
+
+from availability import parse_date
+
+DEPARTURES_QUERY = """
+    SELECT c.id, c.room_number, c.guest_name, c.check_in_date, c.duration, r.type,
+           r.price * c.duration AS room_charge, COALESCE(s.service_charge, 0) AS service_charge
+    FROM check_ins c
+    JOIN rooms r ON r.room_number = c.room_number
+    LEFT JOIN (
+        SELECT room_number, SUM(cost) AS service_charge FROM services WHERE bill_id IS NULL GROUP BY room_number
+    ) s ON s.room_number = c.room_number
+"""
+
+# Sums only the departing room's services through idx_services_room_number
+# rather than grouping the whole services table first. Services already
+# billed to an earlier guest of the room carry that bill's id.
+CHECKOUT_QUERY = """
+    SELECT c.id, c.room_number, c.guest_name, c.duration, r.type, r.price * c.duration AS room_charge,
+           (SELECT COALESCE(SUM(s.cost), 0) FROM services s
+            WHERE s.room_number = c.room_number AND s.bill_id IS NULL) AS service_charge
+    FROM check_ins c
+    JOIN rooms r ON r.room_number = c.room_number
+    WHERE c.room_number = %s
+    ORDER BY c.id LIMIT 1
+"""
+
+# The departing rooms' open services go on the bill just written for each
+# room, its latest, found through idx_bills_room_number.
+SETTLE_SERVICES = """
+    UPDATE services SET bill_id = (SELECT MAX(b.id) FROM bills b WHERE b.room_number = services.room_number)
+    WHERE bill_id IS NULL
+"""
+
+# Bills settled before the cutoff move to bills_archive with the services
+# billed on them; bills written before billed_on existed count as settled.
+ARCHIVE_STATEMENTS = [
+    "INSERT INTO services_archive (id, room_number, service, cost, bill_id) "
+    "SELECT s.id, s.room_number, s.service, s.cost, s.bill_id FROM services s JOIN bills b ON b.id = s.bill_id "
+    "WHERE b.billed_on IS NULL OR b.billed_on < %s",
+    "DELETE FROM services WHERE bill_id IN (SELECT id FROM bills WHERE billed_on IS NULL OR billed_on < %s)",
+    "INSERT INTO bills_archive (id, guest_name, room_number, room_charge, service_charge, total, nights, billed_on) "
+    "SELECT id, guest_name, room_number, room_charge, service_charge, total, nights, billed_on FROM bills "
+    "WHERE billed_on IS NULL OR billed_on < %s",
+    "DELETE FROM bills WHERE billed_on IS NULL OR billed_on < %s",
+]
+
+# Both halves are range scans on their billed_on index. On MySQL,
+# bills_archive can additionally be PARTITION BY RANGE on billed_on so the
+# range prunes to the overlapping months.
+BILLS_BETWEEN_QUERY = """
+    SELECT id, guest_name, room_number, room_charge, service_charge, total, nights, billed_on
+    FROM bills WHERE billed_on BETWEEN %s AND %s
+    UNION ALL
+    SELECT id, guest_name, room_number, room_charge, service_charge, total, nights, billed_on
+    FROM bills_archive WHERE billed_on BETWEEN %s AND %s
+    ORDER BY billed_on, id
+"""
+
+def departs_by(check_in_date, duration, on_date):
+    return parse_date(check_in_date) + timedelta(days=duration) <= on_date
+
+def due_departures(check_ins, on_date=None):
+    on_date = parse_date(on_date)
+    return [check_in for check_in in check_ins if departs_by(check_in.check_in_date, check_in.duration, on_date)]
+
+def compute_bills(departures, rooms, service_totals):
+    # One pass builds the charge columns; the totals are then a single
+    # element-wise sum instead of a per-guest scan over the services.
+    room_charges = array("d", (rooms[stay.room_number].price * stay.duration for stay in departures))
+    service_charges = array("d", (service_totals.get(stay.room_number, 0.0) for stay in departures))
+    totals = array("d", map(float.__add__, room_charges, service_charges))
+    return [(stay.room_number, stay.guest_name, room_charges[i], service_charges[i], totals[i])
+            for i, stay in enumerate(departures)]
+
+def placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+def bill_departures(conn, room_numbers=None, on_date=None):
+    # Bills the stays due out by on_date in a fixed number of statements,
+    # however many there are. Their check-ins are deleted first: if a desk
+    # checked one of them out since the read, fewer rows go, and the batch
+    # is rolled back and read again rather than billed twice.
+    on_date = parse_date(on_date)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        query = DEPARTURES_QUERY
+        params = ()
+        if room_numbers:
+            query += f" WHERE c.room_number IN ({placeholders(room_numbers)})"
+            params = tuple(room_numbers)
+        while True:
+            cursor.execute(query + " ORDER BY c.id", params)
+            departures = [row for row in cursor.fetchall()
+                          if departs_by(row['check_in_date'], row['duration'], on_date)]
+            if not departures:
+                return []
+            ids = [row['id'] for row in departures]
+            cursor.execute(f"DELETE FROM check_ins WHERE id IN ({placeholders(ids)})", ids)
+            if cursor.rowcount == len(ids):
+                break
+            conn.rollback()
+
+        cursor.executemany(
+            "INSERT INTO bills (guest_name, room_number, room_charge, service_charge, total, nights, billed_on) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [(row['guest_name'], row['room_number'], row['room_charge'], row['service_charge'],
+              row['room_charge'] + row['service_charge'], row['duration'], on_date.isoformat()) for row in departures]
+        )
+        room_numbers = sorted({row['room_number'] for row in departures})
+        cursor.execute(SETTLE_SERVICES + f" AND room_number IN ({placeholders(room_numbers)})", room_numbers)
+        cursor.execute(f"UPDATE rooms SET available = TRUE WHERE room_number IN ({placeholders(room_numbers)})",
+                       room_numbers)
+        conn.commit()
+        return departures
+    finally:
+        cursor.close()
+
+def bill_checkout(conn, room_number):
+    # One joined read for the stay, room price and services, then the bill,
+    # check-in and room in the same transaction. Deleting the check-in first
+    # means a second desk checking out the same room finds nothing to bill.
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(CHECKOUT_QUERY, (room_number,))
+        stay = cursor.fetchone()
+        if not stay:
+            return None
+        cursor.execute("DELETE FROM check_ins WHERE id = %s", (stay['id'],))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return None
+        cursor.execute(
+            "INSERT INTO bills (guest_name, room_number, room_charge, service_charge, total, nights, billed_on) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (stay['guest_name'], room_number, stay['room_charge'], stay['service_charge'],
+             stay['room_charge'] + stay['service_charge'], stay['duration'], date.today().isoformat())
+        )
+        cursor.execute("UPDATE services SET bill_id = %s WHERE room_number = %s AND bill_id IS NULL",
+                       (cursor.lastrowid, room_number))
+        cursor.execute("UPDATE rooms SET available = TRUE WHERE room_number = %s", (room_number,))
+        conn.commit()
+        return stay
+    finally:
+        cursor.close()
+
+def archive_settled(conn, before):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM bills WHERE billed_on IS NULL OR billed_on < %s", (before,))
+        count = cursor.fetchone()[0]
+        for statement in ARCHIVE_STATEMENTS:
+            cursor.execute(statement, (before,))
+        conn.commit()
+        return count
+    finally:
+        cursor.close()
+
+def bills_between(conn, start, end):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(BILLS_BETWEEN_QUERY, (start, end, start, end))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
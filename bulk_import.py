@@ -0,0 +1,167 @@
+import argparse
+import csv
+import json
+import time
+
+ROOM_TYPES = ["single", "double", "suite"]
+BATCH_SIZE = 500
+
+def read_records(path):
+    with open(path, "r", newline="") as f:
+        if path.endswith(".jsonl") or path.endswith(".json"):
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if line:
+                    yield line_number, json.loads(line)
+        else:
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, row
+
+def validate_rooms(records, errors, existing=()):
+    seen = set(existing)
+    for line_number, row in records:
+        room_number = str(row.get("room_number", "")).strip()
+        room_type = str(row.get("type", "")).strip().lower()
+        if not room_number:
+            errors.append(f"line {line_number}: missing room number")
+            continue
+        if room_number in seen:
+            errors.append(f"line {line_number}: room {room_number} already exists")
+            continue
+        if room_type not in ROOM_TYPES:
+            errors.append(f"line {line_number}: invalid room type '{room_type}'")
+            continue
+        try:
+            price = float(row.get("price"))
+        except (TypeError, ValueError):
+            errors.append(f"line {line_number}: invalid price")
+            continue
+        seen.add(room_number)
+        yield room_number, room_type, price
+
+def validate_bookings(records, errors, available_rooms):
+    for line_number, row in records:
+        room_number = str(row.get("room_number", "")).strip()
+        guest_name = str(row.get("guest_name", "")).strip()
+        contact_details = str(row.get("contact_details", "")).strip()
+        if not room_number or not guest_name:
+            errors.append(f"line {line_number}: missing room number or guest name")
+            continue
+        if room_number not in available_rooms:
+            errors.append(f"line {line_number}: room {room_number} does not exist or is not available")
+            continue
+        try:
+            duration = int(row.get("duration"))
+        except (TypeError, ValueError):
+            errors.append(f"line {line_number}: invalid duration")
+            continue
+        if duration <= 0:
+            errors.append(f"line {line_number}: duration must be at least 1 night")
+            continue
+        available_rooms.discard(room_number)
+        yield room_number, guest_name, contact_details, duration
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def import_to_mysql(rooms_path, bookings_path=None, batch_size=BATCH_SIZE, mirror=False):
+    import db_pool
+    fresh = False
+    if mirror:
+        from FilehandelingwithMysql import mirror_syncer
+        fresh = mirror_syncer.install()
+    errors = []
+    imported_rooms = []
+    imported_bookings = []
+    conn = db_pool.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT room_number, available FROM rooms")
+        existing = dict(cursor.fetchall())
+        for batch in batched(validate_rooms(read_records(rooms_path), errors, existing), batch_size):
+            cursor.executemany(
+                "INSERT INTO rooms (room_number, type, price, available) VALUES (%s, %s, %s, TRUE)",
+                batch
+            )
+            conn.commit()
+            imported_rooms.extend(batch)
+        if bookings_path:
+            available_rooms = {room_number for room_number, available in existing.items() if available}
+            available_rooms.update(room[0] for room in imported_rooms)
+            for batch in batched(validate_bookings(read_records(bookings_path), errors, available_rooms), batch_size):
+                cursor.executemany(
+                    "INSERT INTO bookings (room_number, guest_name, contact_details, duration) VALUES (%s, %s, %s, %s)",
+                    batch
+                )
+                cursor.executemany(
+                    "UPDATE rooms SET available = FALSE WHERE room_number = %s",
+                    [(booking[0],) for booking in batch]
+                )
+                conn.commit()
+                imported_bookings.extend(batch)
+    finally:
+        cursor.close()
+        conn.close()
+    if mirror:
+        update_json_mirror(imported_rooms, imported_bookings, fresh)
+    return len(imported_rooms), len(imported_bookings), errors
+
+def update_json_mirror(imported_rooms, imported_bookings, fresh=False):
+    from FilehandelingwithMysql import mirror_syncer, log_action, resync_mirrors
+    mirror_syncer.sync()
+    resync_mirrors(force=fresh)
+    log_action("Bulk Import", f"{len(imported_rooms)} rooms, {len(imported_bookings)} bookings")
+
+def import_to_text_store(rooms_path, bookings_path=None):
+    # Each file goes through record_batch as one batch, so it is persisted by
+    # whichever backend file.py is configured with; compact_data then folds a
+    # journal into the text files.
+    import file as text_store
+    errors = []
+    text_store.load_data()
+    room_entries = [("add_room", room_number, room_type, price)
+                    for room_number, room_type, price in validate_rooms(read_records(rooms_path), errors, text_store.rooms)]
+    if room_entries:
+        text_store.record_batch(room_entries)
+    booking_entries = []
+    if bookings_path:
+        available_rooms = {room_number for room_number, details in text_store.rooms.items() if details.available}
+        booking_entries = [("book", room_number, guest_name, contact_details, duration)
+                           for room_number, guest_name, contact_details, duration
+                           in validate_bookings(read_records(bookings_path), errors, available_rooms)]
+        if booking_entries:
+            text_store.record_batch(booking_entries)
+    text_store.compact_data()
+    return len(room_entries), len(booking_entries), errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import rooms and bookings from CSV or JSON Lines files.")
+    parser.add_argument("rooms", help="rooms file with room_number, type and price columns")
+    parser.add_argument("--bookings", help="bookings file with room_number, guest_name, contact_details and duration columns")
+    parser.add_argument("--target", choices=["mysql", "mirror", "file"], default="mysql",
+                        help="mysql (h_mng.py), mirror (MySQL plus JSON mirrors) or file (file.py text store)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.target == "file":
+        room_count, booking_count, errors = import_to_text_store(args.rooms, args.bookings)
+    else:
+        room_count, booking_count, errors = import_to_mysql(args.rooms, args.bookings, args.batch_size, args.target == "mirror")
+    elapsed = time.perf_counter() - start
+
+    for error in errors:
+        print(f"Skipped {error}")
+    rows = room_count + booking_count
+    print(f"Imported {room_count} rooms and {booking_count} bookings in {elapsed:.2f}s "
+          f"({rows / elapsed if elapsed else 0:.0f} rows/sec), {len(errors)} rows skipped.")
+
+if __name__ == "__main__":
+    main()
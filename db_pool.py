@@ -0,0 +1,141 @@
+import os
+import queue
+import threading
+import time
+
+import metrics
+import storage
+
+POOL_SIZE = int(os.environ.get("HOTEL_DB_POOL_SIZE", "5"))
+POOL_TIMEOUT = float(os.environ.get("HOTEL_DB_POOL_TIMEOUT", "10"))
+HEALTH_CHECK_AFTER = float(os.environ.get("HOTEL_DB_HEALTH_CHECK_AFTER", "30"))
+
+class PoolExhausted(Exception):
+    pass
+
+class PooledConnection:
+    # Wraps a raw connection so the existing "finally: conn.close()" blocks
+    # hand it back to the pool instead of tearing down the socket.
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._conn.cursor(*args, **kwargs)
+        return metrics.InstrumentedCursor(cursor) if metrics.ENABLED else cursor
+
+    def commit(self):
+        with metrics.timer("hotel_commit_seconds"):
+            self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+
+class ConnectionPool:
+    def __init__(self, connect=storage.connect, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 health_check_after=HEALTH_CHECK_AFTER):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def get_connection(self):
+        try:
+            conn, released_at = self.idle.get_nowait()
+        except queue.Empty:
+            conn = self.open_new()
+            if conn is None:
+                try:
+                    conn, released_at = self.idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise PoolExhausted(f"No database connection free after {self.timeout}s")
+            else:
+                released_at = time.monotonic()
+        if time.monotonic() - released_at > self.health_check_after and not self.is_healthy(conn):
+            self.discard(conn)
+            conn = self.open_new()
+            if conn is None:
+                return self.get_connection()
+        return PooledConnection(self, conn)
+
+    def open_new(self):
+        with self.lock:
+            if self.created >= self.size:
+                return None
+            self.created += 1
+        try:
+            return self.connect()
+        except Exception:
+            with self.lock:
+                self.created -= 1
+            raise
+
+    def is_healthy(self, conn):
+        try:
+            if hasattr(conn, "ping"):
+                conn.ping(reconnect=False)
+            else:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def release(self, conn):
+        try:
+            if getattr(conn, "in_transaction", True):
+                conn.rollback()
+        except Exception:
+            self.discard(conn)
+            return
+        self.idle.put((conn, time.monotonic()))
+
+    def discard(self, conn):
+        with self.lock:
+            self.created -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(conn)
+
+pool = None
+pool_lock = threading.Lock()
+
+def configure(connect=None, size=None, **config):
+    global pool
+    storage.DB_CONFIG.update(config)
+    with pool_lock:
+        if pool is not None:
+            pool.close_all()
+        pool = ConnectionPool(connect or storage.connect, size or POOL_SIZE)
+    return pool
+
+def get_pool():
+    global pool
+    if pool is None:
+        with pool_lock:
+            if pool is None:
+                pool = ConnectionPool()
+    return pool
+
+def get_db_connection():
+    with metrics.timer("hotel_connection_seconds"):
+        return get_pool().get_connection()
@@ -1,79 +1,748 @@
+import itertools
 import os
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import archive
+import billing
+import metrics
+import reporting
+import shared_store
+import snapshot
+import storage
+from availability import AvailabilityEngine, parse_date
+from guest_search import GuestIndex
+from inventory import Bill, Booking, CheckIn, Room, ServiceLog
+from write_behind import WriteBehind
 
 ROOMS_FILE = "rooms.txt"
 BOOKINGS_FILE = "bookings.txt"
 CHECK_INS_FILE = "check_ins.txt"
 SERVICES_FILE = "services.txt"
 BILLS_FILE = "bills.txt"
+JOURNAL_FILE = "journal.txt"
+SNAPSHOT_FILE = "hotel.snap"
+COMPACTION_FILE = "compaction.pending"
+
+JOURNAL_MODE = True
+COMPACT_EVERY = 500
+WRITE_BEHIND = False
+WRITE_BEHIND_INTERVAL = 0.05
+WRITE_BEHIND_MAX_PENDING = 200
+FSYNC = False
+SHARED_MODE = False
+SHARD_BY_FLOOR = False
+ARCHIVE_DIR = "archive"
+ARCHIVE_AFTER_DAYS = 30
 
 rooms = {}
-bookings = []
-check_ins = []
-services = []
+bookings = {}
+check_ins = {}
+services = ServiceLog()
 bills = {}
+journal_entries = 0
+sqlite_conn = None
+write_behind = None
+state_lock = threading.RLock()
+shards = {}
 
-def load_data():
-    global rooms, bookings, check_ins, services, bills
-    if os.path.exists(ROOMS_FILE):
-        with open(ROOMS_FILE, "r") as f:
+record_ids = itertools.count()
+bookings_by_guest = {}
+check_ins_by_guest = {}
+calendar = AvailabilityEngine()
+report = reporting.RevenueReport()
+guest_index = None
+
+def index_room(room_number):
+    calendar.add_room(room_number, rooms[room_number].type)
+
+def set_room_available(room_number, available):
+    room = rooms[room_number]
+    if room.available != available:
+        report.occupy(room.type, -1 if available else 1)
+    room.available = available
+
+def add_booking(booking):
+    record_id = next(record_ids)
+    bookings[record_id] = booking
+    bookings_by_guest.setdefault(booking.guest_name, []).append(record_id)
+    calendar.reserve(booking.room_number, booking.check_in_date, booking.duration)
+    if guest_index is not None:
+        guest_index.add(booking.guest_name, "booking", booking.contact_details)
+
+def find_booking(guest_name):
+    record_ids_for_guest = bookings_by_guest.get(guest_name)
+    if not record_ids_for_guest:
+        return None
+    return bookings[record_ids_for_guest[0]]
+
+def remove_booking(guest_name, room_number):
+    record_ids_for_guest = bookings_by_guest.get(guest_name, [])
+    for record_id in record_ids_for_guest:
+        if bookings[record_id].room_number == room_number:
+            record_ids_for_guest.remove(record_id)
+            if not record_ids_for_guest:
+                del bookings_by_guest[guest_name]
+            booking = bookings.pop(record_id)
+            calendar.release(room_number, booking.check_in_date, booking.duration)
+            if guest_index is not None:
+                guest_index.remove(guest_name, "booking")
+            return booking
+    return None
+
+def add_check_in(check_in_record):
+    record_id = next(record_ids)
+    check_ins[record_id] = check_in_record
+    check_ins_by_guest.setdefault(check_in_record.guest_name, []).append(record_id)
+    calendar.reserve(check_in_record.room_number, check_in_record.check_in_date, check_in_record.duration)
+    if guest_index is not None:
+        guest_index.add(check_in_record.guest_name, "check_in")
+
+def find_check_in(guest_name):
+    record_ids_for_guest = check_ins_by_guest.get(guest_name)
+    if not record_ids_for_guest:
+        return None
+    return check_ins[record_ids_for_guest[0]]
+
+def remove_check_in(guest_name, room_number, on_date=None):
+    record_ids_for_guest = check_ins_by_guest.get(guest_name, [])
+    for record_id in record_ids_for_guest:
+        if check_ins[record_id].room_number == room_number:
+            record_ids_for_guest.remove(record_id)
+            if not record_ids_for_guest:
+                del check_ins_by_guest[guest_name]
+            check_in_record = check_ins.pop(record_id)
+            calendar.release(room_number, check_in_record.check_in_date, check_in_record.duration, on_date)
+            if guest_index is not None:
+                guest_index.remove(guest_name, "check_in")
+            return check_in_record
+    return None
+
+def load_sqlite():
+    global sqlite_conn, report
+    sqlite_conn = storage.sqlite_connect()
+    cursor = sqlite_conn.cursor()
+    cursor.execute("SELECT room_number, type, price, available FROM rooms")
+    for room_number, room_type, price, available in cursor:
+        rooms[room_number] = Room(room_type, price, bool(available))
+        index_room(room_number)
+    cursor.execute("SELECT room_number, guest_name, contact_details, duration, check_in_date FROM bookings ORDER BY id")
+    for room_number, guest_name, contact_details, duration, check_in_date in cursor:
+        add_booking(Booking(room_number, guest_name, contact_details, duration, check_in_date))
+    cursor.execute("SELECT room_number, guest_name, check_in_date, duration FROM check_ins ORDER BY id")
+    for room_number, guest_name, check_in_date, duration in cursor:
+        add_check_in(CheckIn(room_number, guest_name, check_in_date, duration or 1))
+    cursor.execute("SELECT s.room_number, s.service, s.cost, b.guest_name FROM services s "
+                   "LEFT JOIN bills b ON b.id = s.bill_id ORDER BY s.id")
+    for room_number, service, cost, guest_name in cursor:
+        services.append(room_number, service, cost, guest_name)
+    cursor.execute("SELECT guest_name, room_charge, service_charge, total, room_number, nights, billed_on FROM bills ORDER BY id")
+    for guest_name, room_charge, service_charge, total, room_number, nights, billed_on in cursor:
+        bills[guest_name] = Bill(room_charge, service_charge, total, room_number, nights or 0, billed_on)
+    cursor.close()
+    report = reporting.rebuild(rooms, bills, services, archived_report())
+
+def load_snapshot():
+    global services, bills, report
+    stored = snapshot.Snapshot(SNAPSHOT_FILE)
+    for room_number, room_type, price, available in stored.rooms():
+        rooms[room_number] = Room(room_type, price, bool(available))
+        index_room(room_number)
+    for room_number, guest_name, contact_details, duration, check_in_date in stored.bookings():
+        add_booking(Booking(room_number, guest_name, contact_details, duration, check_in_date))
+    for room_number, guest_name, check_in_date, duration in stored.check_ins():
+        add_check_in(CheckIn(room_number, guest_name, check_in_date, duration))
+    services = stored.services()
+    bills = stored.bills()
+    report = stored.report()
+
+def snapshot_contents():
+    return {SNAPSHOT_FILE: snapshot.pack(rooms, list(bookings.values()), list(check_ins.values()), services, bills, report)}
+
+def write_snapshot():
+    with metrics.timer("hotel_save_seconds", target="snapshot"):
+        commit_files(snapshot_contents(), remove=journal_files())
+
+def load_text_files(directory=""):
+    rooms_file, bookings_file, check_ins_file, services_file, bills_file = (
+        os.path.join(directory, name) for name in (ROOMS_FILE, BOOKINGS_FILE, CHECK_INS_FILE, SERVICES_FILE, BILLS_FILE))
+    if os.path.exists(rooms_file):
+        with open(rooms_file, "r") as f:
             for line in f:
                 room_number, room_type, price, available = line.strip().split(",")
-                rooms[room_number] = {
-                    "type": room_type,
-                    "price": float(price),
-                    "available": available == "True"
-                }
-    if os.path.exists(BOOKINGS_FILE):
-        with open(BOOKINGS_FILE, "r") as f:
+                rooms[room_number] = Room(room_type, float(price), available == "True")
+                index_room(room_number)
+    if os.path.exists(bookings_file):
+        with open(bookings_file, "r") as f:
             for line in f:
-                room_number, guest_name, contact_details, duration = line.strip().split(",")
-                bookings.append({
-                    "room_number": room_number,
-                    "guest_name": guest_name,
-                    "contact_details": contact_details,
-                    "duration": int(duration)
-                })
-    if os.path.exists(CHECK_INS_FILE):
-        with open(CHECK_INS_FILE, "r") as f:
+                room_number, guest_name, contact_details, duration, *check_in_date = line.strip().split(",")
+                add_booking(Booking(room_number, guest_name, contact_details, int(duration), *check_in_date))
+    if os.path.exists(check_ins_file):
+        with open(check_ins_file, "r") as f:
             for line in f:
-                room_number, guest_name = line.strip().split(",")
-                check_ins.append({"room_number": room_number, "guest_name": guest_name})
-    if os.path.exists(SERVICES_FILE):
-        with open(SERVICES_FILE, "r") as f:
+                room_number, guest_name, *stay = line.strip().split(",")
+                if stay:
+                    add_check_in(CheckIn(room_number, guest_name, stay[0], int(stay[1])))
+                else:
+                    add_check_in(CheckIn(room_number, guest_name))
+    if os.path.exists(services_file):
+        with open(services_file, "r") as f:
             for line in f:
-                room_number, service, cost = line.strip().split(",")
-                services.append({
-                    "room_number": room_number,
-                    "service": service,
-                    "cost": float(cost)
-                })
-    if os.path.exists(BILLS_FILE):
-        with open(BILLS_FILE, "r") as f:
+                room_number, service, cost, *guest_name = line.strip().split(",")
+                services.append(room_number, service, float(cost), guest_name[0] if guest_name else None)
+    if os.path.exists(bills_file):
+        with open(bills_file, "r") as f:
             for line in f:
-                guest_name, room_charge, service_charge, total = line.strip().split(",")
-                bills[guest_name] = {
-                    "room_charge": float(room_charge),
-                    "service_charge": float(service_charge),
-                    "total": float(total)
-                }
+                guest_name, room_charge, service_charge, total, *stay = line.strip().split(",")
+                bills[guest_name] = Bill(float(room_charge), float(service_charge), float(total),
+                                         stay[0] if stay else None, int(stay[1]) if stay else 0,
+                                         stay[2] or None if len(stay) > 2 else None)
+
+def load_data():
+    global report
+    if storage.STORAGE_BACKEND == "sqlite":
+        load_sqlite()
+        return
+    if SHARED_MODE:
+        load_shared()
+        return
+    finish_compaction()
+    if os.path.exists(SNAPSHOT_FILE):
+        load_snapshot()
+        replay_journal()
+        return
+    load_text_files()
+    report = reporting.rebuild(rooms, bills, services, archived_report())
+    replay_journal()
+
+def reset_state():
+    global services, bills, calendar, report, guest_index
+    for table in (rooms, bookings, check_ins, bookings_by_guest, check_ins_by_guest):
+        table.clear()
+    services = ServiceLog()
+    bills = {}
+    calendar = AvailabilityEngine()
+    report = reporting.RevenueReport()
+    guest_index = None
+    for shard in shards.values():
+        shard.close_tail()
+
+def shard_name(room_number):
+    # Floors are every digit but the last two (room 312 is on floor 3).
+    if not SHARD_BY_FLOOR:
+        return ""
+    floor = room_number[:-2]
+    return f"floor-{floor if floor.isalnum() else '0'}"
+
+def get_shard(name):
+    if name not in shards:
+        shards[name] = shared_store.Shard(name, JOURNAL_FILE)
+    return shards[name]
+
+def all_shards():
+    if not SHARD_BY_FLOOR:
+        return [get_shard("")]
+    return [get_shard(entry.name) for entry in sorted(os.scandir("."), key=lambda entry: entry.name)
+            if entry.name.startswith("floor-") and entry.is_dir()]
+
+def load_shared():
+    global report
+    if SHARD_BY_FLOOR and os.path.exists(ROOMS_FILE):
+        split_into_floors()
+    targets = all_shards()
+    with shared_store.locked(targets, exclusive=False):
+        for shard in targets:
+            # Only a writer that died mid-commit leaves a record while no
+            # exclusive lock is held. Several desks starting together may all
+            # finish it; steps another desk already did are skipped.
+            finish_compaction(shard.directory)
+            load_text_files(shard.directory)
+        report = reporting.rebuild(rooms, bills, services, archived_report())
+        for shard in targets:
+            shard.open_tail()
+            for fields in shard.read_new():
+                apply_entry(fields)
+
+def split_into_floors():
+    # A store written before floors were enabled is split into one directory
+    # per floor once, by whichever process gets the flat store's lock first.
+    with shared_store.locked([get_shard("")], exclusive=True):
+        if os.path.exists(ROOMS_FILE):
+            load_text_files()
+            replay_journal()
+            floors = {shard_name(room_number) for room_number in rooms}
+            floors.update(shard_name(room_number) for room_number, _, _ in services)
+            floors.update(shard_name(charges.room_number or "") for charges in bills.values())
+            targets = [get_shard(name) for name in floors]
+            with shared_store.locked(targets, exclusive=True):
+                for shard in targets:
+                    write_files(render_text_files(shard.directory, lambda room_number: shard_name(room_number) == shard.directory))
+            for path in (ROOMS_FILE, BOOKINGS_FILE, CHECK_INS_FILE, SERVICES_FILE, BILLS_FILE, JOURNAL_FILE):
+                if os.path.exists(path):
+                    os.remove(path)
+    reset_state()
+
+def catch_up(targets):
+    # Applies what other processes appended to these shards since this one
+    # last looked. Returns False when a shard has to be reloaded from disk:
+    # it skipped a compaction, or it is a floor another desk created and
+    # already compacted.
+    for shard in targets:
+        if shard.tail is None and os.path.exists(os.path.join(shard.directory, ROOMS_FILE)):
+            return False
+        entries = shard.read_new()
+        if entries is None:
+            return False
+        for fields in entries:
+            apply_entry(fields)
+    return True
+
+def refresh(blocking=True):
+    targets = [shard for shard in all_shards() if shard.changed()]
+    with shared_store.locked(targets, exclusive=False, blocking=blocking) as held:
+        current = catch_up(held)
+    if not current:
+        reset_state()
+        load_shared()
+
+def compact_shard(shard):
+    contents = render_text_files(shard.directory, lambda room_number: shard_name(room_number) == shard.directory)
+    contents.update(shard.rotation())
+    commit_files(contents, shard.directory)
+    shard.open_tail()
+
+def render_text_files(directory="", keep=lambda room_number: True):
+    return {
+        os.path.join(directory, ROOMS_FILE): "".join(
+            f"{room_number},{room.type},{room.price},{room.available}\n"
+            for room_number, room in rooms.items() if keep(room_number)),
+        os.path.join(directory, BOOKINGS_FILE): "".join(
+            f"{booking.room_number},{booking.guest_name},{booking.contact_details},{booking.duration},{booking.check_in_date}\n"
+            for booking in bookings.values() if keep(booking.room_number)),
+        os.path.join(directory, CHECK_INS_FILE): "".join(
+            f"{check_in.room_number},{check_in.guest_name},{check_in.check_in_date},{check_in.duration}\n"
+            for check_in in check_ins.values() if keep(check_in.room_number)),
+        os.path.join(directory, SERVICES_FILE): "".join(
+            f"{room_number},{service},{cost}{',' + guest_name if guest_name else ''}\n"
+            for room_number, service, cost, guest_name in services.entries() if keep(room_number)),
+        os.path.join(directory, BILLS_FILE): "".join(
+            f"{guest_name},{charges.room_charge},{charges.service_charge},{charges.total},{charges.room_number},"
+            f"{charges.nights},{charges.check_out_date or ''}\n"
+            for guest_name, charges in bills.items() if keep(charges.room_number or "")),
+    }
+
+def stage_files(contents):
+    staged = []
+    for path, content in contents.items():
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb" if isinstance(content, bytes) else "w") as f:
+            f.write(content)
+            if FSYNC:
+                f.flush()
+                os.fsync(f.fileno())
+        staged.append((temp_path, path))
+    return staged
+
+def write_files(contents):
+    # Each file is written beside its target and renamed over it, so a crash
+    # mid-save leaves either the old or the new version, never a torn one.
+    for temp_path, path in stage_files(contents):
+        os.replace(temp_path, path)
+
+def commit_files(contents, directory="", remove=()):
+    # Compaction replaces several files and drops the journal they now
+    # include, and replaying that journal over them would apply it twice.
+    # The new files are staged first and then committed by writing one
+    # record of the renames and removals left to do; a crash before it
+    # leaves the old files and journal, a crash after it is finished by the
+    # next load.
+    staged = stage_files(contents)
+    record = "".join(f"{temp_path}\t{path}\n" for temp_path, path in staged)
+    record += "".join(f"\t{path}\n" for path in remove)
+    shared_store.write_atomic(os.path.join(directory, COMPACTION_FILE), record, FSYNC)
+    finish_compaction(directory)
+
+def journal_files():
+    return [JOURNAL_FILE] if os.path.exists(JOURNAL_FILE) else []
+
+def finish_compaction(directory=""):
+    record_path = os.path.join(directory, COMPACTION_FILE)
+    try:
+        with open(record_path, "r") as f:
+            steps = [line.rstrip("\n").split("\t") for line in f if line.strip()]
+    except FileNotFoundError:
+        return
+    for temp_path, path in steps:
+        try:
+            if temp_path:
+                os.replace(temp_path, path)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+    try:
+        os.remove(record_path)
+    except FileNotFoundError:
+        pass
 
 def save_data():
-    with open(ROOMS_FILE, "w") as f:
-        for room_number, details in rooms.items():
-            f.write(f"{room_number},{details['type']},{details['price']},{details['available']}\n")
-    with open(BOOKINGS_FILE, "w") as f:
-        for booking in bookings:
-            f.write(f"{booking['room_number']},{booking['guest_name']},{booking['contact_details']},{booking['duration']}\n")
-    with open(CHECK_INS_FILE, "w") as f:
-        for check_in in check_ins:
-            f.write(f"{check_in['room_number']},{check_in['guest_name']}\n")
-    with open(SERVICES_FILE, "w") as f:
-        for service in services:
-            f.write(f"{service['room_number']},{service['service']},{service['cost']}\n")
-    with open(BILLS_FILE, "w") as f:
-        for guest_name, charges in bills.items():
-            f.write(f"{guest_name},{charges['room_charge']},{charges['service_charge']},{charges['total']}\n")
+    with metrics.timer("hotel_save_seconds", target="text"):
+        write_files(render_text_files())
+
+def save_state():
+    with state_lock:
+        contents = snapshot_contents() if os.path.exists(SNAPSHOT_FILE) else render_text_files()
+    with metrics.timer("hotel_save_seconds", target="write_behind"):
+        commit_files(contents, remove=journal_files())
+
+def start_write_behind():
+    global write_behind
+    if write_behind is None and sqlite_conn is None and not SHARED_MODE:
+        write_behind = WriteBehind(save_state, WRITE_BEHIND_INTERVAL, WRITE_BEHIND_MAX_PENDING)
+        write_behind.start()
+
+def apply_entry(fields):
+    op = fields[0]
+    if op == "add_room":
+        room_number, room_type, price = fields[1:]
+        rooms[room_number] = Room(room_type, float(price))
+        index_room(room_number)
+        report.add_room(rooms[room_number].type)
+    elif op == "book":
+        room_number, guest_name, contact_details, duration, *check_in_date = fields[1:]
+        booking = Booking(room_number, guest_name, contact_details, int(duration), *check_in_date)
+        add_booking(booking)
+        report.book(rooms[room_number].type)
+        if parse_date(booking.check_in_date) <= date.today():
+            set_room_available(room_number, False)
+    elif op == "check_in":
+        room_number, guest_name = fields[1:]
+        booking = remove_booking(guest_name, room_number)
+        if booking is None:
+            add_check_in(CheckIn(room_number, guest_name))
+        else:
+            add_check_in(CheckIn(room_number, guest_name, booking.check_in_date, booking.duration))
+        set_room_available(room_number, False)
+    elif op == "check_out":
+        room_number, guest_name, room_charge, service_charge, total, *check_out_date = fields[1:]
+        check_out_date = check_out_date[0] if check_out_date else date.today().isoformat()
+        check_in_record = remove_check_in(guest_name, room_number, check_out_date)
+        set_room_available(room_number, True)
+        services.settle(room_number, guest_name)
+        nights = check_in_record.duration if check_in_record else 1
+        previous = bills.get(guest_name)
+        if previous is not None and previous.room_number in rooms:
+            # bills keeps one bill per guest, so the replaced one leaves the totals too.
+            report.bill(rooms[previous.room_number].type, previous.nights, previous.room_charge, -1)
+        bills[guest_name] = Bill(float(room_charge), float(service_charge), float(total), room_number, nights, check_out_date)
+        report.bill(rooms[room_number].type, nights, float(room_charge))
+        if guest_index is not None and previous is None:
+            guest_index.add(guest_name, "bill")
+    elif op == "cancel":
+        room_number, guest_name = fields[1:]
+        remove_booking(guest_name, room_number)
+        occupied = any(check_in.room_number == room_number for check_in in check_ins.values())
+        if not occupied and calendar.is_free(room_number, date.today(), 1):
+            set_room_available(room_number, True)
+    elif op == "add_service":
+        room_number, service, cost = fields[1:]
+        services.append(room_number, service, float(cost))
+        report.add_service(service, float(cost))
+    elif op == "archive":
+        room_number, before = fields[1:]
+        settled = settled_bills(room_number, before)
+        for guest_name in settled:
+            del bills[guest_name]
+        services.remove_settled(settled)
+
+def replay_journal():
+    global journal_entries
+    journal_entries = 0
+    if not os.path.exists(JOURNAL_FILE):
+        return
+    with open(JOURNAL_FILE, "r") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            apply_entry(line.split(","))
+            journal_entries += 1
+
+def compact_data():
+    global journal_entries
+    if sqlite_conn is not None:
+        return
+    if write_behind is not None:
+        write_behind.flush()
+        return
+    if SHARED_MODE:
+        with exclusive_store():
+            for shard in all_shards():
+                if shard.entries:
+                    compact_shard(shard)
+        return
+    contents = snapshot_contents() if os.path.exists(SNAPSHOT_FILE) else render_text_files()
+    with metrics.timer("hotel_save_seconds", target="compact"):
+        commit_files(contents, remove=journal_files())
+    journal_entries = 0
+
+def write_journal(entries):
+    global journal_entries
+    with metrics.timer("hotel_save_seconds", target="journal"), open(JOURNAL_FILE, "a") as f:
+        f.writelines(",".join(fields) + "\n" for fields in entries)
+    journal_entries += len(entries)
+    if journal_entries >= COMPACT_EVERY:
+        compact_data()
+
+def persist(entries):
+    if sqlite_conn is not None:
+        with metrics.timer("hotel_save_seconds", target="sqlite"):
+            cursor = sqlite_conn.cursor()
+            for fields in entries:
+                storage.apply_operation(cursor, fields)
+            sqlite_conn.commit()
+            cursor.close()
+    elif write_behind is not None:
+        write_behind.mark_dirty(len(entries))
+    elif SHARED_MODE:
+        by_shard = {}
+        for fields in entries:
+            by_shard.setdefault(shard_name(fields[1]), []).append(fields)
+        targets = [get_shard(name) for name in by_shard]
+        unlocked = [shard for shard in targets if shard.lock_fd is None]
+        with metrics.timer("hotel_save_seconds", target="shared"), shared_store.locked(targets, exclusive=True):
+            catch_up(unlocked)
+            for shard in targets:
+                shard.append(by_shard[shard.directory])
+                if shard.entries >= COMPACT_EVERY:
+                    compact_shard(shard)
+    elif JOURNAL_MODE:
+        write_journal(entries)
+    else:
+        save_data()
+
+def execute_batch(build, *args):
+    # build(*args) validates against the in-memory state and returns the
+    # entries to record. In shared mode it runs again once the shards those
+    # entries touch are locked and caught up, so it sees every other
+    # process's writes; if the rerun needs a shard it did not lock, retry.
+    with state_lock:
+        if not SHARED_MODE:
+            entries = [[str(field) for field in fields] for fields in build(*args)]
+            for fields in entries:
+                apply_entry(fields)
+            persist(entries)
+            return entries
+        while True:
+            # Shards another desk is writing are skipped here; the ones this
+            # mutation touches are caught up again under their own lock below.
+            refresh(blocking=False)
+            entries = build(*args)
+            names = {shard_name(str(fields[1])) for fields in entries}
+            with shared_store.locked([get_shard(name) for name in names], exclusive=True):
+                if not catch_up([get_shard(name) for name in names]):
+                    continue
+                entries = [[str(field) for field in fields] for fields in build(*args)]
+                if not {shard_name(fields[1]) for fields in entries} <= names:
+                    continue
+                for fields in entries:
+                    apply_entry(fields)
+                persist(entries)
+                return entries
+
+def execute(build, *args):
+    return execute_batch(lambda: [build(*args)])[0]
+
+def record_batch(entries):
+    return execute_batch(lambda: entries)
+
+def record(*fields):
+    record_batch([fields])
+
+@contextmanager
+def exclusive_store():
+    # Holds every shard for a run of mutations (batch mode); a no-op unless
+    # several processes share the store.
+    if not SHARED_MODE:
+        yield
+        return
+    with state_lock, shared_store.locked(all_shards(), exclusive=True):
+        refresh()
+        yield
+
+class CommandError(Exception):
+    pass
+
+def add_room_entry(room_number, room_type, price):
+    if room_number in rooms:
+        raise CommandError("Room number already exists.")
+    if room_type not in ["single", "double", "suite"]:
+        raise CommandError("Invalid room type.")
+    return ("add_room", room_number, room_type, float(price))
+
+def book_entry(guest_name, contact_details, room_type, check_in_date, duration, room_number=None):
+    if check_in_date < date.today():
+        raise CommandError("Check-in date cannot be in the past.")
+    if duration <= 0:
+        raise CommandError("Duration must be at least 1 night.")
+    available_rooms = calendar.free_rooms(room_type, check_in_date, duration)
+    if not available_rooms:
+        raise CommandError(f"No available {room_type} rooms for those dates.")
+    if room_number is None:
+        room_number = min(available_rooms)
+    elif room_number not in available_rooms:
+        raise CommandError("Invalid room selection.")
+    return ("book", room_number, guest_name, contact_details, duration, check_in_date.isoformat())
+
+def cancel_entry(guest_name, room_number=None):
+    for record_id in bookings_by_guest.get(guest_name, []):
+        booking = bookings[record_id]
+        if room_number is None or booking.room_number == room_number:
+            return ("cancel", booking.room_number, guest_name)
+    raise CommandError("Booking not found.")
+
+def check_in_entry(guest_name):
+    booking = find_booking(guest_name)
+    if booking is None:
+        raise CommandError("Booking not found.")
+    return ("check_in", booking.room_number, guest_name)
+
+def check_out_entry(guest_name, on_date=None):
+    check_in_record = find_check_in(guest_name)
+    if check_in_record is None:
+        raise CommandError("Check-in record not found.")
+    bill = billing.compute_bills([check_in_record], rooms, services.totals)[0]
+    return ("check_out", *bill, parse_date(on_date).isoformat())
+
+def add_service_entry(room_number, service, cost):
+    if room_number not in rooms or rooms[room_number].available:
+        raise CommandError("Room is not occupied.")
+    return ("add_service", room_number, service, float(cost))
+
+def departure_entries(audit_date):
+    departures = billing.due_departures(check_ins.values(), audit_date)
+    if not departures:
+        return []
+    return [("check_out", *bill, audit_date.isoformat()) for bill in billing.compute_bills(departures, rooms, services.totals)]
+
+def settled_bills(room_number, before):
+    # An archive entry's room number only routes it to its shard; every bill
+    # of that shard checked out before `before` is archived.
+    shard = shard_name(room_number)
+    return {guest_name: charges for guest_name, charges in bills.items()
+            if (charges.check_out_date or "") < before and shard_name(charges.room_number or "") == shard}
+
+def archive_entries(before):
+    by_shard = {}
+    for charges in bills.values():
+        if (charges.check_out_date or "") < before:
+            by_shard.setdefault(shard_name(charges.room_number or ""), charges.room_number or "")
+    return [("archive", room_number, before) for room_number in by_shard.values()]
+
+def archive_directory(room_number):
+    return os.path.join(shard_name(room_number) if SHARED_MODE else "", ARCHIVE_DIR)
+
+def archive_directories():
+    # A store split into floors keeps reading what was archived before the split.
+    directories = [ARCHIVE_DIR]
+    if SHARED_MODE and SHARD_BY_FLOOR:
+        directories += [os.path.join(shard.directory, ARCHIVE_DIR) for shard in all_shards()]
+    return directories
+
+def archive_settled(before):
+    # Bills settled before `before` and the services billed on them leave the
+    # hot store: into monthly partition files beside the text store, or the
+    # archive tables with the SQLite backend. The partitions are written
+    # before the entries are recorded, so a crash in between only repeats
+    # the move, which archive.write_partition tolerates.
+    before = before.isoformat()
+    with exclusive_store(), state_lock:
+        entries = archive_entries(before)
+        if not entries:
+            return 0
+        room_types = {room_number: room.type for room_number, room in rooms.items()}
+        archived = 0
+        for _, room_number, _ in entries:
+            settled = settled_bills(room_number, before)
+            archived += len(settled)
+            if sqlite_conn is None:
+                archive.write(archive_directory(room_number), settled, services.billed_to(settled), room_types, FSYNC)
+        record_batch(entries)
+        return archived
+
+def archived_report():
+    totals = reporting.RevenueReport()
+    if sqlite_conn is not None:
+        cursor = sqlite_conn.cursor()
+        cursor.execute("SELECT r.type, SUM(a.nights), SUM(a.room_charge) FROM bills_archive a "
+                       "JOIN rooms r ON r.room_number = a.room_number GROUP BY r.type")
+        for room_type, nights, room_charge in cursor:
+            totals.bill(room_type, nights or 0, room_charge)
+        cursor.execute("SELECT service, COUNT(*), SUM(cost) FROM services_archive GROUP BY service")
+        for service, count, cost in cursor:
+            totals.add_service(service, cost, count)
+        cursor.close()
+        return totals
+    for directory in archive_directories():
+        totals.merge(archive.totals(directory))
+    return totals
+
+def archived_guest_names():
+    if sqlite_conn is not None:
+        cursor = sqlite_conn.cursor()
+        cursor.execute("SELECT DISTINCT guest_name FROM bills_archive")
+        guest_names = [guest_name for guest_name, in cursor]
+        cursor.close()
+        return guest_names
+    return [guest_name for directory in archive_directories() for guest_name in archive.guest_names(directory)]
+
+def bills_between(start, end):
+    # Bills checked out from `start` to `end` inclusive: the hot ones, then
+    # the archived ones from only the partitions whose months overlap.
+    first, last = start.isoformat(), end.isoformat()
+    with state_lock:
+        found = [(guest_name, charges) for guest_name, charges in bills.items()
+                 if charges.check_out_date and first <= charges.check_out_date <= last]
+        if sqlite_conn is not None:
+            cursor = sqlite_conn.cursor()
+            cursor.execute("SELECT guest_name, room_charge, service_charge, total, room_number, nights, billed_on "
+                           "FROM bills_archive WHERE billed_on BETWEEN %s AND %s", (first, last))
+            found.extend((guest_name, Bill(room_charge, service_charge, total, room_number, nights or 0, billed_on))
+                         for guest_name, room_charge, service_charge, total, room_number, nights, billed_on in cursor)
+            cursor.close()
+    if sqlite_conn is None:
+        for directory in archive_directories():
+            found.extend(archive.read_bills(directory, start, end))
+    return sorted(found, key=lambda item: item[1].check_out_date)
+
+def build_guest_index():
+    index = GuestIndex()
+    for booking in bookings.values():
+        index.add(booking.guest_name, "booking", booking.contact_details)
+    for check_in_record in check_ins.values():
+        index.add(check_in_record.guest_name, "check_in")
+    for guest_name in bills:
+        index.add(guest_name, "bill")
+    for guest_name in archived_guest_names():
+        index.add(guest_name, "bill")
+    return index
+
+def find_guests(query, limit=10):
+    # The index is built on the first search and then kept current by the
+    # booking, check-in and bill updates above.
+    global guest_index
+    with state_lock:
+        if guest_index is None:
+            guest_index = build_guest_index()
+        return guest_index.search(query, limit)
 
+def print_suggestions(guest_name):
+    matches = [entry.name for entry, _ in find_guests(guest_name, 3) if entry.name != guest_name]
+    if matches:
+        print(f"Did you mean: {', '.join(matches)}?")
+
+@metrics.operation("add_room")
 def add_room():
     room_number = input("Enter room number: ")
     if room_number in rooms:
@@ -88,31 +757,35 @@ def add_room():
     except ValueError:
         print("Invalid price entered.")
         return
-    rooms[room_number] = {"type": room_type, "price": price, "available": True}
-    save_data()
+    try:
+        execute(add_room_entry, room_number, room_type, price)
+    except CommandError as err:
+        print(err)
+        return
     print(f"Room {room_number} added successfully.")
 
+@metrics.operation("view_rooms")
 def view_rooms():
     print("\n--- Room List ---")
     if not rooms:
         print("No rooms available.")
         return
-    for room_number, details in rooms.items():
-        availability = "Available" if details["available"] else "Occupied"
-        print(f"Room {room_number}: Type={details['type']}, Price={details['price']}, Status={availability}")
+    for room_number, room in rooms.items():
+        availability = "Available" if room.available else "Occupied"
+        print(f"Room {room_number}: Type={room.type}, Price={room.price}, Status={availability}")
 
+@metrics.operation("book_room")
 def book_room():
     guest_name = input("Enter guest name: ").strip()
     contact_details = input("Enter contact details: ").strip()
     room_type = input("Enter room type to book (single, double, suite): ").lower()
-    available_rooms = [room for room, details in rooms.items() if details["type"] == room_type and details["available"]]
-    if not available_rooms:
-        print(f"No available {room_type} rooms.")
+    try:
+        check_in_date = parse_date(input("Enter check-in date (YYYY-MM-DD, blank for today): ").strip())
+    except ValueError:
+        print("Invalid date entered.")
         return
-    print(f"Available {room_type} rooms: {', '.join(available_rooms)}")
-    room_number = input("Enter room number to book: ").strip()
-    if room_number not in available_rooms:
-        print("Invalid room selection.")
+    if check_in_date < date.today():
+        print("Check-in date cannot be in the past.")
         return
     try:
         duration = int(input("Enter duration of stay (nights): "))
@@ -122,55 +795,81 @@ def book_room():
     except ValueError:
         print("Invalid duration entered.")
         return
-    bookings.append({
-        "room_number": room_number,
-        "guest_name": guest_name,
-        "contact_details": contact_details,
-        "duration": duration
-    })
-    rooms[room_number]["available"] = False
-    save_data()
+    available_rooms = calendar.free_rooms(room_type, check_in_date, duration)
+    if not available_rooms:
+        print(f"No available {room_type} rooms for those dates.")
+        return
+    print(f"Available {room_type} rooms: {', '.join(sorted(available_rooms))}")
+    room_number = input("Enter room number to book: ").strip()
+    try:
+        execute(book_entry, guest_name, contact_details, room_type, check_in_date, duration, room_number)
+    except CommandError as err:
+        print(err)
+        return
     print(f"Room {room_number} booked successfully for {guest_name}.")
 
+@metrics.operation("view_bookings")
 def view_bookings():
     print("\n--- Bookings ---")
     if not bookings:
         print("No bookings made.")
         return
-    for booking in bookings:
-        print(f"Room {booking['room_number']} booked by {booking['guest_name']} for {booking['duration']} nights.")
+    for booking in bookings.values():
+        print(f"Room {booking.room_number} booked by {booking.guest_name} for {booking.duration} nights from {booking.check_in_date}.")
+
+@metrics.operation("cancel_booking")
+def cancel_booking():
+    guest_name = input("Enter guest name: ").strip()
+    try:
+        entry = execute(cancel_entry, guest_name)
+    except CommandError as err:
+        print(err)
+        print_suggestions(guest_name)
+        return
+    print(f"Cancelled booking for {guest_name} in room {entry[1]}.")
 
+@metrics.operation("check_in")
 def check_in():
     guest_name = input("Enter guest name: ").strip()
-    for booking in bookings:
-        if booking["guest_name"] == guest_name:
-            room_number = booking["room_number"]
-            check_ins.append({"room_number": room_number, "guest_name": guest_name})
-            bookings.remove(booking)
-            save_data()
-            print(f"{guest_name} checked into room {room_number}.")
-            return
-    print("Booking not found.")
+    try:
+        entry = execute(check_in_entry, guest_name)
+    except CommandError as err:
+        print(err)
+        print_suggestions(guest_name)
+        return
+    print(f"{guest_name} checked into room {entry[1]}.")
 
+@metrics.operation("check_out")
 def check_out():
     guest_name = input("Enter guest name: ").strip()
-    for check_in_record in check_ins:
-        if check_in_record["guest_name"] == guest_name:
-            room_number = check_in_record["room_number"]
-            check_ins.remove(check_in_record)
-            rooms[room_number]["available"] = True
-            room_charge = rooms[room_number]["price"]
-            service_charge = sum(service["cost"] for service in services if service["room_number"] == room_number)
-            total = room_charge + service_charge
-            bills[guest_name] = {"room_charge": room_charge, "service_charge": service_charge, "total": total}
-            save_data()
-            print(f"{guest_name} checked out. Total bill: {total}")
-            return
-    print("Check-in record not found.")
+    try:
+        entry = execute(check_out_entry, guest_name)
+    except CommandError as err:
+        print(err)
+        print_suggestions(guest_name)
+        return
+    print(f"{guest_name} checked out. Total bill: {entry[5]}")
+
+@metrics.operation("night_audit")
+def night_audit():
+    try:
+        audit_date = parse_date(input("Enter audit date (YYYY-MM-DD, blank for today): ").strip())
+    except ValueError:
+        print("Invalid date entered.")
+        return
+    new_bills = execute_batch(departure_entries, audit_date)
+    if not new_bills:
+        print("No departures due.")
+    else:
+        print(f"Night audit checked out {len(new_bills)} guests. Total billed: {sum(float(bill[5]) for bill in new_bills)}")
+    archived = archive_settled(audit_date - timedelta(days=ARCHIVE_AFTER_DAYS))
+    if archived:
+        print(f"Archived {archived} bills settled more than {ARCHIVE_AFTER_DAYS} days ago.")
 
+@metrics.operation("add_service")
 def add_service():
     room_number = input("Enter room number: ").strip()
-    if room_number not in rooms or rooms[room_number]["available"]:
+    if room_number not in rooms or rooms[room_number].available:
         print("Room is not occupied.")
         return
     service = input("Enter service description: ").strip()
@@ -179,28 +878,115 @@ def add_service():
     except ValueError:
         print("Invalid cost entered.")
         return
-    services.append({"room_number": room_number, "service": service, "cost": cost})
-    save_data()
+    try:
+        execute(add_service_entry, room_number, service, cost)
+    except CommandError as err:
+        print(err)
+        return
     print(f"Service '{service}' added to room {room_number}.")
 
+@metrics.operation("view_availability")
+def view_availability():
+    room_type = input("Enter room type (single, double, suite): ").lower()
+    try:
+        start = parse_date(input("Enter first night (YYYY-MM-DD, blank for today): ").strip())
+        nights = int(input("Enter number of nights: "))
+    except ValueError:
+        print("Invalid date or number of nights entered.")
+        return
+    free = calendar.free_rooms(room_type, start, nights)
+    print(f"\n--- Availability from {start} to {start + timedelta(days=nights)} ---")
+    print(f"Free {room_type} rooms: {', '.join(sorted(free)) if free else 'none'}")
+    for night, occupied in calendar.occupancy_range(start, nights):
+        print(f"{night}: {occupied} of {len(rooms)} rooms occupied")
+
+@metrics.operation("view_report")
+def view_report():
+    reporting.print_report(report)
+    try:
+        start = parse_date(input("Enter first night for RevPAR (YYYY-MM-DD, blank for today): ").strip())
+        nights = int(input("Enter number of nights: "))
+    except ValueError:
+        print("Invalid date or number of nights entered.")
+        return
+    if nights <= 0:
+        print("Number of nights must be at least 1.")
+        return
+    # Only bills checked out after the first night can hold nights in the period.
+    stays = [(rooms[charges.room_number].type, charges)
+             for _, charges in bills_between(start + timedelta(days=1), date.max) if charges.room_number in rooms]
+    reporting.print_period_report(reporting.period_rows(report.rooms, stays, start, nights), start, nights)
+
+@metrics.operation("verify_report")
+def verify_report():
+    mismatches = reporting.differences(report, reporting.rebuild(rooms, bills, services, archived_report()))
+    if not mismatches:
+        print("Running aggregates match a full rebuild.")
+    for mismatch in mismatches:
+        print(mismatch)
+
+@metrics.operation("search_guests")
+def search_guests():
+    query = input("Enter part of a guest name or contact: ").strip()
+    matches = find_guests(query)
+    print(f"\n--- Guests matching '{query}' ---")
+    if not matches:
+        print("No matching guests.")
+        return
+    for entry, score in matches:
+        details = []
+        booking = find_booking(entry.name)
+        if booking is not None:
+            details.append(f"booked room {booking.room_number} from {booking.check_in_date}")
+        check_in_record = find_check_in(entry.name)
+        if check_in_record is not None:
+            details.append(f"staying in room {check_in_record.room_number}")
+        bill = bills.get(entry.name)
+        if bill is not None:
+            details.append(f"billed ${bill.total}")
+        elif "bill" in entry.sources:
+            details.append("archived bills")
+        print(f"{entry.name} ({', '.join(entry.contacts) or 'no contact'}): {'; '.join(details)} [score {score}]")
+
+@metrics.operation("view_bills_between")
+def view_bills_between():
+    try:
+        start = parse_date(input("Enter first day (YYYY-MM-DD, blank for today): ").strip())
+        end = parse_date(input("Enter last day (YYYY-MM-DD, blank for today): ").strip())
+    except ValueError:
+        print("Invalid date entered.")
+        return
+    found = bills_between(start, end)
+    print(f"\n--- Bills from {start} to {end} ---")
+    if not found:
+        print("No bills in that range.")
+        return
+    for guest_name, charges in found:
+        print(f"{charges.check_out_date}: {guest_name}, Room {charges.room_number}, Total: ${charges.total}")
+    print(f"{len(found)} bills, ${sum(charges.total for _, charges in found)} in total.")
+
+@metrics.operation("view_services")
 def view_services():
     print("\n--- Services ---")
     if not services:
         print("No services recorded.")
         return
-    for service in services:
-        print(f"Room {service['room_number']}: {service['service']} - ${service['cost']}")
+    for room_number, service, cost in services:
+        print(f"Room {room_number}: {service} - ${cost}")
 
+@metrics.operation("view_bills")
 def view_bills():
     print("\n--- Bills ---")
     if not bills:
         print("No bills generated.")
         return
     for guest_name, charges in bills.items():
-        print(f"Guest: {guest_name}, Room Charge: ${charges['room_charge']}, Service Charge: ${charges['service_charge']}, Total: ${charges['total']}")
+        print(f"Guest: {guest_name}, Room Charge: ${charges.room_charge}, Service Charge: ${charges.service_charge}, Total: ${charges.total}")
 
 def main_menu():
     load_data()
+    if WRITE_BEHIND:
+        start_write_behind()
     while True:
         print("\n======== Hotel Management System ========")
         print("1. Add Room")
@@ -212,9 +998,19 @@ def main_menu():
         print("7. Add Service")
         print("8. View Services")
         print("9. View Bills")
-        print("10. Exit")
+        print("10. Check Availability")
+        print("11. Night Audit")
+        print("12. Management Report")
+        print("13. Verify Report Aggregates")
+        print("14. Cancel Booking")
+        print("15. Search Guests")
+        print("16. Bills by Date Range")
+        print("17. Exit")
         print("=========================================")
         choice = input("Enter your choice: ").strip()
+        if SHARED_MODE:
+            with state_lock:
+                refresh()
         if choice == "1":
             add_room()
         elif choice == "2":
@@ -234,7 +1030,23 @@ def main_menu():
         elif choice == "9":
             view_bills()
         elif choice == "10":
-            save_data()
+            view_availability()
+        elif choice == "11":
+            night_audit()
+        elif choice == "12":
+            view_report()
+        elif choice == "13":
+            verify_report()
+        elif choice == "14":
+            cancel_booking()
+        elif choice == "15":
+            search_guests()
+        elif choice == "16":
+            view_bills_between()
+        elif choice == "17":
+            compact_data()
+            if write_behind is not None:
+                write_behind.close()
             print("Exiting. Goodbye!")
             break
         else:
@@ -0,0 +1,205 @@
+import bisect
+import heapq
+import re
+
+PUNCTUATION = re.compile(r"['\-().+]")
+SEPARATORS = re.compile(r"[\s,;/]+")
+PREFIX_SCAN_LIMIT = 5000
+INSORT_LIMIT = 1000
+EXACT_SCORE = 1.0
+TYPO_SCORE = 0.6
+
+def tokens(text):
+    # Names split into words; a contact without letters is a phone number and
+    # is kept as one run of digits so "555 01" finds "555-0101".
+    text = text.lower()
+    if not any(ch.isalpha() for ch in text):
+        digits = "".join(ch for ch in text if ch.isdigit())
+        return [digits] if digits else []
+    return [token for token in SEPARATORS.split(PUNCTUATION.sub("", text)) if token]
+
+def typo_keys(term):
+    # A word and every way of dropping one letter from it. Two words sharing
+    # a key are one insertion, deletion, substitution or swap apart.
+    return {term, *(term[:i] + term[i + 1:] for i in range(len(term)))}
+
+def fuzzy(term):
+    return len(term) >= 3 and term.isalpha()
+
+class GuestEntry:
+    __slots__ = ("name", "contacts", "terms", "sources")
+
+    def __init__(self, name):
+        self.name = name
+        self.contacts = []
+        self.terms = tokens(name)
+        self.sources = {}
+
+class GuestIndex:
+    # Every name and contact word maps to the guests using it. Prefixes are
+    # looked up in a sorted word list (a flattened trie) and typos in name
+    # words through their one-letter-deletion keys, so both depend on the
+    # number of distinct words, not on the number of guests.
+    def __init__(self):
+        self.guests = {}
+        self.postings = {}
+        self.typos = {}
+        self.terms = []
+        self.listed = set()
+        self.unlisted = []
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.guests)
+
+    def add(self, guest_name, source, contact=""):
+        entry = self.guests.get(guest_name)
+        if entry is None:
+            entry = self.guests[guest_name] = GuestEntry(guest_name)
+            for term in entry.terms:
+                self.add_term(term, guest_name, fuzzy(term))
+        if contact and contact not in entry.contacts:
+            entry.contacts.append(contact)
+            for term in tokens(contact):
+                if term not in entry.terms:
+                    entry.terms.append(term)
+                    self.add_term(term, guest_name, False)
+        entry.sources[source] = entry.sources.get(source, 0) + 1
+
+    def remove(self, guest_name, source):
+        entry = self.guests.get(guest_name)
+        if entry is None or source not in entry.sources:
+            return
+        entry.sources[source] -= 1
+        if not entry.sources[source]:
+            del entry.sources[source]
+        if not entry.sources:
+            del self.guests[guest_name]
+            for term in entry.terms:
+                self.remove_term(term, guest_name)
+
+    def add_term(self, term, guest_name, typo_lookup):
+        guests = self.postings.get(term)
+        if guests is None:
+            guests = self.postings[term] = set()
+            if term not in self.listed:
+                self.unlisted.append(term)
+        if typo_lookup and not guests:
+            for key in typo_keys(term):
+                self.typos.setdefault(key, set()).add(term)
+        guests.add(guest_name)
+
+    def remove_term(self, term, guest_name):
+        guests = self.postings.get(term)
+        if guests is None:
+            return
+        guests.discard(guest_name)
+        if not guests:
+            del self.postings[term]
+            if fuzzy(term):
+                for key in typo_keys(term):
+                    self.typos.get(key, set()).discard(term)
+            self.stale += 1
+
+    def sorted_terms(self):
+        # New words are merged in on the next search: a few by insertion, a
+        # bulk load or many dropped words by re-sorting once.
+        if len(self.unlisted) > INSORT_LIMIT or self.stale > len(self.terms) // 4 + INSORT_LIMIT:
+            self.terms = sorted(self.postings)
+            self.listed = set(self.terms)
+            self.unlisted = []
+            self.stale = 0
+        elif self.unlisted:
+            for term in self.unlisted:
+                if term not in self.listed:
+                    bisect.insort(self.terms, term)
+                    self.listed.add(term)
+            self.unlisted = []
+        return self.terms
+
+    def term_scores(self, query_word, prefix):
+        # Indexed words the query word may stand for: itself, one-typo
+        # neighbours and, for the word still being typed, the words it is a
+        # prefix of (shorter completions score higher).
+        scores = {}
+        if query_word in self.postings:
+            scores[query_word] = EXACT_SCORE
+        if prefix:
+            terms = self.sorted_terms()
+            start = bisect.bisect_left(terms, query_word)
+            for term in terms[start:start + PREFIX_SCAN_LIMIT]:
+                if not term.startswith(query_word):
+                    break
+                if term in self.postings and term != query_word:
+                    scores[term] = 0.5 + 0.4 * len(query_word) / len(term)
+        if fuzzy(query_word):
+            for key in typo_keys(query_word):
+                for term in self.typos.get(key, ()):
+                    scores.setdefault(term, TYPO_SCORE)
+        return scores
+
+    def word_matches(self, term_scores, within=None):
+        # Each guest's best score for one query word, optionally only for the
+        # guests in `within`. Words are applied worst first so better scores
+        # overwrite.
+        best = {}
+        for term, score in sorted(term_scores.items(), key=lambda item: item[1]):
+            guests = self.postings[term] if within is None else self.postings[term] & within.keys()
+            best.update(dict.fromkeys(guests, score))
+        return best
+
+    def single_word(self, term_scores, limit):
+        # With one query word a guest's score is that of its best matching
+        # word, so guests are read a score at a time, best first, until the
+        # limit is filled.
+        by_score = {}
+        for term, score in term_scores.items():
+            by_score.setdefault(score, []).append(term)
+        ranked, seen = [], set()
+        for score in sorted(by_score, reverse=True):
+            guests = set().union(*(self.postings[term] for term in by_score[score])) - seen
+            ranked.extend((self.guests[guest_name], round(score, 3))
+                          for guest_name in heapq.nsmallest(limit - len(ranked), guests))
+            if len(ranked) == limit:
+                break
+            seen |= guests
+        return ranked
+
+    def search(self, query, limit=10):
+        # Guests matching more of the query's words rank first, then by how
+        # closely they matched; only the last word is completed as a prefix,
+        # as it is the one still being typed. A guest matching every word is
+        # among the guests of the rarest word, so only those are scored unless
+        # none of them matches all words (a misspelt or unknown word), in
+        # which case every guest matching any word is ranked.
+        words = list(dict.fromkeys(tokens(query)))
+        word_scores = [self.term_scores(word, i == len(words) - 1) for i, word in enumerate(words)]
+        word_scores.sort(key=lambda term_scores: sum(len(self.postings[term]) for term in term_scores))
+        found = [term_scores for term_scores in word_scores if term_scores]
+        if not found:
+            return []
+        if len(word_scores) == 1:
+            return self.single_word(found[0], limit)
+        totals = self.word_matches(found[0])
+        matched = dict.fromkeys(totals, 1)
+        for term_scores in found[1:]:
+            for guest_name, score in self.word_matches(term_scores, totals).items():
+                matched[guest_name] += 1
+                totals[guest_name] += score
+        if len(found) > 1 and len(word_scores) not in matched.values():
+            totals, matched = {}, {}
+            for term_scores in found:
+                for guest_name, score in self.word_matches(term_scores).items():
+                    matched[guest_name] = matched.get(guest_name, 0) + 1
+                    totals[guest_name] = totals.get(guest_name, 0.0) + score
+        # Common names leave thousands of guests on a handful of distinct
+        # scores, so they are grouped by score and only the best groups sorted.
+        groups = {}
+        for guest_name, total in totals.items():
+            groups.setdefault((matched[guest_name], total), []).append(guest_name)
+        ranked = []
+        for key in sorted(groups, reverse=True):
+            ranked.extend(heapq.nsmallest(limit - len(ranked), groups[key]))
+            if len(ranked) == limit:
+                break
+        return [(self.guests[guest_name], round(totals[guest_name], 3)) for guest_name in ranked]
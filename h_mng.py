@@ -1,18 +1,60 @@
-import mysql.connector
+from datetime import date, timedelta
+
+import billing
+import db_pool
+import listings
+import metrics
+import storage
+from availability import parse_date
+from room_cache import RoomCache
+
+ROOM_TYPES = ["single", "double", "suite"]
+ARCHIVE_AFTER_DAYS = 30
+
+room_cache = RoomCache()
+
+class CommandError(Exception):
+    pass
 
 def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",  
-        database="hotel_management"
-    )
+    return db_pool.get_db_connection()
 
-def add_room():
-    room_number = input("Enter room number: ")
-    room_type = input("Enter room type (single, double, suite): ").lower()
-    price = float(input("Enter price per night: "))
+def load_room(room_number):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
 
+    try:
+        cursor.execute("SELECT * FROM rooms WHERE room_number = %s", (room_number,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+def load_available_rooms(room_type):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        cursor.execute("SELECT * FROM rooms WHERE type = %s AND available = TRUE", (room_type,))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_room(room_number):
+    return room_cache.get_room(room_number, load_room)
+
+@metrics.operation("show_cache_stats")
+def show_cache_stats():
+    stats = room_cache.stats()
+    print("\n--- Room Cache ---")
+    print(f"Hits: {stats['hits']}, Misses: {stats['misses']}, Hit rate: {stats['hit_rate']:.1%}")
+    print(f"Invalidations: {stats['invalidations']}, Cached rooms: {stats['cached_rooms']}")
+    print("------------------\n")
+
+def create_room(room_number, room_type, price):
+    if room_type not in ROOM_TYPES:
+        raise CommandError("Invalid room type.")
     conn = get_db_connection()
     cursor = conn.cursor()
 
@@ -22,133 +64,188 @@ def add_room():
             (room_number, room_type, price, True)
         )
         conn.commit()
-        print(f"Room {room_number} added successfully.")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
+        room_cache.invalidate(room_number, room_type)
+        return {"room_number": room_number, "type": room_type, "price": price, "available": True}
     finally:
         cursor.close()
         conn.close()
 
-def view_rooms():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+@metrics.operation("add_room")
+def add_room():
+    room_number = input("Enter room number: ")
+    room_type = input("Enter room type (single, double, suite): ").lower()
+    price = float(input("Enter price per night: "))
 
     try:
-        cursor.execute("SELECT * FROM rooms")
-        rooms = cursor.fetchall()
+        create_room(room_number, room_type, price)
+        print(f"Room {room_number} added successfully.")
+    except (CommandError, *storage.DatabaseError) as err:
+        print(f"Error: {err}")
+
+@metrics.operation("view_rooms")
+def view_rooms():
+    try:
         print("\n--- Room Details ---")
-        for room in rooms:
-            status = "Available" if room['available'] else "Occupied"
-            print(f"Room Number: {room['room_number']}, Type: {room['type'].capitalize()}, Price: ${room['price']}, Status: {status}")
+        for room in listings.iter_rooms():
+            room_cache.put_room(room)
+            print(listings.format_room(room))
         print("---------------------\n")
-    except mysql.connector.Error as err:
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
-    finally:
-        cursor.close()
-        conn.close()
 
-def update_room_availability(room_number, availability):
+def update_room_availability(room_number, availability, cursor=None):
+    # With a cursor the update is part of the caller's transaction, which
+    # invalidates the cached room once it has committed.
+    if cursor is not None:
+        cursor.execute("UPDATE rooms SET available = %s WHERE room_number = %s", (availability, room_number))
+        return
+
     conn = get_db_connection()
     cursor = conn.cursor()
 
     try:
         cursor.execute("UPDATE rooms SET available = %s WHERE room_number = %s", (availability, room_number))
         conn.commit()
-    except mysql.connector.Error as err:
+        room_cache.invalidate(room_number)
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
     finally:
         cursor.close()
         conn.close()
 
+def claim_room(cursor, room_number):
+    cursor.execute(
+        "UPDATE rooms SET available = FALSE WHERE room_number = %s AND available = TRUE",
+        (room_number,)
+    )
+    return cursor.rowcount == 1
+
+def reserve_room(guest_name, contact_details, room_type, duration, room_number=None, attempts=5):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        for _ in range(attempts):
+            if room_number is not None:
+                candidates = [room_number]
+            else:
+                cursor.execute(
+                    "SELECT room_number FROM rooms WHERE type = %s AND available = TRUE LIMIT %s",
+                    (room_type, attempts)
+                )
+                candidates = [row[0] for row in cursor.fetchall()]
+                conn.commit()
+            if not candidates:
+                return None
+
+            for candidate in candidates:
+                if claim_room(cursor, candidate):
+                    cursor.execute(
+                        "INSERT INTO bookings (room_number, guest_name, contact_details, duration) VALUES (%s, %s, %s, %s)",
+                        (candidate, guest_name, contact_details, duration)
+                    )
+                    conn.commit()
+                    room_cache.invalidate(candidate, room_type)
+                    return candidate
+                conn.rollback()
+
+            if room_number is not None:
+                return None
+        return None
+    except storage.DatabaseError:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+@metrics.operation("book_room")
 def book_room():
     guest_name = input("Enter guest name: ").strip()
     contact_details = input("Enter contact details: ").strip()
     room_type = input("Enter room type to book (single, double, suite): ").lower()
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
     try:
-        cursor.execute("SELECT * FROM rooms WHERE type = %s AND available = TRUE", (room_type,))
-        available_rooms = cursor.fetchall()
+        available_rooms = room_cache.get_available(room_type, load_available_rooms)
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
+        return
 
-        if not available_rooms:
-            print(f"No available {room_type} rooms.")
-            return
+    if not available_rooms:
+        print(f"No available {room_type} rooms.")
+        return
 
-        print(f"Available {room_type} rooms: {', '.join([room['room_number'] for room in available_rooms])}")
-        room_number = input("Enter room number to book: ").strip()
+    print(f"Available {room_type} rooms: {', '.join([room['room_number'] for room in available_rooms])}")
+    room_number = input("Enter room number to book: ").strip()
+    if room_number not in [room['room_number'] for room in available_rooms]:
+        print("Invalid room selection.")
+        return
 
-        try:
-            duration = int(input("Enter duration of stay (nights): "))
-            if duration <= 0:
-                print("Duration must be at least 1 night.")
-                return
-        except ValueError:
-            print("Invalid duration entered.")
+    try:
+        duration = int(input("Enter duration of stay (nights): "))
+        if duration <= 0:
+            print("Duration must be at least 1 night.")
             return
+    except ValueError:
+        print("Invalid duration entered.")
+        return
 
-        cursor.execute(
-            "INSERT INTO bookings (room_number, guest_name, contact_details, duration) VALUES (%s, %s, %s, %s)",
-            (room_number, guest_name, contact_details, duration)
-        )
-        update_room_availability(room_number, False)
-        conn.commit()
+    try:
+        if reserve_room(guest_name, contact_details, room_type, duration, room_number) is None:
+            print(f"Room {room_number} was just booked by another desk. Please choose another room.")
+            return
         print(f"Room {room_number} booked successfully for {guest_name}.")
-    except mysql.connector.Error as err:
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
-    finally:
-        cursor.close()
-        conn.close()
 
+@metrics.operation("view_bookings")
 def view_bookings():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
     try:
-        cursor.execute("SELECT * FROM bookings")
-        bookings = cursor.fetchall()
-
         print("\n--- Current Bookings ---")
-        if not bookings:
+        shown = 0
+        for shown, booking in enumerate(listings.iter_bookings(), start=1):
+            print(f"{shown}. {listings.format_booking(booking)}")
+        if not shown:
             print("No current bookings.")
-        else:
-            for idx, booking in enumerate(bookings, start=1):
-                print(f"{idx}. Room {booking['room_number']} - Guest: {booking['guest_name']}, Contact: {booking['contact_details']}, Duration: {booking['duration']} nights")
         print("------------------------\n")
-    except mysql.connector.Error as err:
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
-    finally:
-        cursor.close()
-        conn.close()
 
-def cancel_booking():
+def cancel_reservation(booking_id=None):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
 
     try:
-        cursor.execute("SELECT * FROM bookings ORDER BY id DESC LIMIT 1")
-        last_booking = cursor.fetchone()
+        if booking_id is None:
+            cursor.execute("SELECT * FROM bookings ORDER BY id DESC LIMIT 1")
+        else:
+            cursor.execute("SELECT * FROM bookings WHERE id = %s", (booking_id,))
+        booking = cursor.fetchone()
 
-        if not last_booking:
-            print("No bookings to cancel.")
-            return
+        if not booking:
+            return None
 
-        room_number = last_booking['room_number']
-        cursor.execute("DELETE FROM bookings WHERE id = %s", (last_booking['id'],))
-        update_room_availability(room_number, True)
+        cursor.execute("DELETE FROM bookings WHERE id = %s", (booking['id'],))
+        update_room_availability(booking['room_number'], True, cursor)
         conn.commit()
-        print(f"Cancelled booking for {last_booking['guest_name']} in room {room_number}.")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
+        room_cache.invalidate(booking['room_number'])
+        return booking
     finally:
         cursor.close()
         conn.close()
 
-def check_in():
-    print("\n--- Check-In Guest ---")
-    room_number = input("Enter room number: ").strip()
+@metrics.operation("cancel_booking")
+def cancel_booking():
+    try:
+        last_booking = cancel_reservation()
+        if not last_booking:
+            print("No bookings to cancel.")
+            return
+        print(f"Cancelled booking for {last_booking['guest_name']} in room {last_booking['room_number']}.")
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
 
+def check_in_room(room_number):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
 
@@ -157,84 +254,196 @@ def check_in():
         booking = cursor.fetchone()
 
         if not booking:
-            print("No booking found for this room.")
-            return
+            raise CommandError("No booking found for this room.")
 
-        guest_name = booking['guest_name']
-        print(f"Guest {guest_name} checked into room {room_number} successfully.")
+        # The stay moves to check_ins, which checkout and the night audit bill.
+        cursor.execute(
+            "INSERT INTO check_ins (room_number, guest_name, check_in_date, duration) VALUES (%s, %s, %s, %s)",
+            (room_number, booking['guest_name'], date.today().isoformat(), booking['duration'])
+        )
         cursor.execute("DELETE FROM bookings WHERE id = %s", (booking['id'],))
         conn.commit()
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
+        return booking
     finally:
         cursor.close()
         conn.close()
 
-def check_out():
-    print("\n--- Check-Out Guest ---")
+@metrics.operation("check_in")
+def check_in():
+    print("\n--- Check-In Guest ---")
     room_number = input("Enter room number: ").strip()
 
+    try:
+        booking = check_in_room(room_number)
+        print(f"Guest {booking['guest_name']} checked into room {room_number} successfully.")
+    except CommandError as err:
+        print(err)
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
+
+def check_out_room(room_number):
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
 
     try:
-        cursor.execute("SELECT * FROM bookings WHERE room_number = %s", (room_number,))
-        booking = cursor.fetchone()
+        stay = billing.bill_checkout(conn, room_number)
+    finally:
+        conn.close()
 
-        if not booking:
-            print("No booking found for this room.")
-            return
+    if not stay:
+        raise CommandError("No guest is checked into this room.")
+    room_cache.invalidate(room_number, stay['type'])
+    return {"room_number": room_number, "guest_name": stay['guest_name'], "room_charge": stay['room_charge'],
+            "service_charge": stay['service_charge'], "total_charge": stay['room_charge'] + stay['service_charge']}
 
-        duration = booking['duration']
-        cursor.execute("SELECT * FROM rooms WHERE room_number = %s", (room_number,))
-        room = cursor.fetchone()
+@metrics.operation("check_out")
+def check_out():
+    print("\n--- Check-Out Guest ---")
+    room_number = input("Enter room number: ").strip()
 
-        if not room:
-            print("Room details not found.")
-            return
+    try:
+        bill = check_out_room(room_number)
+        print(f"Guest {bill['guest_name']} checked out from room {room_number} successfully.")
+        print(f"Room Charge: ${bill['room_charge']}, Service Charge: ${bill['service_charge']}")
+        print(f"Total Charge: ${bill['total_charge']}\n")
+    except CommandError as err:
+        print(err)
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
 
-        total_charge = room['price'] * duration
-        update_room_availability(room_number, True)
-        conn.commit()
+@metrics.operation("night_audit")
+def night_audit():
+    print("\n--- Night Audit ---")
+    try:
+        audit_date = parse_date(input("Enter audit date (YYYY-MM-DD, blank for today): ").strip())
+    except ValueError:
+        print("Invalid date entered.")
+        return
+    room_numbers = [room.strip() for room in input("Enter room numbers (comma-separated, blank for all due): ").split(",")
+                    if room.strip()]
+
+    conn = get_db_connection()
 
-        print(f"Guest {booking['guest_name']} checked out from room {room_number} successfully.")
-        print(f"Total Charge: ${total_charge}\n")
-    except mysql.connector.Error as err:
+    try:
+        departures = billing.bill_departures(conn, room_numbers, audit_date)
+        if not departures:
+            print("No departures due.")
+            return
+
+        for row in departures:
+            room_cache.invalidate(row['room_number'], row['type'])
+            print(f"Room {row['room_number']}: {row['guest_name']} billed ${row['room_charge'] + row['service_charge']}")
+        print(f"Checked out {len(departures)} guests.\n")
+    except storage.DatabaseError as err:
         print(f"Error: {err}")
     finally:
-        cursor.close()
         conn.close()
 
-def add_service():
-    print("\n--- Add Service ---")
-    room_number = input("Enter room number: ").strip()
+def add_room_service(room_number, service, cost):
+    room = get_room(room_number)
+    if not room or room['available']:
+        raise CommandError("Room is either not booked or does not exist.")
 
     conn = get_db_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute("SELECT * FROM rooms WHERE room_number = %s", (room_number,))
-        room = cursor.fetchone()
-
-        if not room or room['available']:
-            print("Room is either not booked or does not exist.")
-            return
-
-        service = input("Enter service (e.g., room service, laundry): ").strip().lower()
-        cost = float(input("Enter cost of the service: "))
-
         cursor.execute(
             "INSERT INTO services (room_number, service, cost) VALUES (%s, %s, %s)",
             (room_number, service, cost)
         )
         conn.commit()
+        return {"room_number": room_number, "service": service, "cost": cost}
+    finally:
+        cursor.close()
+        conn.close()
+
+@metrics.operation("add_service")
+def add_service():
+    print("\n--- Add Service ---")
+    room_number = input("Enter room number: ").strip()
+
+    try:
+        room = get_room(room_number)
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
+        return
+
+    if not room or room['available']:
+        print("Room is either not booked or does not exist.")
+        return
+
+    service = input("Enter service (e.g., room service, laundry): ").strip().lower()
+    cost = float(input("Enter cost of the service: "))
+
+    try:
+        add_room_service(room_number, service, cost)
         print(f"Service '{service}' added to room {room_number} successfully.")
-    except mysql.connector.Error as err:
+    except (CommandError, *storage.DatabaseError) as err:
         print(f"Error: {err}")
+
+def list_bills(guest_name=None, limit=100):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        if guest_name:
+            cursor.execute("SELECT * FROM bills WHERE guest_name = %s ORDER BY id DESC LIMIT %s", (guest_name, limit))
+        else:
+            cursor.execute("SELECT * FROM bills ORDER BY id DESC LIMIT %s", (limit,))
+        return cursor.fetchall()
     finally:
         cursor.close()
         conn.close()
 
+def archive_settled_bills(before=None):
+    before = parse_date(before) if before else date.today() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    conn = get_db_connection()
+
+    try:
+        return billing.archive_settled(conn, before.isoformat())
+    finally:
+        conn.close()
+
+def bills_between(start=None, end=None):
+    conn = get_db_connection()
+
+    try:
+        return billing.bills_between(conn, parse_date(start).isoformat(), parse_date(end).isoformat())
+    finally:
+        conn.close()
+
+@metrics.operation("archive_bills")
+def archive_bills():
+    print("\n--- Archive Settled Bills ---")
+    try:
+        before = input(f"Archive bills settled before (YYYY-MM-DD, blank for {ARCHIVE_AFTER_DAYS} days ago): ").strip()
+        print(f"Archived {archive_settled_bills(before)} bills.\n")
+    except ValueError:
+        print("Invalid date entered.")
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
+
+@metrics.operation("view_bills_between")
+def view_bills_between():
+    print("\n--- Bills by Date Range ---")
+    try:
+        start = input("Enter first day (YYYY-MM-DD, blank for today): ").strip()
+        end = input("Enter last day (YYYY-MM-DD, blank for today): ").strip()
+        rows = bills_between(start, end)
+    except ValueError:
+        print("Invalid date entered.")
+        return
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
+        return
+
+    if not rows:
+        print("No bills in that range.")
+        return
+    for row in rows:
+        print(f"{row['billed_on']}: {row['guest_name']}, Room {row['room_number']}, Total: ${row['total']}")
+    print(f"{len(rows)} bills, ${sum(row['total'] for row in rows)} in total.\n")
+
 def main_menu():
     while True:
         print("========== Hotel Management System ==========")
@@ -246,10 +455,16 @@ def main_menu():
         print("6. Check In")
         print("7. Check Out")
         print("8. Add Service")
-        print("9. Exit")
+        print("9. Search Rooms")
+        print("10. Search Bookings")
+        print("11. Room Cache Statistics")
+        print("12. Night Audit")
+        print("13. Archive Settled Bills")
+        print("14. Bills by Date Range")
+        print("15. Exit")
         print("==============================================")
 
-        choice = input("Enter your choice (1-9): ").strip()
+        choice = input("Enter your choice (1-15): ").strip()
 
         if choice == "1":
             add_room()
@@ -268,6 +483,18 @@ def main_menu():
         elif choice == "8":
             add_service()
         elif choice == "9":
+            listings.search_rooms()
+        elif choice == "10":
+            listings.search_bookings()
+        elif choice == "11":
+            show_cache_stats()
+        elif choice == "12":
+            night_audit()
+        elif choice == "13":
+            archive_bills()
+        elif choice == "14":
+            view_bills_between()
+        elif choice == "15":
             print("Exiting Hotel Management System. Goodbye!")
             break
         else:
@@ -0,0 +1,113 @@
+import sys
+from array import array
+from datetime import date
+
+class Room:
+    __slots__ = ("type", "price", "available")
+
+    def __init__(self, room_type, price, available=True):
+        self.type = sys.intern(room_type)
+        self.price = price
+        self.available = available
+
+class Booking:
+    __slots__ = ("room_number", "guest_name", "contact_details", "duration", "check_in_date")
+
+    def __init__(self, room_number, guest_name, contact_details, duration, check_in_date=None):
+        self.room_number = room_number
+        self.guest_name = guest_name
+        self.contact_details = contact_details
+        self.duration = duration
+        self.check_in_date = check_in_date or date.today().isoformat()
+
+class CheckIn:
+    __slots__ = ("room_number", "guest_name", "check_in_date", "duration")
+
+    def __init__(self, room_number, guest_name, check_in_date=None, duration=1):
+        self.room_number = room_number
+        self.guest_name = guest_name
+        self.check_in_date = check_in_date or date.today().isoformat()
+        self.duration = duration
+
+class Bill:
+    __slots__ = ("room_charge", "service_charge", "total", "room_number", "nights", "check_out_date")
+
+    def __init__(self, room_charge, service_charge, total, room_number=None, nights=0, check_out_date=None):
+        self.room_charge = room_charge
+        self.service_charge = service_charge
+        self.total = total
+        self.room_number = room_number
+        self.nights = nights
+        self.check_out_date = check_out_date
+
+class ServiceLog:
+    # Services are stored column by column: interned room numbers and
+    # descriptions plus a packed array of costs. An entry is open until its
+    # room checks out and then carries the billed guest's name; the running
+    # total per room only counts open entries, so the room's next guest
+    # starts from nothing. Positions of open entries per room are indexed on
+    # the first check-out rather than while loading.
+    def __init__(self):
+        self.room_numbers = []
+        self.names = []
+        self.costs = array("d")
+        self.guests = []
+        self.totals = {}
+        self.open = None
+
+    def append(self, room_number, name, cost, guest_name=None):
+        room_number = sys.intern(room_number)
+        self.room_numbers.append(room_number)
+        self.names.append(sys.intern(name))
+        self.costs.append(cost)
+        self.guests.append(guest_name)
+        if guest_name is None:
+            if self.open is not None:
+                self.open.setdefault(room_number, []).append(len(self.costs) - 1)
+            self.totals[room_number] = self.totals.get(room_number, 0.0) + cost
+
+    def total_for(self, room_number):
+        return self.totals.get(room_number, 0.0)
+
+    def settle(self, room_number, guest_name):
+        if self.open is None:
+            self.reindex()
+        for position in self.open.pop(room_number, ()):
+            self.guests[position] = guest_name
+        self.totals.pop(room_number, None)
+
+    def billed_to(self, guest_names):
+        return [entry for entry in self.entries() if entry[3] in guest_names]
+
+    def remove_settled(self, guest_names):
+        kept = [entry for entry in self.entries() if entry[3] not in guest_names]
+        if len(kept) == len(self.costs):
+            return
+        self.room_numbers[:] = [entry[0] for entry in kept]
+        self.names[:] = [entry[1] for entry in kept]
+        self.costs = array("d", (entry[2] for entry in kept))
+        self.guests[:] = [entry[3] for entry in kept]
+        self.open = None
+
+    def reindex(self):
+        self.open = {}
+        for position, (room_number, guest_name) in enumerate(zip(self.room_numbers, self.guests)):
+            if guest_name is None:
+                self.open.setdefault(room_number, []).append(position)
+
+    def clear(self):
+        self.room_numbers.clear()
+        self.names.clear()
+        del self.costs[:]
+        self.guests.clear()
+        self.totals.clear()
+        self.open = None
+
+    def entries(self):
+        return zip(self.room_numbers, self.names, self.costs, self.guests)
+
+    def __len__(self):
+        return len(self.costs)
+
+    def __iter__(self):
+        return zip(self.room_numbers, self.names, self.costs)
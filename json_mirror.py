@@ -0,0 +1,118 @@
+import json
+import os
+
+import metrics
+
+class JsonlMirror:
+    # Append-only JSON Lines file. An updated record is appended as a new
+    # version and a deleted one as a tombstone; the .idx file maps each key to the
+    # offset of its latest line so lookups never rescan the file.
+    def __init__(self, path, key):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.key = key
+        self.offsets = None
+
+    def load_index(self):
+        self.offsets = {}
+        if not os.path.exists(self.path):
+            return
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                for line in f:
+                    key, offset = line.rstrip("\n").rsplit("\t", 1)
+                    offset = int(offset)
+                    if offset < 0:
+                        self.offsets.pop(key, None)
+                    else:
+                        self.offsets[key] = offset
+            if self.index_matches_file():
+                return
+        self.rebuild_index()
+
+    def index_matches_file(self):
+        size = os.path.getsize(self.path)
+        if not self.offsets:
+            return size == 0
+        with open(self.path, "rb") as f:
+            f.seek(max(self.offsets.values()))
+            f.readline()
+            return f.tell() == size
+
+    def rebuild_index(self):
+        self.offsets = {}
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                offset = f.tell()
+                for line in iter(f.readline, b""):
+                    record = json.loads(line)
+                    key = str(record[self.key])
+                    if record.get("_deleted"):
+                        self.offsets.pop(key, None)
+                    else:
+                        self.offsets[key] = offset
+                    offset = f.tell()
+        with open(self.index_path, "w") as f:
+            f.writelines(f"{key}\t{offset}\n" for key, offset in self.offsets.items())
+
+    def ensure_index(self):
+        if self.offsets is None:
+            self.load_index()
+
+    def extend(self, records):
+        self.ensure_index()
+        index_lines = []
+        with metrics.timer("hotel_save_seconds", target="mirror"), open(self.path, "ab") as f:
+            for record in records:
+                key = str(record[self.key])
+                offset = f.tell()
+                f.write((json.dumps(record, default=str) + "\n").encode())
+                if record.get("_deleted"):
+                    self.offsets.pop(key, None)
+                    offset = -1
+                else:
+                    self.offsets[key] = offset
+                index_lines.append(f"{key}\t{offset}\n")
+        with open(self.index_path, "a") as f:
+            f.writelines(index_lines)
+
+    def get(self, key):
+        self.ensure_index()
+        offset = self.offsets.get(str(key))
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def get_many(self, keys):
+        self.ensure_index()
+        located = sorted((self.offsets[str(key)], str(key)) for key in keys if str(key) in self.offsets)
+        found = {}
+        if located:
+            with open(self.path, "rb") as f:
+                for offset, key in located:
+                    f.seek(offset)
+                    found[key] = json.loads(f.readline())
+        return found
+
+    def records(self):
+        self.ensure_index()
+        if not self.offsets:
+            return
+        with open(self.path, "rb") as f:
+            for offset in sorted(self.offsets.values()):
+                f.seek(offset)
+                yield json.loads(f.readline())
+
+    def count(self):
+        self.ensure_index()
+        return len(self.offsets)
+
+    def rewrite(self, records):
+        temp_path = self.path + ".tmp"
+        with metrics.timer("hotel_save_seconds", target="mirror"), open(temp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+        os.replace(temp_path, self.path)
+        self.rebuild_index()
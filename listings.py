@@ -0,0 +1,105 @@
+import db_pool
+import metrics
+import storage
+
+PAGE_SIZE = 200
+
+def stream_pages(base_query, conditions, params, key, page_size):
+    last_key = None
+    while True:
+        page_conditions = list(conditions)
+        page_params = list(params)
+        if last_key is not None:
+            page_conditions.append(f"{key} > %s")
+            page_params.append(last_key)
+        query = base_query
+        if page_conditions:
+            query += " WHERE " + " AND ".join(page_conditions)
+        query += f" ORDER BY {key} LIMIT %s"
+        page_params.append(page_size)
+
+        # The page is fetched and the connection handed back before any row
+        # is yielded, so a caller paused between rows holds no connection.
+        conn = db_pool.get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(query, tuple(page_params))
+            rows = cursor.fetchmany(page_size)
+        finally:
+            cursor.close()
+            conn.close()
+        if rows:
+            last_key = rows[-1][key]
+        yield from rows
+        if len(rows) < page_size:
+            return
+
+def iter_rooms(room_type=None, available=None, room_from=None, room_to=None, page_size=PAGE_SIZE):
+    conditions = []
+    params = []
+    if room_type:
+        conditions.append("type = %s")
+        params.append(room_type)
+    if available is not None:
+        conditions.append("available = %s")
+        params.append(available)
+    if room_from:
+        conditions.append("room_number >= %s")
+        params.append(room_from)
+    if room_to:
+        conditions.append("room_number <= %s")
+        params.append(room_to)
+    return stream_pages("SELECT * FROM rooms", conditions, params, "room_number", page_size)
+
+def iter_bookings(guest_name=None, room_number=None, page_size=PAGE_SIZE):
+    conditions = []
+    params = []
+    if guest_name:
+        conditions.append("guest_name LIKE %s")
+        params.append(guest_name + "%")
+    if room_number:
+        conditions.append("room_number = %s")
+        params.append(room_number)
+    return stream_pages("SELECT * FROM bookings", conditions, params, "id", page_size)
+
+def format_room(room):
+    status = "Available" if room['available'] else "Occupied"
+    return f"Room Number: {room['room_number']}, Type: {room['type'].capitalize()}, Price: ${room['price']}, Status: {status}"
+
+def format_booking(booking):
+    return f"Room {booking['room_number']} - Guest: {booking['guest_name']}, Contact: {booking['contact_details']}, Duration: {booking['duration']} nights"
+
+def browse(rows, formatter, page_size=20):
+    shown = 0
+    for row in rows:
+        shown += 1
+        print(f"{shown}. {formatter(row)}")
+        if shown % page_size == 0:
+            if input("-- Enter for more, q to stop -- ").strip().lower() == "q":
+                break
+    if not shown:
+        print("No matching records.")
+    return shown
+
+@metrics.operation("search_rooms")
+def search_rooms():
+    print("\n--- Search Rooms (leave blank to skip a filter) ---")
+    room_type = input("Room type (single, double, suite): ").strip().lower() or None
+    status = input("Status (available, occupied): ").strip().lower()
+    available = {"available": True, "occupied": False}.get(status)
+    room_from = input("From room number: ").strip() or None
+    room_to = input("To room number: ").strip() or None
+    try:
+        browse(iter_rooms(room_type, available, room_from, room_to), format_room)
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
+
+@metrics.operation("search_bookings")
+def search_bookings():
+    print("\n--- Search Bookings (leave blank to skip a filter) ---")
+    guest_name = input("Guest name starts with: ").strip() or None
+    room_number = input("Room number: ").strip() or None
+    try:
+        browse(iter_bookings(guest_name, room_number), format_booking)
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
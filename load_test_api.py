@@ -0,0 +1,116 @@
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+ROOM_TYPES = ["single", "double", "suite"]
+
+def request(host, port, method, path, body=None):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        data = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, data, headers)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+def seed_rooms(host, port, count, prefix):
+    for i in range(count):
+        status, _ = request(host, port, "POST", "/rooms",
+                            {"room_number": f"{prefix}{i}", "type": ROOM_TYPES[i % 3], "price": 100.0})
+        if status not in (201, 409):
+            raise SystemExit(f"Seeding room {prefix}{i} failed with HTTP {status}")
+
+def pick_request(rng, room_count, prefix, sequence):
+    roll = rng.random()
+    if roll < 0.6:
+        return "GET", f"/rooms/{prefix}{rng.randrange(room_count)}", None
+    if roll < 0.8:
+        return "GET", f"/rooms?type={rng.choice(ROOM_TYPES)}&available=true&limit=20", None
+    if roll < 0.95:
+        return "POST", "/bookings", {"guest_name": f"Load Guest {next(sequence)}", "contact_details": "api-load-test",
+                                     "type": rng.choice(ROOM_TYPES), "duration": 1}
+    return "GET", "/bookings?limit=20", None
+
+def run_level(host, port, concurrency, total, room_count, prefix, seed):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    sequence = iter(range(seed * 10_000_000, (seed + 1) * 10_000_000))
+    per_worker = total // concurrency
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        local_latencies = []
+        local_statuses = {}
+        for _ in range(per_worker):
+            method, path, body = pick_request(rng, room_count, prefix, sequence)
+            start = time.perf_counter()
+            try:
+                status, _ = request(host, port, method, path, body)
+            except OSError:
+                status = "error"
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return elapsed, latencies, statuses
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure hotel API throughput and latency at increasing concurrency.")
+    parser.add_argument("--url", help="base URL of a running api_server.py; by default one is started in-process")
+    parser.add_argument("--sqlite", metavar="PATH", default="api_load_test.db",
+                        help="SQLite database for the in-process server")
+    parser.add_argument("--workers", type=int, default=8, help="worker threads for the in-process server")
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        import api_server
+        import db_pool
+        import storage
+        db_pool.configure(lambda: storage.sqlite_connect(args.sqlite), size=args.workers)
+        server = api_server.make_server("127.0.0.1", 0, args.workers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = "127.0.0.1", server.server_port
+
+    prefix = f"API{args.seed}-"
+    try:
+        seed_rooms(host, port, args.rooms, prefix)
+        print(f"{'concurrency':>12}{'req/sec':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+        for level in [int(value) for value in args.concurrency.split(",")]:
+            elapsed, latencies, statuses = run_level(host, port, level, args.requests, args.rooms, prefix, args.seed)
+            status_summary = ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str))
+            print(f"{level:>12}{len(latencies) / elapsed:>10.0f}{percentile(latencies, 0.5) * 1000:>10.2f}"
+                  f"{percentile(latencies, 0.95) * 1000:>10.2f}{percentile(latencies, 0.99) * 1000:>10.2f}  {status_summary}")
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import db_pool
+import h_mng
+
+ROOM_TYPES = ["single", "double", "suite"]
+CONTACT = "load-test"
+
+def seed_rooms(count):
+    conn = db_pool.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM bookings WHERE contact_details = %s", (CONTACT,))
+        cursor.execute("DELETE FROM rooms WHERE room_number LIKE %s", ("LT-%",))
+        cursor.executemany(
+            "INSERT INTO rooms (room_number, type, price, available) VALUES (%s, %s, %s, TRUE)",
+            [(f"LT-{i}", ROOM_TYPES[i % len(ROOM_TYPES)], 100.0) for i in range(count)]
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def find_double_bookings():
+    conn = db_pool.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT room_number, COUNT(*) FROM bookings WHERE contact_details = %s "
+            "GROUP BY room_number HAVING COUNT(*) > 1",
+            (CONTACT,)
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+async def fire_bookings(total, concurrency):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    latencies = []
+    errors = []
+
+    def reserve(i):
+        start = time.perf_counter()
+        room = h_mng.reserve_room(f"Guest {i}", CONTACT, ROOM_TYPES[i % len(ROOM_TYPES)], 1)
+        latencies.append(time.perf_counter() - start)
+        return room
+
+    async def book(i):
+        try:
+            return await asyncio.to_thread(reserve, i)
+        except Exception as err:
+            errors.append(err)
+            return None
+
+    start = time.perf_counter()
+    rooms = await asyncio.gather(*(book(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    return rooms, latencies, errors, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Fire concurrent bookings at h_mng.reserve_room and check for double-bookings.")
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--sqlite", metavar="PATH", help="run against an embedded SQLite database at PATH instead of MySQL")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        import storage
+        db_pool.configure(lambda: storage.sqlite_connect(args.sqlite), size=args.concurrency)
+    else:
+        db_pool.configure(size=args.concurrency)
+
+    seed_rooms(args.rooms)
+    rooms, latencies, errors, elapsed = asyncio.run(fire_bookings(args.bookings, args.concurrency))
+    booked = [room for room in rooms if room is not None]
+    duplicates = find_double_bookings()
+    latencies.sort()
+
+    print(f"Bookings attempted: {args.bookings}, succeeded: {len(booked)}, "
+          f"no room left: {args.bookings - len(booked) - len(errors)}, errors: {len(errors)}")
+    print(f"Distinct rooms booked: {len(set(booked))} of {args.rooms}")
+    print(f"Throughput: {args.bookings / elapsed:.0f} bookings/sec over {elapsed:.2f}s")
+    if latencies:
+        print(f"Latency p50: {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+              f"p99: {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    if duplicates or len(booked) != len(set(booked)):
+        print(f"FAILED: {len(duplicates)} rooms were double-booked.")
+        raise SystemExit(1)
+    print("OK: no double-bookings.")
+
+if __name__ == "__main__":
+    main()
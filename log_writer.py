@@ -0,0 +1,94 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+STOP = object()
+
+class LogWriter:
+    def __init__(self, path, batch_size=100, flush_interval=1.0, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def write(self, entry):
+        if self.thread is None:
+            self.start()
+        self.queue.put(entry)
+
+    def flush(self, timeout=5.0):
+        if self.thread is None:
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+        if thread is not None:
+            self.queue.put(STOP)
+            thread.join()
+
+    def run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is None or item is STOP or isinstance(item, threading.Event):
+                self.write_batch(batch)
+                batch = []
+                deadline = None
+                if item is STOP:
+                    return
+                if item is not None:
+                    item.set()
+                continue
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size:
+                self.write_batch(batch)
+                batch = []
+                deadline = None
+
+    def write_batch(self, batch):
+        if not batch:
+            return
+        try:
+            self.rotate_if_needed()
+            with open(self.path, "a") as log_file:
+                log_file.write("".join(json.dumps(entry) + "\n" for entry in batch))
+        except OSError as err:
+            print(f"Error writing log: {err}")
+
+    def rotate_if_needed(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < self.max_bytes:
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
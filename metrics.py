@@ -0,0 +1,229 @@
+import atexit
+import bisect
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+ENABLED = os.environ.get("HOTEL_METRICS", "1") != "0"
+EXPORT_PATH = os.environ.get("HOTEL_METRICS_EXPORT", "")
+EXPORT_INTERVAL = float(os.environ.get("HOTEL_METRICS_INTERVAL", "10"))
+PROFILE_OPERATION = os.environ.get("HOTEL_PROFILE", "")
+
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Registry:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def observe(self, name, value, buckets=BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def current_operation(self):
+        return getattr(self.local, "operation", None)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+registry = Registry()
+profile_requests = {PROFILE_OPERATION} if PROFILE_OPERATION else set()
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+def prometheus_text():
+    lines = []
+    with registry.lock:
+        histograms = sorted(registry.histograms.items())
+        counters = sorted(registry.counters.items())
+        gauges = sorted(registry.gauges.items())
+    typed = set()
+    for (name, labels), histogram in histograms:
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+    for (name, labels), value in counters:
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    for (name, labels), value in gauges:
+        if name not in typed:
+            lines.append(f"# TYPE {name} gauge")
+            typed.add(name)
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+def snapshot():
+    with registry.lock:
+        return {
+            "timestamp": time.time(),
+            "histograms": [{"name": name, "labels": dict(labels), "count": histogram.count, "sum": histogram.sum,
+                            "buckets": dict(zip(map(str, histogram.buckets + ("+Inf",)), histogram.counts))}
+                           for (name, labels), histogram in registry.histograms.items()],
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in registry.counters.items()],
+            "gauges": [{"name": name, "labels": dict(labels), "value": value}
+                       for (name, labels), value in registry.gauges.items()],
+        }
+
+def export(path=None):
+    path = path or EXPORT_PATH
+    if not path:
+        return
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        if path.endswith(".json"):
+            json.dump(snapshot(), f, indent=4)
+        else:
+            f.write(prometheus_text())
+    os.replace(temp_path, path)
+
+def export_periodically(path, interval):
+    def run():
+        while True:
+            time.sleep(interval)
+            export(path)
+    threading.Thread(target=run, name="metrics-export", daemon=True).start()
+    atexit.register(export, path)
+
+def profile_next(operation):
+    profile_requests.add(operation)
+
+def run_profiled(name, function, args, kwargs):
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        allocations = tracemalloc.take_snapshot().statistics("lineno")[:15]
+        tracemalloc.stop()
+        report = io.StringIO()
+        report.write(f"Profile of {name}: {current / 1024:.1f} KiB allocated, {peak / 1024:.1f} KiB peak\n\n")
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(25)
+        report.write("Top allocations:\n")
+        for statistic in allocations:
+            report.write(f"{statistic}\n")
+        with open(f"profile-{name}-{int(time.time())}.txt", "w") as f:
+            f.write(report.getvalue())
+
+def operation(name):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            outer = registry.current_operation()
+            outer_queries = getattr(registry.local, "queries", 0)
+            registry.local.operation = name
+            registry.local.queries = 0
+            start = time.perf_counter()
+            try:
+                if name in profile_requests:
+                    profile_requests.discard(name)
+                    return run_profiled(name, function, args, kwargs)
+                return function(*args, **kwargs)
+            finally:
+                registry.observe("hotel_operation_seconds", time.perf_counter() - start, operation=name)
+                registry.observe("hotel_operation_queries", registry.local.queries, COUNT_BUCKETS, operation=name)
+                registry.local.operation = outer
+                registry.local.queries = outer_queries + registry.local.queries
+        return wrapper
+    return decorate
+
+@contextlib.contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if ENABLED:
+            registry.observe(name, time.perf_counter() - start, operation=registry.current_operation() or "none", **labels)
+
+def record_query(query, elapsed):
+    statement = query.lstrip().split(None, 1)[0].upper() if query.strip() else "UNKNOWN"
+    operation_name = registry.current_operation() or "none"
+    registry.observe("hotel_query_seconds", elapsed, operation=operation_name, statement=statement)
+    registry.increment("hotel_queries_total", operation=operation_name, statement=statement)
+    registry.local.queries = getattr(registry.local, "queries", 0) + 1
+
+class InstrumentedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, query, params=(), *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query, params, *args, **kwargs)
+        finally:
+            record_query(query, time.perf_counter() - start)
+
+    def executemany(self, query, seq_of_params, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, seq_of_params, *args, **kwargs)
+        finally:
+            record_query(query, time.perf_counter() - start)
+
+if EXPORT_PATH:
+    export_periodically(EXPORT_PATH, EXPORT_INTERVAL)
@@ -0,0 +1,307 @@
+import argparse
+import atexit
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import db_pool
+import metrics
+import storage
+
+SYNC_INTERVAL = float(os.environ.get("HOTEL_MIRROR_SYNC_INTERVAL", "1.0"))
+BATCH_SIZE = int(os.environ.get("HOTEL_MIRROR_SYNC_BATCH", "500"))
+LOCK_FILE = "mirrors.lock"
+
+def plain(value):
+    if isinstance(value, bool):
+        return int(value)
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+def canonical(record):
+    # A row as its mirror line would hold it: JSON with decimals and dates as
+    # strings, and booleans as the 0/1 MySQL returns for them.
+    return json.dumps({key: plain(value) for key, value in record.items()}, sort_keys=True)
+
+def row_digest(record):
+    return int.from_bytes(hashlib.blake2b(canonical(record).encode(), digest_size=8).digest(), "big")
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return None
+
+class MirrorSync:
+    # Drains the mirror_changes queue the change-capture triggers fill, a
+    # batch at a time: each changed key's current row is appended to its
+    # mirror, or a tombstone if the row is gone. Applied changes are deleted
+    # by id instead of tracked with a high-water mark, so a transaction that
+    # commits after a later-numbered one is still picked up; applying a key
+    # twice only rewrites the same row.
+    def __init__(self, mirrors, lock_path=LOCK_FILE, interval=SYNC_INTERVAL, batch_size=BATCH_SIZE):
+        self.mirrors = mirrors
+        self.lock_path = lock_path
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lock = threading.RLock()
+        self.lock_fd = None
+        self.depth = 0
+        self.sizes = {}
+        self.installed = False
+        self.condition = threading.Condition()
+        self.requested = False
+        self.stopping = False
+        self.thread = None
+
+    def install(self):
+        # True if capture was off until now, see storage.install_change_capture.
+        conn = db_pool.get_db_connection()
+        try:
+            fresh = storage.install_change_capture(conn)
+            self.installed = True
+            return fresh
+        finally:
+            conn.close()
+
+    def uninstall(self):
+        # Applies what is queued, then stops capturing: the mirrors are left
+        # as of now and are no longer kept up to date.
+        self.close()
+        with self.exclusive():
+            if self.installed:
+                self.sync()
+            conn = db_pool.get_db_connection()
+            try:
+                discarded = storage.remove_change_capture(conn)
+                self.installed = False
+                return discarded
+            finally:
+                conn.close()
+
+    def start(self):
+        fresh = self.install()
+        with self.condition:
+            if self.thread is None:
+                self.stopping = False
+                self.thread = threading.Thread(target=self.run, name="mirror-sync", daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+        return fresh
+
+    def notify(self):
+        with self.condition:
+            self.requested = True
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            thread = self.thread
+            self.stopping = True
+            self.condition.notify_all()
+        if thread is not None:
+            thread.join()
+        with self.condition:
+            self.thread = None
+
+    def run(self):
+        while True:
+            with self.condition:
+                if not self.requested and not self.stopping:
+                    self.condition.wait(self.interval)
+                self.requested = False
+                stopping = self.stopping
+            try:
+                self.sync()
+            except Exception as err:
+                print(f"Error: mirror sync failed: {err}")
+            if stopping:
+                return
+
+    @contextmanager
+    def exclusive(self):
+        # Keeps the mirror files to one thread of one process. A mirror some
+        # other process wrote to since this one last held them has its offset
+        # index reloaded.
+        with self.lock:
+            if self.depth == 0:
+                if self.lock_fd is None:
+                    self.lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                with metrics.timer("hotel_lock_wait_seconds", mode="mirror"):
+                    fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+                for table, mirror in self.mirrors.items():
+                    if self.sizes.get(table) != file_size(mirror.path):
+                        mirror.offsets = None
+            self.depth += 1
+            try:
+                yield
+            finally:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.sizes = {table: file_size(mirror.path) for table, mirror in self.mirrors.items()}
+                    fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+    def sync(self):
+        if not self.installed:
+            self.install()
+        applied = 0
+        with self.exclusive():
+            conn = db_pool.get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            try:
+                while True:
+                    cursor.execute("SELECT id, table_name, row_key, changed_at FROM mirror_changes ORDER BY id LIMIT %s",
+                                   (self.batch_size,))
+                    changes = cursor.fetchall()
+                    if not changes:
+                        conn.commit()
+                        metrics.registry.set("hotel_mirror_backlog_seconds", 0.0)
+                        return applied
+                    now = time.time()
+                    metrics.registry.set("hotel_mirror_backlog_seconds", now - float(changes[0]['changed_at']))
+                    keys = {}
+                    for change in changes:
+                        keys.setdefault(change['table_name'], {})[change['row_key']] = None
+                    for table, table_keys in keys.items():
+                        self.apply(cursor, table, list(table_keys))
+                        metrics.registry.increment("hotel_mirror_changes_total", len(table_keys), table=table)
+                    ids = [change['id'] for change in changes]
+                    cursor.execute(f"DELETE FROM mirror_changes WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+                    conn.commit()
+                    now = time.time()
+                    for change in changes:
+                        metrics.registry.observe("hotel_mirror_lag_seconds", now - float(change['changed_at']))
+                    applied += len(changes)
+            finally:
+                cursor.close()
+                conn.close()
+
+    def current_rows(self, cursor, table, keys):
+        key_column = self.mirrors[table].key
+        rows = {}
+        for start in range(0, len(keys), self.batch_size):
+            chunk = keys[start:start + self.batch_size]
+            cursor.execute(f"SELECT * FROM {table} WHERE {key_column} IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            rows.update((str(row[key_column]), row) for row in cursor.fetchall())
+        return rows
+
+    def apply(self, cursor, table, keys):
+        # Rows already mirrored as they are (an update that changed nothing)
+        # are not written again.
+        mirror = self.mirrors[table]
+        rows = self.current_rows(cursor, table, keys)
+        mirrored_rows = mirror.get_many(keys)
+        records = []
+        for key in keys:
+            mirrored = mirrored_rows.get(key)
+            row = rows.get(key)
+            if row is None:
+                if mirrored is not None:
+                    records.append({mirror.key: key, "_deleted": True})
+            elif mirrored is None or canonical(mirrored) != canonical(row):
+                records.append(row)
+        if records:
+            mirror.extend(records)
+
+    def pending(self):
+        conn = db_pool.get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*), MIN(changed_at) FROM mirror_changes")
+            count, oldest = cursor.fetchone()
+            return count, time.time() - float(oldest) if oldest is not None else 0.0
+        finally:
+            cursor.close()
+            conn.close()
+
+    def check(self):
+        # Drains the queue, then compares an order-independent checksum (the
+        # sum of per-row digests) of each table with its mirror's. Keys that
+        # differ are synced and compared once more, so a write landing during
+        # the scan is not reported; what still differs has drifted.
+        results = {}
+        with self.exclusive():
+            self.sync()
+            conn = db_pool.get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            try:
+                for table, mirror in self.mirrors.items():
+                    mirrored = {str(record[mirror.key]): row_digest(record) for record in mirror.records()}
+                    mirror_checksum = sum(mirrored.values()) % 2 ** 64
+                    database_checksum, rows, differing = 0, 0, []
+                    cursor.execute(f"SELECT * FROM {table}")
+                    for row in cursor:
+                        key = str(row[mirror.key])
+                        digest = row_digest(row)
+                        database_checksum = (database_checksum + digest) % 2 ** 64
+                        rows += 1
+                        if mirrored.pop(key, None) != digest:
+                            differing.append(key)
+                    differing.extend(mirrored)
+                    results[table] = [rows, mirror.count(), database_checksum, mirror_checksum, differing]
+                conn.commit()
+                if any(result[4] for result in results.values()):
+                    self.sync()
+                    for table, result in results.items():
+                        if result[4]:
+                            rows = self.current_rows(cursor, table, result[4])
+                            result[4] = [key for key in result[4] if self.drifted(table, key, rows.get(key))]
+            finally:
+                cursor.close()
+                conn.close()
+        return {table: tuple(result) for table, result in results.items()}
+
+    def drifted(self, table, key, row):
+        mirrored = self.mirrors[table].get(key)
+        if row is None or mirrored is None:
+            return row is not None or mirrored is not None
+        return canonical(row) != canonical(mirrored)
+
+    def repair(self, drifted):
+        # drifted maps tables to keys, as check() reports them.
+        with self.exclusive():
+            conn = db_pool.get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            try:
+                for table, keys in drifted.items():
+                    if keys:
+                        self.apply(cursor, table, keys)
+                conn.commit()
+            finally:
+                cursor.close()
+                conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or remove the change capture that feeds the JSON mirrors.")
+    parser.add_argument("--remove", action="store_true",
+                        help="apply queued changes, then drop the triggers and the queue; stop other front ends first")
+    args = parser.parse_args()
+
+    from FilehandelingwithMysql import mirror_syncer
+    try:
+        if args.remove:
+            discarded = mirror_syncer.uninstall()
+            print(f"Change capture removed ({discarded} queued changes discarded). Mirrors are no longer kept in sync.")
+            return
+        conn = db_pool.get_db_connection()
+        cursor = conn.cursor()
+        try:
+            installed = storage.change_capture_installed(cursor)
+        finally:
+            cursor.close()
+            conn.close()
+        if not installed:
+            print("Change capture is not installed.")
+            return
+        pending, backlog = mirror_syncer.pending()
+        print(f"Change capture is installed. Changes waiting to sync: {pending} (oldest {backlog:.1f}s)")
+    except storage.DatabaseError as err:
+        print(f"Error: {err}")
+
+if __name__ == "__main__":
+    main()
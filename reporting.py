@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+from availability import parse_date
+
+class RevenueReport:
+    # Running counters updated on every event, so a report costs
+    # O(room types + service categories) however long the history is.
+    def __init__(self):
+        self.rooms = {}
+        self.occupied = {}
+        self.bookings = {}
+        self.nights_sold = {}
+        self.room_revenue = {}
+        self.service_count = {}
+        self.service_revenue = {}
+
+    def add_room(self, room_type, available=True):
+        self.rooms[room_type] = self.rooms.get(room_type, 0) + 1
+        if not available:
+            self.occupy(room_type, 1)
+
+    def occupy(self, room_type, delta):
+        self.occupied[room_type] = self.occupied.get(room_type, 0) + delta
+
+    def book(self, room_type):
+        self.bookings[room_type] = self.bookings.get(room_type, 0) + 1
+
+    def bill(self, room_type, nights, room_charge, sign=1):
+        self.nights_sold[room_type] = self.nights_sold.get(room_type, 0) + sign * nights
+        self.room_revenue[room_type] = self.room_revenue.get(room_type, 0.0) + sign * room_charge
+
+    def add_service(self, service, cost, count=1):
+        category = service.strip().lower()
+        self.service_count[category] = self.service_count.get(category, 0) + count
+        self.service_revenue[category] = self.service_revenue.get(category, 0.0) + cost
+
+    def merge(self, other):
+        for name, counters in vars(other).items():
+            mine = getattr(self, name)
+            for key, value in counters.items():
+                mine[key] = mine.get(key, 0) + value
+
+    def room_type_rows(self):
+        rows = []
+        for room_type in sorted(self.rooms):
+            rooms = self.rooms[room_type]
+            nights = self.nights_sold.get(room_type, 0)
+            revenue = self.room_revenue.get(room_type, 0.0)
+            occupancy = self.occupied.get(room_type, 0) / rooms if rooms else 0.0
+            adr = revenue / nights if nights else 0.0
+            rows.append({
+                "type": room_type,
+                "rooms": rooms,
+                "occupied": self.occupied.get(room_type, 0),
+                "bookings": self.bookings.get(room_type, 0),
+                "nights_sold": nights,
+                "room_revenue": revenue,
+                "occupancy": occupancy,
+                "adr": adr,
+            })
+        return rows
+
+    def service_rows(self):
+        return [{"service": category, "count": self.service_count[category], "revenue": self.service_revenue[category]}
+                for category in sorted(self.service_revenue)]
+
+    def snapshot(self):
+        # Bookings are only ever counted as they happen, so they are left out
+        # of the comparison with a rebuild from stored records.
+        return {
+            "rooms": self.rooms,
+            "occupied": {room_type: count for room_type, count in self.occupied.items() if count},
+            "nights_sold": {room_type: count for room_type, count in self.nights_sold.items() if count},
+            "room_revenue": {room_type: round(total, 2) for room_type, total in self.room_revenue.items() if total},
+            "service_count": self.service_count,
+            "service_revenue": {category: round(total, 2) for category, total in self.service_revenue.items()},
+        }
+
+def rebuild(rooms, bills, services, archived=None):
+    # `archived` holds the totals of bills and services already moved out of
+    # the hot store, which still count towards the running figures.
+    report = RevenueReport()
+    if archived is not None:
+        report.merge(archived)
+    for room in rooms.values():
+        report.add_room(room.type, room.available)
+    for charges in bills.values():
+        if charges.room_number in rooms:
+            report.bill(rooms[charges.room_number].type, charges.nights, charges.room_charge)
+    for _, service, cost in services:
+        report.add_service(service, cost)
+    return report
+
+def period_rows(room_counts, stays, start, nights):
+    # RevPAR needs one time base: the room revenue earned on the nights from
+    # `start`, each billed stay's charge spread evenly over its nights,
+    # divided by the room-nights available. `stays` pairs a room type with
+    # the bills that may overlap the period.
+    end = start + timedelta(days=nights)
+    sold, revenue = {}, {}
+    for room_type, charges in stays:
+        if not charges.nights or not charges.check_out_date:
+            continue
+        check_out = parse_date(charges.check_out_date)
+        overlap = (min(check_out, end) - max(check_out - timedelta(days=charges.nights), start)).days
+        if overlap > 0:
+            sold[room_type] = sold.get(room_type, 0) + overlap
+            revenue[room_type] = revenue.get(room_type, 0.0) + charges.room_charge * overlap / charges.nights
+    rows = []
+    for room_type in sorted(room_counts):
+        available = room_counts[room_type] * nights
+        nights_sold = sold.get(room_type, 0)
+        room_revenue = revenue.get(room_type, 0.0)
+        rows.append({
+            "type": room_type,
+            "rooms": room_counts[room_type],
+            "nights_sold": nights_sold,
+            "room_revenue": room_revenue,
+            "occupancy": nights_sold / available if available else 0.0,
+            "adr": room_revenue / nights_sold if nights_sold else 0.0,
+            "revpar": room_revenue / available if available else 0.0,
+        })
+    return rows
+
+def differences(report, expected):
+    current = report.snapshot()
+    wanted = expected.snapshot()
+    return [f"{name}: running {current[name]} != rebuilt {wanted[name]}" for name in current if current[name] != wanted[name]]
+
+def print_report(report):
+    print("\n--- Occupancy and Revenue ---")
+    print(f"{'type':<10}{'rooms':>7}{'occ %':>8}{'nights':>8}{'revenue':>12}{'ADR':>10}")
+    for row in report.room_type_rows():
+        print(f"{row['type']:<10}{row['rooms']:>7}{row['occupancy'] * 100:>8.1f}{row['nights_sold']:>8}"
+              f"{row['room_revenue']:>12.2f}{row['adr']:>10.2f}")
+    print("\n--- Service Revenue ---")
+    for row in report.service_rows():
+        print(f"{row['service']:<20}{row['count']:>8}{row['revenue']:>12.2f}")
+
+def print_period_report(rows, start, nights):
+    print(f"\n--- Billed stays, {nights} nights from {start} ---")
+    print(f"{'type':<10}{'rooms':>7}{'occ %':>8}{'nights':>8}{'revenue':>12}{'ADR':>10}{'RevPAR':>10}")
+    for row in rows:
+        print(f"{row['type']:<10}{row['rooms']:>7}{row['occupancy'] * 100:>8.1f}{row['nights_sold']:>8}"
+              f"{row['room_revenue']:>12.2f}{row['adr']:>10.2f}{row['revpar']:>10.2f}")
@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+
+ROOM_CACHE_TTL = float(os.environ.get("HOTEL_ROOM_CACHE_TTL", "60"))
+
+class RoomCache:
+    def __init__(self, ttl=ROOM_CACHE_TTL):
+        self.ttl = ttl
+        self.rooms = {}
+        self.available_by_type = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, table, key):
+        with self.lock:
+            entry = table.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def get_room(self, room_number, loader):
+        room = self.lookup(self.rooms, room_number)
+        if room is None:
+            room = loader(room_number)
+            if room is not None:
+                self.put_room(room)
+        return room
+
+    def put_room(self, room):
+        with self.lock:
+            self.rooms[room['room_number']] = (dict(room), time.monotonic() + self.ttl)
+
+    def get_available(self, room_type, loader):
+        rooms = self.lookup(self.available_by_type, room_type)
+        if rooms is None:
+            rooms = loader(room_type)
+            with self.lock:
+                self.available_by_type[room_type] = (rooms, time.monotonic() + self.ttl)
+        return rooms
+
+    def invalidate(self, room_number=None, room_type=None):
+        with self.lock:
+            self.invalidations += 1
+            if room_number is None:
+                self.rooms.clear()
+            else:
+                entry = self.rooms.pop(room_number, None)
+                if room_type is None and entry is not None:
+                    room_type = entry[0]['type']
+            if room_type is None:
+                self.available_by_type.clear()
+            else:
+                self.available_by_type.pop(room_type, None)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "cached_rooms": len(self.rooms),
+            }
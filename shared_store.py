@@ -0,0 +1,142 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+import metrics
+
+LOCK_FILE = "store.lock"
+VERSION_FILE = "store.version"
+
+class Shard:
+    # One directory of text files with its own lock and journal. The version
+    # stamp counts compactions of the directory; `tail` stays open on the
+    # journal of that version, so entries other processes append can be read
+    # from where this process left off instead of reloading the files.
+    def __init__(self, directory, journal_name):
+        self.directory = directory
+        self.journal_path = os.path.join(directory, journal_name)
+        self.lock_path = os.path.join(directory, LOCK_FILE)
+        self.version_path = os.path.join(directory, VERSION_FILE)
+        self.fd = None
+        self.lock_fd = None
+        self.version = None
+        self.tail = None
+        self.entries = 0
+
+    def lock(self, exclusive, blocking=True):
+        if self.fd is None:
+            if self.directory:
+                os.makedirs(self.directory, exist_ok=True)
+            self.fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if blocking:
+            with metrics.timer("hotel_lock_wait_seconds", mode="exclusive" if exclusive else "shared"):
+                fcntl.flock(self.fd, mode)
+        else:
+            try:
+                fcntl.flock(self.fd, mode | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+        self.lock_fd = self.fd
+        return True
+
+    def unlock(self):
+        fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+        self.lock_fd = None
+
+    def read_version(self):
+        try:
+            with open(self.version_path, "r") as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def open_tail(self):
+        with open(self.journal_path, "a"):
+            pass
+        self.close_tail()
+        self.tail = open(self.journal_path, "rb")
+        self.version = self.read_version()
+        self.entries = 0
+
+    def close_tail(self):
+        if self.tail is not None:
+            self.tail.close()
+            self.tail = None
+
+    def changed(self):
+        # Cheap check without the lock: a journal still at the inode and size
+        # last read has nothing new.
+        if self.tail is None:
+            return True
+        try:
+            stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return True
+        return stat.st_ino != os.fstat(self.tail.fileno()).st_ino or stat.st_size != self.tail.tell()
+
+    def read_new(self):
+        # Returns the entries appended since the last read, or None when the
+        # directory was compacted more than once since then and the skipped
+        # journal is gone, in which case the caller has to reload.
+        if self.tail is None:
+            self.open_tail()
+            return self.read_lines()
+        # Compaction always replaces the journal, so while the path still
+        # names the file being tailed the version cannot have moved.
+        if os.stat(self.journal_path).st_ino == os.fstat(self.tail.fileno()).st_ino:
+            return self.read_lines()
+        version = self.read_version()
+        if version == self.version:
+            return self.read_lines()
+        if version != self.version + 1:
+            return None
+        entries = self.read_lines()
+        self.open_tail()
+        return entries + self.read_lines()
+
+    def read_lines(self):
+        entries = [line.split(",") for line in self.tail.read().decode().splitlines() if line]
+        self.entries += len(entries)
+        return entries
+
+    def append(self, entries):
+        if self.tail is None:
+            self.open_tail()
+        with open(self.journal_path, "a") as f:
+            f.writelines(",".join(fields) + "\n" for fields in entries)
+        self.tail.seek(0, os.SEEK_END)
+        self.entries += len(entries)
+
+    def rotation(self):
+        # The files that finish a compaction of the directory, written after
+        # its text files. Processes still reading the old journal finish it
+        # through their open handle and then move to the new one when they
+        # see the bumped version, so the version is replaced first.
+        return {self.version_path: str(self.version + 1), self.journal_path: ""}
+
+def write_atomic(path, content, fsync=False):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        f.write(content)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+@contextmanager
+def locked(shards, exclusive, blocking=True):
+    # Shards are locked in directory order so two processes needing the same
+    # pair cannot deadlock; shards this process already holds are kept as
+    # they are. Yields the shards held, which without blocking leaves out
+    # those another process has locked.
+    shards = sorted(shards, key=lambda shard: shard.directory)
+    acquired = []
+    try:
+        for shard in shards:
+            if shard.lock_fd is None and shard.lock(exclusive, blocking):
+                acquired.append(shard)
+        yield [shard for shard in shards if shard.lock_fd is not None]
+    finally:
+        for shard in reversed(acquired):
+            shard.unlock()
@@ -0,0 +1,258 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from inventory import Bill, ServiceLog
+from reporting import RevenueReport
+
+MAGIC = b"HOTELSN1"
+HEADER = struct.Struct("<8sI")
+SECTION = struct.Struct("<8sQQ")
+TABLE = struct.Struct("<IIQ")
+COLUMN = struct.Struct("<cQ")
+
+def pack_table(columns):
+    # A table is a string table (NUL-joined UTF-8) followed by one packed
+    # array per column; string columns hold indexes into the string table.
+    strings = {}
+    packed = []
+    for typecode, values in columns:
+        if typecode == "s":
+            values = array("I", (strings.setdefault("" if value is None else str(value), len(strings)) for value in values))
+        else:
+            values = array(typecode, values)
+        packed.append((typecode, values.tobytes()))
+    blob = "\0".join(strings).encode()
+    row_count = len(columns[0][1]) if columns else 0
+    parts = [TABLE.pack(row_count, len(packed), len(blob)), blob]
+    for typecode, data in packed:
+        parts.append(COLUMN.pack(typecode.encode(), len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+def unpack_table(buffer):
+    row_count, column_count, blob_length = TABLE.unpack_from(buffer, 0)
+    offset = TABLE.size
+    strings = bytes(buffer[offset:offset + blob_length]).decode().split("\0") if blob_length else [""]
+    offset += blob_length
+    columns = []
+    for _ in range(column_count):
+        typecode, length = COLUMN.unpack_from(buffer, offset)
+        offset += COLUMN.size
+        typecode = typecode.decode()
+        values = array("I" if typecode == "s" else typecode)
+        values.frombytes(buffer[offset:offset + length])
+        offset += length
+        columns.append([strings[index] for index in values] if typecode == "s" else values)
+    return columns
+
+def pack(rooms, bookings, check_ins, services, bills, report):
+    if isinstance(services, LazyServiceLog):
+        services.load()
+    if isinstance(bills, LazyBills):
+        bills.load()
+    sections = {
+        b"rooms": pack_table([
+            ("s", list(rooms)),
+            ("s", [room.type for room in rooms.values()]),
+            ("d", [room.price for room in rooms.values()]),
+            ("B", [room.available for room in rooms.values()]),
+        ]),
+        b"bookings": pack_table([
+            ("s", [booking.room_number for booking in bookings]),
+            ("s", [booking.guest_name for booking in bookings]),
+            ("s", [booking.contact_details for booking in bookings]),
+            ("i", [booking.duration for booking in bookings]),
+            ("s", [booking.check_in_date for booking in bookings]),
+        ]),
+        b"checkins": pack_table([
+            ("s", [check_in.room_number for check_in in check_ins]),
+            ("s", [check_in.guest_name for check_in in check_ins]),
+            ("s", [check_in.check_in_date for check_in in check_ins]),
+            ("i", [check_in.duration for check_in in check_ins]),
+        ]),
+        b"svctotal": pack_table([
+            ("s", list(services.totals)),
+            ("d", list(services.totals.values())),
+        ]),
+        b"services": pack_table([
+            ("s", services.room_numbers),
+            ("s", services.names),
+            ("d", services.costs),
+            ("s", services.guests),
+        ]),
+        b"bills": pack_table([
+            ("s", list(bills)),
+            ("d", [charges.room_charge for charges in bills.values()]),
+            ("d", [charges.service_charge for charges in bills.values()]),
+            ("d", [charges.total for charges in bills.values()]),
+            ("s", [charges.room_number for charges in bills.values()]),
+            ("i", [charges.nights for charges in bills.values()]),
+            ("s", [charges.check_out_date for charges in bills.values()]),
+        ]),
+        b"report": json.dumps(vars(report)).encode(),
+    }
+    offset = HEADER.size + SECTION.size * len(sections)
+    directory = []
+    for name, data in sections.items():
+        directory.append(SECTION.pack(name, offset, len(data)))
+        offset += len(data)
+    return b"".join([HEADER.pack(MAGIC, len(sections)), *directory, *sections.values()])
+
+class Snapshot:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, section_count = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a hotel snapshot")
+        self.sections = {}
+        for index in range(section_count):
+            name, offset, length = SECTION.unpack_from(self.buffer, HEADER.size + index * SECTION.size)
+            self.sections[name.rstrip(b"\0").decode()] = (offset, length)
+
+    def section(self, name):
+        offset, length = self.sections[name]
+        return memoryview(self.buffer)[offset:offset + length]
+
+    def table(self, name):
+        with self.section(name) as buffer:
+            return unpack_table(buffer)
+
+    def rooms(self):
+        room_numbers, types, prices, available = self.table("rooms")
+        return zip(room_numbers, types, prices, available)
+
+    def bookings(self):
+        return zip(*self.table("bookings"))
+
+    def check_ins(self):
+        return zip(*self.table("checkins"))
+
+    def report(self):
+        report = RevenueReport()
+        with self.section("report") as buffer:
+            vars(report).update(json.loads(bytes(buffer)))
+        return report
+
+    def services(self):
+        room_numbers, totals = self.table("svctotal")
+        return LazyServiceLog(lambda: self.table("services"), dict(zip(room_numbers, totals)))
+
+    def bills(self):
+        def load():
+            # Snapshots written before bills kept their check-out date have
+            # one column fewer.
+            guest_names, room_charges, service_charges, totals, room_numbers, nights, *dates = self.table("bills")
+            dates = dates[0] if dates else [""] * len(guest_names)
+            return {guest_names[i]: Bill(room_charges[i], service_charges[i], totals[i], room_numbers[i] or None, nights[i],
+                                         dates[i] or None)
+                    for i in range(len(guest_names))}
+        return LazyBills(load)
+
+class LazyServiceLog(ServiceLog):
+    # Per-room totals come from the snapshot up front; the individual
+    # entries are only unpacked when something lists or settles them.
+    def __init__(self, loader, totals):
+        super().__init__()
+        self.totals = totals
+        self.loader = loader
+
+    def load(self):
+        if self.loader is not None:
+            loader, self.loader = self.loader, None
+            room_numbers, names, costs, *guests = loader()
+            self.room_numbers[:0] = room_numbers
+            self.names[:0] = names
+            self.costs[:0] = costs
+            self.guests[:0] = [guest_name or None for guest_name in guests[0]] if guests else [None] * len(costs)
+            self.open = None
+
+    def clear(self):
+        self.loader = None
+        super().clear()
+
+    def settle(self, room_number, guest_name):
+        self.load()
+        super().settle(room_number, guest_name)
+
+    def entries(self):
+        self.load()
+        return super().entries()
+
+    def __len__(self):
+        self.load()
+        return super().__len__()
+
+    def __iter__(self):
+        self.load()
+        return super().__iter__()
+
+class LazyBills(dict):
+    def __init__(self, loader):
+        super().__init__()
+        self.loader = loader
+
+    def load(self):
+        if self.loader is not None:
+            loader, self.loader = self.loader, None
+            newer = dict(super().items())
+            super().clear()
+            super().update(loader())
+            super().update(newer)
+
+    def __getitem__(self, key):
+        self.load()
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self.load()
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self.load()
+        return super().__iter__()
+
+    def __len__(self):
+        self.load()
+        return super().__len__()
+
+    def get(self, key, default=None):
+        self.load()
+        return super().get(key, default)
+
+    def items(self):
+        self.load()
+        return super().items()
+
+    def keys(self):
+        self.load()
+        return super().keys()
+
+    def values(self):
+        self.load()
+        return super().values()
+
+def main():
+    import file
+
+    parser = argparse.ArgumentParser(description="Convert the file.py text store to and from a binary snapshot.")
+    parser.add_argument("--to-text", action="store_true", help="write the snapshot back out as text files and remove it")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    file.load_data()
+    if args.to_text:
+        stale = [file.SNAPSHOT_FILE] if os.path.exists(file.SNAPSHOT_FILE) else []
+        file.commit_files(file.render_text_files(), remove=stale + file.journal_files())
+    else:
+        file.write_snapshot()
+    print(f"Converted {len(file.rooms)} rooms, {len(file.bookings) + len(file.check_ins)} stays, "
+          f"{len(file.services)} services and {len(file.bills)} bills in {time.perf_counter() - start:.2f}s.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+import os
+import sqlite3
+import threading
+from datetime import date
+
+import billing
+
+STORAGE_BACKEND = os.environ.get("HOTEL_STORAGE", "mysql")
+SQLITE_PATH = os.environ.get("HOTEL_SQLITE_PATH", "hotel.db")
+DB_CONFIG = {
+    "host": os.environ.get("HOTEL_DB_HOST", "localhost"),
+    "port": int(os.environ.get("HOTEL_DB_PORT", "3306")),
+    "user": os.environ.get("HOTEL_DB_USER", "root"),
+    "password": os.environ.get("HOTEL_DB_PASSWORD", ""),
+    "database": os.environ.get("HOTEL_DB_NAME", "hotel_management"),
+}
+mysql_migrated = False
+migrate_lock = threading.Lock()
+
+TABLES = """
+CREATE TABLE IF NOT EXISTS rooms (
+    room_number TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    price REAL NOT NULL,
+    available BOOLEAN NOT NULL DEFAULT TRUE
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room_number TEXT NOT NULL,
+    guest_name TEXT NOT NULL,
+    contact_details TEXT,
+    duration INTEGER NOT NULL,
+    check_in_date TEXT
+);
+CREATE TABLE IF NOT EXISTS check_ins (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room_number TEXT NOT NULL,
+    guest_name TEXT NOT NULL,
+    check_in_date TEXT,
+    duration INTEGER
+);
+CREATE TABLE IF NOT EXISTS services (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room_number TEXT NOT NULL,
+    service TEXT NOT NULL,
+    cost REAL NOT NULL,
+    bill_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS bills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guest_name TEXT NOT NULL,
+    room_number TEXT,
+    room_charge REAL NOT NULL,
+    service_charge REAL NOT NULL,
+    total REAL NOT NULL,
+    nights INTEGER,
+    billed_on TEXT
+);
+CREATE TABLE IF NOT EXISTS bills_archive (
+    id INTEGER PRIMARY KEY,
+    guest_name TEXT NOT NULL,
+    room_number TEXT,
+    room_charge REAL NOT NULL,
+    service_charge REAL NOT NULL,
+    total REAL NOT NULL,
+    nights INTEGER,
+    billed_on TEXT
+);
+CREATE TABLE IF NOT EXISTS services_archive (
+    id INTEGER PRIMARY KEY,
+    room_number TEXT NOT NULL,
+    service TEXT NOT NULL,
+    cost REAL NOT NULL,
+    bill_id INTEGER NOT NULL
+);
+"""
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_rooms_type_available ON rooms (type, available);
+CREATE INDEX IF NOT EXISTS idx_bookings_room_number ON bookings (room_number, check_in_date);
+CREATE INDEX IF NOT EXISTS idx_bookings_guest_name ON bookings (guest_name);
+CREATE INDEX IF NOT EXISTS idx_check_ins_guest_name ON check_ins (guest_name);
+CREATE INDEX IF NOT EXISTS idx_services_room_number ON services (room_number);
+CREATE INDEX IF NOT EXISTS idx_bills_guest_name ON bills (guest_name);
+CREATE INDEX IF NOT EXISTS idx_bills_room_number ON bills (room_number);
+CREATE INDEX IF NOT EXISTS idx_bills_billed_on ON bills (billed_on);
+CREATE INDEX IF NOT EXISTS idx_bills_archive_billed_on ON bills_archive (billed_on);
+CREATE INDEX IF NOT EXISTS idx_services_archive_bill_id ON services_archive (bill_id);
+"""
+
+# The same schema for MySQL, one statement each as mysql.connector runs
+# them. MySQL has no CREATE INDEX IF NOT EXISTS, so the indexes are listed
+# for migrate_mysql to create the missing ones.
+MYSQL_TABLES = [
+    """CREATE TABLE IF NOT EXISTS rooms (
+    room_number VARCHAR(20) PRIMARY KEY,
+    type VARCHAR(20) NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    available BOOLEAN NOT NULL DEFAULT TRUE
+)""",
+    """CREATE TABLE IF NOT EXISTS bookings (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    room_number VARCHAR(20) NOT NULL,
+    guest_name VARCHAR(100) NOT NULL,
+    contact_details VARCHAR(100),
+    duration INT NOT NULL,
+    check_in_date DATE
+)""",
+    """CREATE TABLE IF NOT EXISTS check_ins (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    room_number VARCHAR(20) NOT NULL,
+    guest_name VARCHAR(100) NOT NULL,
+    check_in_date DATE,
+    duration INT
+)""",
+    """CREATE TABLE IF NOT EXISTS services (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    room_number VARCHAR(20) NOT NULL,
+    service VARCHAR(100) NOT NULL,
+    cost DECIMAL(10, 2) NOT NULL,
+    bill_id INT
+)""",
+    """CREATE TABLE IF NOT EXISTS bills (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    guest_name VARCHAR(100) NOT NULL,
+    room_number VARCHAR(20),
+    room_charge DECIMAL(10, 2) NOT NULL,
+    service_charge DECIMAL(10, 2) NOT NULL,
+    total DECIMAL(10, 2) NOT NULL,
+    nights INT,
+    billed_on DATE
+)""",
+    """CREATE TABLE IF NOT EXISTS bills_archive (
+    id INT PRIMARY KEY,
+    guest_name VARCHAR(100) NOT NULL,
+    room_number VARCHAR(20),
+    room_charge DECIMAL(10, 2) NOT NULL,
+    service_charge DECIMAL(10, 2) NOT NULL,
+    total DECIMAL(10, 2) NOT NULL,
+    nights INT,
+    billed_on DATE
+)""",
+    """CREATE TABLE IF NOT EXISTS services_archive (
+    id INT PRIMARY KEY,
+    room_number VARCHAR(20) NOT NULL,
+    service VARCHAR(100) NOT NULL,
+    cost DECIMAL(10, 2) NOT NULL,
+    bill_id INT NOT NULL
+)""",
+]
+MYSQL_INDEXES = [
+    ("rooms", "idx_rooms_type_available", "type, available"),
+    ("bookings", "idx_bookings_room_number", "room_number, check_in_date"),
+    ("bookings", "idx_bookings_guest_name", "guest_name"),
+    ("check_ins", "idx_check_ins_guest_name", "guest_name"),
+    ("services", "idx_services_room_number", "room_number"),
+    ("bills", "idx_bills_guest_name", "guest_name"),
+    ("bills", "idx_bills_room_number", "room_number"),
+    ("bills", "idx_bills_billed_on", "billed_on"),
+    ("bills_archive", "idx_bills_archive_billed_on", "billed_on"),
+    ("services_archive", "idx_services_archive_bill_id", "bill_id"),
+]
+
+# Columns added to the tables since the first stores were created, with
+# their SQLite and MySQL types. CREATE TABLE IF NOT EXISTS leaves those
+# stores' tables as they are, so the columns are added on connect, before
+# the indexes that use them.
+ADDED_COLUMNS = {
+    "bookings": [("check_in_date", "TEXT", "DATE")],
+    "check_ins": [("check_in_date", "TEXT", "DATE"), ("duration", "INTEGER", "INT")],
+    "services": [("bill_id", "INTEGER", "INT")],
+    "bills": [("nights", "INTEGER", "INT"), ("billed_on", "TEXT", "DATE")],
+}
+
+MIRRORED_TABLES = {"rooms": "room_number", "bookings": "id", "services": "id"}
+CHANGES_TABLE = {
+    "sqlite": "CREATE TABLE IF NOT EXISTS mirror_changes (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+              "table_name TEXT NOT NULL, row_key TEXT NOT NULL, changed_at REAL NOT NULL)",
+    "mysql": "CREATE TABLE IF NOT EXISTS mirror_changes (id BIGINT AUTO_INCREMENT PRIMARY KEY, "
+             "table_name VARCHAR(32) NOT NULL, row_key VARCHAR(64) NOT NULL, changed_at DOUBLE NOT NULL)",
+}
+CHANGE_TIME = {"sqlite": "(julianday('now') - 2440587.5) * 86400.0", "mysql": "UNIX_TIMESTAMP(NOW(3))"}
+
+def change_capture_statements(dialect):
+    # Every insert, update and delete on a mirrored table queues the row's key
+    # in mirror_changes inside the writing transaction, whichever front end or
+    # script made it. Installed by the mirror sync, not with the schema, so a
+    # store without mirrors does not collect changes nobody reads. Once
+    # installed, only a running mirror sync empties the queue: a store whose
+    # mirrors are retired should have capture removed (mirror_sync.py
+    # --remove), or the queue grows with every write.
+    statements = [CHANGES_TABLE[dialect]]
+    for table, key in MIRRORED_TABLES.items():
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_changes AFTER {event} ON {table} FOR EACH ROW "
+                f"BEGIN INSERT INTO mirror_changes (table_name, row_key, changed_at) "
+                f"VALUES ('{table}', {row}.{key}, {CHANGE_TIME[dialect]}); END"
+            )
+    return statements
+
+def change_capture_installed(cursor):
+    if STORAGE_BACKEND == "sqlite":
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'mirror_changes'")
+    else:
+        cursor.execute("SELECT COUNT(*) FROM information_schema.tables "
+                       "WHERE table_schema = DATABASE() AND table_name = 'mirror_changes'")
+    return cursor.fetchone()[0] > 0
+
+def install_change_capture(conn):
+    # Returns whether capture was off until now, in which case writes made
+    # meanwhile never reached the queue and the mirrors need a full resync.
+    cursor = conn.cursor()
+    try:
+        installed = change_capture_installed(cursor)
+        for statement in change_capture_statements("sqlite" if STORAGE_BACKEND == "sqlite" else "mysql"):
+            cursor.execute(statement)
+        conn.commit()
+        return not installed
+    finally:
+        cursor.close()
+
+def remove_change_capture(conn):
+    # Drops the triggers and the queue with whatever it still holds; returns
+    # how many changes were discarded.
+    cursor = conn.cursor()
+    try:
+        if not change_capture_installed(cursor):
+            return 0
+        cursor.execute("SELECT COUNT(*) FROM mirror_changes")
+        discarded = cursor.fetchone()[0]
+        for table in MIRRORED_TABLES:
+            for event in ("insert", "update", "delete"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {table}_{event}_changes")
+        cursor.execute("DROP TABLE mirror_changes")
+        conn.commit()
+        return discarded
+    finally:
+        cursor.close()
+
+def database_errors():
+    # What the front ends catch: errors from whichever backend is in use,
+    # without requiring mysql.connector to run on SQLite.
+    try:
+        import mysql.connector
+    except ImportError:
+        return (sqlite3.Error,)
+    return (mysql.connector.Error, sqlite3.Error)
+
+DatabaseError = database_errors()
+
+def translate(query):
+    return query.replace("%s", "?")
+
+class Cursor:
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self.dictionary = dictionary
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, query, params=()):
+        self._cursor.execute(translate(query), params)
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(translate(query), seq_of_params)
+
+    def convert(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self.convert(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self.convert(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self.convert(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self.convert(row)
+
+    def close(self):
+        self._cursor.close()
+
+class Connection:
+    # Presents a SQLite connection through the subset of the mysql.connector
+    # API the front ends use (%s placeholders, dictionary cursors), so the
+    # same SQL runs on either backend.
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, cached_statements=256)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def cursor(self, dictionary=False, buffered=None):
+        return Cursor(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+def sqlite_connect(path=None):
+    conn = Connection(path or SQLITE_PATH)
+    conn._conn.execute("PRAGMA journal_mode = WAL")
+    conn._conn.execute("PRAGMA synchronous = NORMAL")
+    conn._conn.executescript(TABLES)
+    migrate(conn._conn)
+    conn._conn.executescript(INDEXES)
+    return conn
+
+def migrate(raw_conn):
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {row[1] for row in raw_conn.execute(f"PRAGMA table_info({table})")}
+        for column, column_type, _ in columns:
+            if column not in existing:
+                raw_conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    raw_conn.commit()
+
+def migrate_mysql(conn):
+    cursor = conn.cursor()
+    try:
+        for statement in MYSQL_TABLES:
+            cursor.execute(statement)
+        cursor.execute("SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = DATABASE()")
+        existing = {(str(table).lower(), str(column).lower()) for table, column in cursor.fetchall()}
+        for table, columns in ADDED_COLUMNS.items():
+            for column, _, column_type in columns:
+                if (table, column) not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        cursor.execute("SELECT DISTINCT table_name, index_name FROM information_schema.statistics WHERE table_schema = DATABASE()")
+        existing = {(str(table).lower(), str(index).lower()) for table, index in cursor.fetchall()}
+        for table, index, columns in MYSQL_INDEXES:
+            if (table, index) not in existing:
+                cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+        conn.commit()
+    finally:
+        cursor.close()
+
+def mysql_connect():
+    # The schema is brought up to date once per process, by the first
+    # connection, rather than on every pooled connection.
+    global mysql_migrated
+    import mysql.connector
+    conn = mysql.connector.connect(**DB_CONFIG)
+    with migrate_lock:
+        if not mysql_migrated:
+            migrate_mysql(conn)
+            mysql_migrated = True
+    return conn
+
+def connect():
+    if STORAGE_BACKEND == "sqlite":
+        return sqlite_connect()
+    return mysql_connect()
+
+def apply_operation(cursor, fields):
+    op = fields[0]
+    if op == "add_room":
+        room_number, room_type, price = fields[1:]
+        cursor.execute(
+            "INSERT INTO rooms (room_number, type, price, available) VALUES (%s, %s, %s, TRUE)",
+            (room_number, room_type, float(price))
+        )
+    elif op == "book":
+        room_number, guest_name, contact_details, duration, *check_in_date = fields[1:]
+        check_in_date = check_in_date[0] if check_in_date else date.today().isoformat()
+        cursor.execute(
+            "INSERT INTO bookings (room_number, guest_name, contact_details, duration, check_in_date) VALUES (%s, %s, %s, %s, %s)",
+            (room_number, guest_name, contact_details, int(duration), check_in_date)
+        )
+        if check_in_date <= date.today().isoformat():
+            cursor.execute("UPDATE rooms SET available = FALSE WHERE room_number = %s", (room_number,))
+    elif op == "check_in":
+        room_number, guest_name = fields[1:]
+        cursor.execute(
+            "SELECT MIN(id) FROM bookings WHERE guest_name = %s AND room_number = %s",
+            (guest_name, room_number)
+        )
+        booking_id = cursor.fetchone()[0]
+        cursor.execute(
+            "INSERT INTO check_ins (room_number, guest_name, check_in_date, duration) "
+            "SELECT room_number, guest_name, check_in_date, duration FROM bookings WHERE id = %s",
+            (booking_id,)
+        )
+        if cursor.rowcount == 0:
+            cursor.execute("INSERT INTO check_ins (room_number, guest_name) VALUES (%s, %s)", (room_number, guest_name))
+        cursor.execute("DELETE FROM bookings WHERE id = %s", (booking_id,))
+        cursor.execute("UPDATE rooms SET available = FALSE WHERE room_number = %s", (room_number,))
+    elif op == "check_out":
+        room_number, guest_name, room_charge, service_charge, total = fields[1:6]
+        billed_on = fields[6] if len(fields) > 6 else date.today().isoformat()
+        cursor.execute(
+            "SELECT id, duration FROM check_ins WHERE guest_name = %s AND room_number = %s ORDER BY id LIMIT 1",
+            (guest_name, room_number)
+        )
+        check_in = cursor.fetchone()
+        if check_in:
+            cursor.execute("DELETE FROM check_ins WHERE id = %s", (check_in[0],))
+        cursor.execute("UPDATE rooms SET available = TRUE WHERE room_number = %s", (room_number,))
+        cursor.execute(
+            "INSERT INTO bills (guest_name, room_number, room_charge, service_charge, total, nights, billed_on) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (guest_name, room_number, float(room_charge), float(service_charge), float(total),
+             check_in[1] or 1 if check_in else 1, billed_on)
+        )
+        cursor.execute("UPDATE services SET bill_id = %s WHERE room_number = %s AND bill_id IS NULL",
+                       (cursor.lastrowid, room_number))
+    elif op == "cancel":
+        room_number, guest_name = fields[1:]
+        cursor.execute(
+            "DELETE FROM bookings WHERE id = (SELECT MIN(id) FROM bookings WHERE guest_name = %s AND room_number = %s)",
+            (guest_name, room_number)
+        )
+        cursor.execute(
+            "UPDATE rooms SET available = TRUE WHERE room_number = %s "
+            "AND NOT EXISTS (SELECT 1 FROM check_ins WHERE room_number = %s) "
+            "AND NOT EXISTS (SELECT 1 FROM bookings WHERE room_number = %s AND check_in_date <= %s)",
+            (room_number, room_number, room_number, date.today().isoformat())
+        )
+    elif op == "add_service":
+        room_number, service, cost = fields[1:]
+        cursor.execute(
+            "INSERT INTO services (room_number, service, cost) VALUES (%s, %s, %s)",
+            (room_number, service, float(cost))
+        )
+    elif op == "archive":
+        # One database is one shard, so the routing room number is not needed.
+        for statement in billing.ARCHIVE_STATEMENTS:
+            cursor.execute(statement, (fields[2],))
@@ -0,0 +1,149 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+
+import storage
+
+MODES = {
+    "journal": {"SHARED_MODE": False, "JOURNAL_MODE": True},
+    "snapshot": {"SHARED_MODE": False, "JOURNAL_MODE": True},
+    "shared": {"SHARED_MODE": True},
+}
+CRASH_POINTS = ["none", "before-record", "after-record", "mid-rename", "before-journal-removal", "finished-twice"]
+ENTRIES = [("add_room", "101", "single", 80.0), ("book", "101", "Ann", "555", 2), ("check_in", "101", "Ann"),
+           ("add_service", "101", "spa", 20.0), ("add_service", "101", "spa", 20.0)]
+EXPECTED = (1, 40.0)
+
+class Crash(Exception):
+    pass
+
+def load_file_store(settings, workdir):
+    os.chdir(workdir)
+    storage.STORAGE_BACKEND = "text"
+    import file
+    for name, value in settings.items():
+        setattr(file, name, value)
+    file.COMPACT_EVERY = float("inf")
+    file.load_data()
+    return file
+
+def seed(mode, workdir):
+    file = load_file_store(MODES[mode], workdir)
+    for fields in ENTRIES:
+        file.record_batch([fields])
+    if mode == "snapshot":
+        file.write_snapshot()
+        file.record_batch([("add_service", "101", "minibar", 0.0)])
+
+def compact(file):
+    if file.SHARED_MODE:
+        with file.exclusive_store():
+            file.compact_shard(file.get_shard(""))
+    else:
+        file.compact_data()
+
+def crash(mode, workdir, point):
+    # Compacts the seeded store, dying at `point` as a killed process would:
+    # nothing after it runs and nothing is cleaned up.
+    file = load_file_store(MODES[mode], workdir)
+    real_replace, real_remove, real_write = os.replace, os.remove, file.shared_store.write_atomic
+    renames = 0
+
+    def replace(temp_path, path):
+        nonlocal renames
+        if point == "mid-rename" and not path.endswith(file.COMPACTION_FILE):
+            renames += 1
+            if renames == 2:
+                raise Crash()
+        return real_replace(temp_path, path)
+
+    def remove(path):
+        if point == "before-journal-removal" and os.path.basename(path) == file.JOURNAL_FILE:
+            raise Crash()
+        return real_remove(path)
+
+    def write_atomic(path, content, fsync=False):
+        if point == "before-record":
+            raise Crash()
+        real_write(path, content, fsync)
+        if point in ("after-record", "finished-twice"):
+            raise Crash()
+
+    os.replace, os.remove, file.shared_store.write_atomic = replace, remove, write_atomic
+    try:
+        compact(file)
+    except Crash:
+        pass
+    finally:
+        os.replace, os.remove, file.shared_store.write_atomic = real_replace, real_remove, real_write
+
+def reload(mode, workdir, point):
+    # With "finished-twice", a second desk finishes the whole record while
+    # this one is between its first rename and removing the record.
+    os.chdir(workdir)
+    storage.STORAGE_BACKEND = "text"
+    import file
+    if point == "finished-twice":
+        real_replace = os.replace
+        other_desk = []
+
+        def replace(temp_path, path):
+            result = real_replace(temp_path, path)
+            if not other_desk:
+                other_desk.append(path)
+                os.replace = real_replace
+                file.finish_compaction()
+            return result
+
+        os.replace = replace
+        try:
+            file = load_file_store(MODES[mode], workdir)
+        finally:
+            os.replace = real_replace
+    else:
+        file = load_file_store(MODES[mode], workdir)
+    services = sum(cost for room_number, service, cost in file.services if service == "spa")
+    state = (len(file.check_ins), services)
+    pending = os.path.exists(file.COMPACTION_FILE)
+    compact(file)
+    return state, pending
+
+def verify(mode, workdir):
+    file = load_file_store(MODES[mode], workdir)
+    return len(file.check_ins), sum(cost for room_number, service, cost in file.services if service == "spa")
+
+def run(mode, point):
+    with tempfile.TemporaryDirectory() as workdir:
+        context = multiprocessing.get_context("spawn")
+        for step, args in ((seed, (mode, workdir)), (crash, (mode, workdir, point)), (reload, (mode, workdir, point))):
+            with context.Pool(1) as pool:
+                result = pool.apply(step, args)
+        with context.Pool(1) as pool:
+            return (*result, pool.apply(verify, (mode, workdir)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Crash a text-store compaction at each step and check the store reloads intact.")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--points", default=",".join(CRASH_POINTS))
+    args = parser.parse_args()
+
+    print(f"Each store holds {EXPECTED[0]} check-in and {EXPECTED[1]} in spa services before the crash")
+    print(f"{'mode':<10}{'crash point':<24}{'reload':>14}{'pending':>9}{'recompact':>14}{'ok':>5}")
+    failures = 0
+    for mode in args.modes.split(","):
+        for point in args.points.split(","):
+            try:
+                state, pending, recompacted = run(mode, point)
+            except Exception as err:
+                print(f"{mode:<10}{point:<24}  Error: {err}")
+                failures += 1
+                continue
+            ok = state == EXPECTED and recompacted == EXPECTED and not pending
+            failures += not ok
+            print(f"{mode:<10}{point:<24}{str(state):>14}{str(pending):>9}{str(recompacted):>14}{'yes' if ok else 'NO':>5}")
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+import storage
+
+ROOM_TYPES = ["single", "double", "suite"]
+
+MODES = {
+    "unsafe": {"SHARED_MODE": False, "JOURNAL_MODE": False},
+    "shared": {"SHARED_MODE": True},
+    "floors": {"SHARED_MODE": True, "SHARD_BY_FLOOR": True},
+}
+
+def load_file_store(settings, workdir):
+    os.chdir(workdir)
+    storage.STORAGE_BACKEND = "text"
+    import file
+    for name, value in settings.items():
+        setattr(file, name, value)
+    file.load_data()
+    return file
+
+def seed(settings, workdir, floors, rooms_per_floor):
+    file = load_file_store(settings, workdir)
+    file.record_batch([("add_room", str(floor * 100 + i), ROOM_TYPES[i % len(ROOM_TYPES)], 100.0)
+                       for floor in range(1, floors + 1) for i in range(rooms_per_floor)])
+    file.compact_data()
+
+def desk(settings, workdir, index, floors, operations, seed_value):
+    # Each desk works one floor, so with floors enabled desks touch disjoint shards.
+    file = load_file_store(settings, workdir)
+    rng = random.Random(seed_value * 1000 + index)
+    floor = str(index % floors + 1)
+    booked, staying = [], []
+    expected = {}
+    services = 0
+    sequence = 0
+
+    def free_room_on_floor(guest, room_type, nights):
+        free = [room for room in file.calendar.free_rooms(room_type, date.today(), nights) if room[:-2] == floor]
+        if not free:
+            raise file.CommandError("Floor is full.")
+        return file.book_entry(guest, "stress", room_type, date.today(), nights, rng.choice(free))
+
+    for _ in range(operations):
+        roll = rng.random()
+        try:
+            if roll < 0.35 or not (booked or staying):
+                sequence += 1
+                guest = f"Desk{index}-Guest{sequence}"
+                file.execute(free_room_on_floor, guest, rng.choice(ROOM_TYPES), rng.randint(1, 3))
+                booked.append(guest)
+                expected[guest] = "booked"
+            elif roll < 0.6 and booked:
+                guest = booked.pop(rng.randrange(len(booked)))
+                file.execute(file.check_in_entry, guest)
+                staying.append(guest)
+                expected[guest] = "checked_in"
+            elif roll < 0.85 and staying:
+                room_number = file.find_check_in(rng.choice(staying)).room_number
+                file.execute(file.add_service_entry, room_number, "minibar", 7.5)
+                services += 1
+            elif staying:
+                guest = staying.pop(rng.randrange(len(staying)))
+                file.execute(file.check_out_entry, guest)
+                expected[guest] = "billed"
+        except file.CommandError:
+            pass
+    file.compact_data()
+    return expected, services
+
+def find_overlaps(file):
+    stays = {}
+    for record in list(file.bookings.values()) + list(file.check_ins.values()):
+        start = date.fromisoformat(record.check_in_date).toordinal()
+        stays.setdefault(record.room_number, []).append((start, start + record.duration))
+    overlaps = 0
+    for intervals in stays.values():
+        intervals.sort()
+        overlaps += sum(1 for previous, current in zip(intervals, intervals[1:]) if current[0] < previous[1])
+    return overlaps
+
+def run_mode(name, args):
+    settings = MODES[name]
+    with tempfile.TemporaryDirectory() as workdir:
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(1) as pool:
+            pool.apply(seed, (settings, workdir, args.floors, args.rooms_per_floor))
+        start = time.perf_counter()
+        with context.Pool(args.processes) as pool:
+            results = pool.starmap(desk, [(settings, workdir, index, args.floors, args.operations, args.seed)
+                                          for index in range(args.processes)])
+        elapsed = time.perf_counter() - start
+        with context.Pool(1) as pool:
+            return (elapsed, *pool.apply(verify, (settings, workdir, results)))
+
+def verify(settings, workdir, results):
+    file = load_file_store(settings, workdir)
+    lost = 0
+    for expected, _ in results:
+        for guest, status in expected.items():
+            found = {
+                "booked": file.find_booking(guest),
+                "checked_in": file.find_check_in(guest),
+                "billed": file.bills.get(guest),
+            }[status]
+            lost += found is None
+    services = sum(count for _, count in results)
+    missing_services = services - sum(1 for _, service, _ in file.services if service == "minibar")
+    mismatches = file.reporting.differences(file.report, file.reporting.rebuild(file.rooms, file.bills, file.services))
+    return sum(len(expected) for expected, _ in results), lost, missing_services, find_overlaps(file), len(mismatches)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several file.py desks as separate processes against one text store.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--operations", type=int, default=200, help="mutations per process")
+    parser.add_argument("--floors", type=int, default=4)
+    parser.add_argument("--rooms-per-floor", type=int, default=30)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.processes} desks x {args.operations} mutations over {args.floors} floors of {args.rooms_per_floor} rooms")
+    print(f"{'mode':<10}{'ops/sec':>10}{'guests':>8}{'lost':>6}{'lost svc':>10}{'overlaps':>10}{'report':>8}")
+    for name in args.modes.split(","):
+        elapsed, guests, lost, missing_services, overlaps, mismatches = run_mode(name, args)
+        print(f"{name:<10}{args.processes * args.operations / elapsed:>10.0f}{guests:>8}{lost:>6}"
+              f"{missing_services:>10}{overlaps:>10}{mismatches:>8}")
+
+if __name__ == "__main__":
+    main()
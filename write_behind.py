@@ -0,0 +1,95 @@
+import atexit
+import threading
+import time
+
+class WriteBehind:
+    # Mutations only bump a counter; the background thread waits until the
+    # oldest unsaved change is `interval` seconds old (or `max_pending`
+    # changes have piled up) and then runs one save for all of them.
+    def __init__(self, save, interval=0.05, max_pending=200):
+        self.save = save
+        self.interval = interval
+        self.max_pending = max_pending
+        self.condition = threading.Condition()
+        self.marked = 0
+        self.written = 0
+        self.dirty_since = None
+        self.flush_requested = False
+        self.stopping = False
+        self.saves = 0
+        self.thread = None
+
+    def start(self):
+        with self.condition:
+            if self.thread is None:
+                self.stopping = False
+                self.thread = threading.Thread(target=self.run, name="write-behind", daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def mark_dirty(self, count=1):
+        with self.condition:
+            if self.marked == self.written:
+                self.dirty_since = time.monotonic()
+            self.marked += count
+            self.condition.notify_all()
+
+    def pending(self):
+        with self.condition:
+            return self.marked - self.written
+
+    def flush(self, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            target = self.marked
+            self.flush_requested = True
+            self.condition.notify_all()
+            while self.written < target and self.thread is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return self.written >= target
+
+    def close(self):
+        with self.condition:
+            thread = self.thread
+            self.stopping = True
+            self.condition.notify_all()
+        if thread is not None:
+            thread.join()
+        with self.condition:
+            self.thread = None
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.marked == self.written and not self.stopping:
+                    self.condition.wait()
+                if self.marked == self.written:
+                    return
+                deadline = self.dirty_since + self.interval
+                while (self.marked - self.written < self.max_pending
+                       and not self.flush_requested and not self.stopping):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                target = self.marked
+                self.flush_requested = False
+            try:
+                self.save()
+            except Exception as err:
+                print(f"Error: write-behind save failed: {err}")
+                with self.condition:
+                    if self.stopping:
+                        return
+                    self.dirty_since = time.monotonic()
+                continue
+            with self.condition:
+                self.written = target
+                self.saves += 1
+                if self.marked > self.written:
+                    self.dirty_since = time.monotonic()
+                self.condition.notify_all()